@@ -1,30 +1,23 @@
 from src.gui import gui_main
 from src.game import Game
+from src.book import OpeningBook
+from src.multipv import MultiPVSearch
+from src.robot_queue import RobotQueue
+from src.graveyard import Graveyard
+from src.preposition import Prepositioner
+from src.engine_pool import EnginePool, PooledEngine, POOL_SIZE, DEFAULT_HASH, DEFAULT_THREADS
 
 from dev.board import EngineBoardDetection
 from dev.robot import patch_communication
+from dev.engine import stockfish_path
+from dev.robot_sim import RobotSimulator
+from src.robot import setup_communication
 
-import chess.engine
 import logging
 from typing import Optional
-import platform
 import argparse
 
-def load_engine(engine_path: Optional[str] = None):
-    os_name = platform.system()
-    if not engine_path:
-        if os_name == 'Windows':
-            engine_path = 'dev/stockfish_windows/stockfish-windows-x86-64-avx2.exe'
-        elif os_name == 'Linux':
-            engine_path = 'dev/stockfish_linux/stockfish-ubuntu-x86-64-avx2'
-        else:
-            raise SystemError(f"{os_name} is not supported for stockfish")
-
-    logging.info(f"Selected stockfish path for {os_name}: {engine_path}")
-    engine = chess.engine.SimpleEngine.popen_uci(engine_path)
-    return engine
-
-def main(delay: float, engine_path: Optional[str]):
+def main(delay: float, engine_path: Optional[str], book_path: Optional[str], engines: int, hash_size: int, threads: int, shared_search: bool, robot_sim: bool, time_scale: float):
     try:
         # TODO: Better logging
         logging.basicConfig(format='%(asctime)s %(levelname)s:%(name)s:%(message)s', datefmt='%x %X', level=logging.INFO, handlers=[
@@ -32,13 +25,24 @@ def main(delay: float, engine_path: Optional[str]):
             logging.FileHandler("log.txt")
         ])
         
-        patch_communication(new_delay = delay)
+        if robot_sim:
+            # Real socket path against a simulated arm
+            simulator = RobotSimulator(port=0, time_scale=time_scale)
+            setup_communication('127.0.0.1', simulator.start(), batch=True)
+        else:
+            patch_communication(new_delay = delay)
 
-        engine = load_engine(engine_path)
+        # Robot and simulated human search on separate engines
+        pool = EnginePool.popen_uci(stockfish_path(engine_path), size=engines, options={"Hash": hash_size, "Threads": threads})
 
-        detection = EngineBoardDetection(engine)
+        detection = EngineBoardDetection(PooledEngine(pool))
 
-        game = Game(detection, engine)
+        book = OpeningBook(book_path) if book_path else None
+
+        engine = PooledEngine(pool)
+        robot_queue = RobotQueue()
+        game = Game(detection, engine, book=book, shared_search=MultiPVSearch(engine) if shared_search else None,
+                    robot_queue=robot_queue, graveyard=Graveyard(), prepositioner=Prepositioner(robot_queue))
 
         detection.attach_game(game)
 
@@ -64,5 +68,52 @@ if __name__ == "__main__":
         help="The optional path to the engine."
     )
 
+    parser.add_argument(
+        '--book',
+        type=str,
+        default=None,
+        help="Optional polyglot opening book for robot moves."
+    )
+
+    parser.add_argument(
+        '--engines',
+        type=int,
+        default=POOL_SIZE,
+        help="Number of engine processes shared by the robot and the simulated human."
+    )
+
+    parser.add_argument(
+        '--hash',
+        type=int,
+        default=DEFAULT_HASH,
+        help="Engine hash table size in MB, per engine process."
+    )
+
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=DEFAULT_THREADS,
+        help="Search threads per engine process."
+    )
+
+    parser.add_argument(
+        '--shared_search',
+        action='store_true',
+        help="Choose robot moves of every level from one MultiPV search per position."
+    )
+
+    parser.add_argument(
+        '--robot_sim',
+        action='store_true',
+        help="Talk to a local robot simulator instead of the mock function."
+    )
+
+    parser.add_argument(
+        '--time_scale',
+        type=float,
+        default=1.0,
+        help="Multiplier of the simulated arm time."
+    )
+
     args = parser.parse_args()
-    main(delay=args.delay, engine_path=args.engine_path)
+    main(delay=args.delay, engine_path=args.engine_path, book_path=args.book, engines=args.engines, hash_size=args.hash, threads=args.threads, shared_search=args.shared_search, robot_sim=args.robot_sim, time_scale=args.time_scale)
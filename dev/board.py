@@ -3,7 +3,8 @@ from src.game import Game, ROBOT
 import chess
 import chess.pgn
 import chess.engine
-from typing import Optional, TextIO
+from typing import Optional, TextIO, Union
+from src.async_engine import SyncEngine
 
 class PGNBoardDetection(BoardDetection):
     def __init__(self, pgn: TextIO):
@@ -14,12 +15,14 @@ class PGNBoardDetection(BoardDetection):
         self.board = pgn_game.board()
         self.moves = pgn_game.mainline_moves()
         self.move = iter(self.moves)
+        # Next move shown by capture_frame, played by the next capture_board
+        self.pending: Optional[chess.Move] = None
         self.game = None
 
     def attach_game(self, game: Game):
         self.game = game
 
-    def capture_board(self, perspective: chess.Color = chess.WHITE) -> Optional[RealBoard]:
+    def capture_board(self, perspective: chess.Color = chess.WHITE, after: Optional[float] = None) -> Optional[RealBoard]:
         if not self.game:
             raise ValueError("Cannot capture board without attaching a game.")
 
@@ -34,21 +37,33 @@ class PGNBoardDetection(BoardDetection):
 
         return RealBoard(board=chess.Board(fen=self.board.fen()), perspective=perspective)
 
+    def capture_frame(self, perspective: chess.Color = chess.WHITE, after: Optional[float] = None) -> Optional[RealBoard]:
+        if self.pending is None:
+            self.pending = next(self.move, None)
+
+        board = chess.Board(fen=self.board.fen())
+        if self.pending:
+            board.push(self.pending)
+        return RealBoard(board=board, perspective=perspective)
+
     def next_move(self) -> chess.Move:
-        move = next(self.move)
+        move = self.pending if self.pending is not None else next(self.move)
+        self.pending = None
         self.board.push(move)
         return move
 
 class EngineBoardDetection(BoardDetection):
-    def __init__(self, engine: chess.engine.SimpleEngine, game: Optional[Game] = None, depth: int = 4):
+    def __init__(self, engine: Union[chess.engine.SimpleEngine, SyncEngine], game: Optional[Game] = None, depth: int = 4):
         self.engine = engine
         self.game = game
         self.depth = depth
+        # (fen, move) of the last human move, so a frame and the capture after it agree
+        self.reply: Optional[tuple[str, chess.Move]] = None
 
     def attach_game(self, game: Game):
         self.game = game
 
-    def capture_board(self, perspective: chess.Color = chess.WHITE) -> Optional[RealBoard]:
+    def capture_board(self, perspective: chess.Color = chess.WHITE, after: Optional[float] = None) -> Optional[RealBoard]:
         if not self.game:
             raise ValueError("Cannot capture board without attaching a game.")
 
@@ -57,8 +72,11 @@ class EngineBoardDetection(BoardDetection):
         if self.game.player == ROBOT:
             return RealBoard(board=board, perspective=perspective)
 
-        result = self.engine.play(board, chess.engine.Limit(depth=self.depth))
-        move = result.move
+        if self.reply and self.reply[0] == board.fen():
+            move = self.reply[1]
+        else:
+            move = self.engine.play(board, chess.engine.Limit(depth=self.depth)).move
+            self.reply = (board.fen(), move)
 
         if not move or move not in board.legal_moves:
             move_uci = move.uci() if move else ''
@@ -0,0 +1,16 @@
+from typing import Optional
+import platform
+import logging
+
+def stockfish_path(engine_path: Optional[str] = None) -> str:
+    os_name = platform.system()
+    if not engine_path:
+        if os_name == 'Windows':
+            engine_path = 'dev/stockfish_windows/stockfish-windows-x86-64-avx2.exe'
+        elif os_name == 'Linux':
+            engine_path = 'dev/stockfish_linux/stockfish-ubuntu-x86-64-avx2'
+        else:
+            raise SystemError(f"{os_name} is not supported for stockfish")
+
+    logging.info(f"Selected stockfish path for {os_name}: {engine_path}")
+    return engine_path
@@ -0,0 +1,199 @@
+from src import robot
+from src import geometry
+
+from typing import Optional, TextIO
+import threading
+import argparse
+import logging
+import random
+import socket
+import json
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 6001
+
+# Command that returns the arm home, sent by robot.reset_state
+RESET_COMMAND = "99 99 99 99"
+
+class RobotSimulator:
+    """
+    TCP server speaking the robot protocol, takes as long as the arm would
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = DEFAULT_PORT,
+                 time_scale: float = 1.0,
+                 failure_rate: float = 0.0,
+                 jitter: float = 0.0,
+                 trace: Optional[TextIO] = None,
+                 seed: Optional[int] = None) -> None:
+        self.host = host
+        self.port = port
+        self.time_scale = time_scale
+        self.failure_rate = failure_rate
+        self.jitter = jitter
+        self.trace = trace
+        self.random = random.Random(seed)
+
+        # One arm, commands from several connections run one after another
+        self.arm_lock = threading.Lock()
+        self.arm = geometry.HOME
+        self.started = time.monotonic()
+
+        self.stopped = threading.Event()
+        self.listener = None
+        self.ready = threading.Event()
+
+    def serve_forever(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((self.host, self.port))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        self.ready.set()
+        logger.info(f"Robot simulator listening on {self.host}:{self.port}")
+
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(connection,), daemon=True).start()
+
+    def start(self) -> int:
+        """
+        Serves on a background thread, returns the bound port
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        self.ready.wait()
+        return self.port
+
+    def shutdown(self):
+        self.stopped.set()
+        if self.listener:
+            # Closing alone does not wake a blocked accept on Linux
+            try:
+                self.listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.listener.close()
+
+    def _serve_client(self, connection: socket.socket):
+        with connection:
+            buffer = b""
+            while True:
+                try:
+                    data = connection.recv(1024)
+                except OSError:
+                    return
+                if not data:
+                    return
+                buffer += data
+
+                while robot.TERMINATOR in buffer:
+                    line, buffer = buffer.split(robot.TERMINATOR, 1)
+                    for reply in self._execute(line.decode('utf-8').strip()):
+                        connection.sendall(reply.encode('utf-8') + robot.TERMINATOR)
+
+    def _execute(self, command: str):
+        # Yields one reply per step, stops at the first failed step
+        if command.startswith(robot.HOVER_COMMAND):
+            yield "success" if self._hover(command) else "failure"
+            return
+
+        if command.startswith(robot.BATCH_COMMAND):
+            _, count, steps = command.split(" ", 2)
+            steps = steps.split(robot.BATCH_SEPARATOR.strip())
+            if len(steps) != int(count):
+                yield "failure"
+                return
+        else:
+            steps = [command]
+
+        for step in steps:
+            success = self._step(step.strip())
+            yield "success" if success else "failure"
+            if not success:
+                return
+
+    def _step(self, step: str) -> bool:
+        with self.arm_lock:
+            began = time.monotonic()
+
+            if step == RESET_COMMAND:
+                duration = geometry.travel_time(self.arm, geometry.HOME)
+                end = geometry.HOME
+                success = True
+            else:
+                try:
+                    from_square, offset_x, offset_y, to_square = map(int, step.split())
+                    pick = geometry.offset_position(from_square, offset_x / 100, offset_y / 100)
+                    end = geometry.square_position(to_square)
+                except ValueError:
+                    logger.warning(f"Simulator rejected malformed step '{step}'")
+                    self._record(step, 0.0, False)
+                    return False
+
+                duration = geometry.step_time(self.arm, pick, end)
+                success = self.random.random() >= self.failure_rate
+
+            duration = max(0.0, duration + self.random.gauss(0, self.jitter)) * self.time_scale
+            time.sleep(duration)
+            if success:
+                self.arm = end
+
+            self._record(step, time.monotonic() - began, success)
+            return success
+
+    def _hover(self, command: str) -> bool:
+        with self.arm_lock:
+            began = time.monotonic()
+            try:
+                end = geometry.square_position(int(command.split()[1]))
+            except (IndexError, ValueError):
+                logger.warning(f"Simulator rejected malformed hover '{command}'")
+                self._record(command, 0.0, False)
+                return False
+
+            time.sleep(geometry.travel_time(self.arm, end) * self.time_scale)
+            self.arm = end
+            self._record(command, time.monotonic() - began, True)
+            return True
+
+    def _record(self, step: str, duration: float, success: bool):
+        if not self.trace:
+            return
+
+        entry = {"time": round(time.monotonic() - self.started, 4), "step": step, "duration": round(duration, 4),
+                 "success": success, "arm": [round(self.arm.x, 1), round(self.arm.y, 1)]}
+        self.trace.write(json.dumps(entry) + "\n")
+        self.trace.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulates the chess robot arm over its TCP protocol.")
+    parser.add_argument('--host', type=str, default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    parser.add_argument('--time_scale', type=float, default=1.0, help="Multiplier of modelled arm time, 0 answers at once.")
+    parser.add_argument('--failure_rate', type=float, default=0.0, help="Probability that a step fails.")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Standard deviation of added step latency in seconds.")
+    parser.add_argument('--trace', type=str, default=None, help="Optional JSON lines file recording every step.")
+    parser.add_argument('--seed', type=int, default=None, help="Seed of failures and jitter.")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(levelname)s:%(name)s:%(message)s', datefmt='%x %X', level=logging.INFO)
+
+    trace = open(args.trace, "a") if args.trace else None
+    simulator = RobotSimulator(args.host, args.port, args.time_scale, args.failure_rate, args.jitter, trace, args.seed)
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        simulator.shutdown()
+    finally:
+        if trace:
+            trace.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+from src.game import Game, ROBOT, HUMAN
+from src.engine_pool import EnginePool, PooledEngine, POOL_SIZE
+from src.difficulty import DEFAULT_LEVEL
+from src.ponder import Ponderer
+from src.robot_queue import RobotQueue
+from src.preposition import Prepositioner
+
+from dev.board import EngineBoardDetection
+from dev.robot import patch_communication
+from dev.engine import stockfish_path
+from dev.robot_sim import RobotSimulator
+from src import robot
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import logging
+import argparse
+import time
+
+# Plies after which a simulated game is stopped
+MAX_PLIES = 200
+
+def play_game(pool: EnginePool, depth: int, level: int, preposition: bool = False) -> tuple[str, int, Optional[Prepositioner]]:
+    """
+    Robot against the engine playing the human side, returns the result, plies played and arm prepositioning stats
+    """
+    detection = EngineBoardDetection(PooledEngine(pool), depth=depth)
+    if preposition:
+        # Predictions come from pondering, moves go through the queue like on the station
+        engine = PooledEngine(pool)
+        robot_queue = RobotQueue()
+        prepositioner = Prepositioner(robot_queue)
+        game = Game(detection, engine, level=level, ponderer=Ponderer(engine), robot_queue=robot_queue, prepositioner=prepositioner)
+    else:
+        robot_queue = prepositioner = None
+        game = Game(detection, PooledEngine(pool), level=level)
+    detection.attach_game(game)
+
+    try:
+        while game.result() == "*" and len(game.board.move_stack) < MAX_PLIES:
+            if game.player == ROBOT:
+                game.robot_makes_move()
+            elif game.player == HUMAN:
+                game.player_made_move()
+    finally:
+        if game.ponderer:
+            game.ponderer.cancel()
+        if robot_queue:
+            robot_queue.close()
+
+    return game.result(), len(game.board.move_stack), prepositioner
+
+def main(games: int, engines: int, depth: int, level: int, engine_path: Optional[str], robot_sim: bool, time_scale: float, preposition: bool):
+    logging.basicConfig(format='%(asctime)s %(levelname)s:%(name)s:%(message)s', datefmt='%x %X', level=logging.WARNING)
+    if robot_sim:
+        simulator = RobotSimulator(port=0, time_scale=time_scale)
+        robot.setup_communication('127.0.0.1', simulator.start(), batch=True)
+    else:
+        patch_communication()
+
+    with EnginePool.popen_uci(stockfish_path(engine_path), size=engines) as pool:
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=games) as executor:
+            results = list(executor.map(lambda _: play_game(pool, depth, level, preposition), range(games)))
+        elapsed = time.perf_counter() - began
+
+        plies = sum(count for _, count, _ in results)
+        print(f"{games} games, {plies} plies on {engines} engines in {elapsed:.2f} s ({plies / elapsed:.1f} plies/s), "
+              f"results {[result for result, _, _ in results]}, engine restarts {pool.restarts}")
+
+        if preposition:
+            prepositioners = [prepositioner for _, _, prepositioner in results]
+            hits = sum(prepositioner.hits for prepositioner in prepositioners)
+            misses = sum(prepositioner.misses for prepositioner in prepositioners)
+            saved = sum(prepositioner.saved for prepositioner in prepositioners)
+            rate = hits / (hits + misses) if hits + misses else 0.0
+            print(f"Arm prepositioning hits {hits}, misses {misses} ({rate:.0%}), modelled arm time saved {saved:.1f} s")
+
+        if robot_sim:
+            stats = robot.rtt_stats()
+            print(f"Robot commands {stats['count']}, round trip p50 {stats['p50'] * 1000:.1f} ms, p99 {stats['p99'] * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays simulated games in parallel on an engine pool.")
+
+    parser.add_argument('--games', type=int, default=4, help="Number of games played at once.")
+    parser.add_argument('--engines', type=int, default=POOL_SIZE, help="Number of engine processes.")
+    parser.add_argument('--depth', type=int, default=4, help="Search depth of the simulated human.")
+    parser.add_argument('--level', type=int, default=DEFAULT_LEVEL, help="Robot difficulty level.")
+    parser.add_argument('--engine_path', type=str, default=None, help="The optional path to the engine.")
+    parser.add_argument('--robot_sim', action='store_true', help="Move pieces on a local robot simulator.")
+    parser.add_argument('--time_scale', type=float, default=0.01, help="Multiplier of the simulated arm time.")
+    parser.add_argument('--preposition', action='store_true', help="Hover the arm over predicted robot moves, predictions come from pondering.")
+
+    args = parser.parse_args()
+    main(games=args.games, engines=args.engines, depth=args.depth, level=args.level, engine_path=args.engine_path, robot_sim=args.robot_sim, time_scale=args.time_scale, preposition=args.preposition)
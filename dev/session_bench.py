@@ -0,0 +1,68 @@
+from src.async_engine import SyncEngine
+from src.engine_pool import DEFAULT_HASH, DEFAULT_THREADS
+
+from dev.engine import stockfish_path
+
+from typing import Optional
+import chess
+import chess.engine
+import numpy as np
+import argparse
+import time
+
+def game_positions(engine: SyncEngine, plies: int, depth: int) -> list[chess.Board]:
+    """
+    Positions of one engine self-play game, as the robot meets them every second ply
+    """
+    board = chess.Board()
+    positions = []
+
+    while len(board.move_stack) < plies and not board.is_game_over():
+        positions.append(board.copy())
+        board.push(engine.play(board, chess.engine.Limit(depth=depth)).move)
+
+    return positions[::2]
+
+def time_to_depth(engine: SyncEngine, positions: list[chess.Board], depth: int, session: bool) -> list[float]:
+    """
+    Search time per position, either in one game session or as a new game every time
+    """
+    game = object()
+    times = []
+
+    for board in positions:
+        if not session:
+            # Previous behaviour of a cold engine, "ucinewgame" clears the hash table
+            game = object()
+
+        began = time.perf_counter()
+        engine.analyse(board, chess.engine.Limit(depth=depth), game=game)
+        times.append(time.perf_counter() - began)
+
+    return times
+
+def main(engine_path: Optional[str], plies: int, depth: int, hash_size: int, threads: int):
+    engine = SyncEngine.popen_uci(stockfish_path(engine_path))
+    try:
+        engine.configure({"Hash": hash_size, "Threads": threads})
+        positions = game_positions(engine, plies, depth)
+
+        for session in (False, True):
+            times = time_to_depth(engine, positions, depth, session)
+            p50, p99 = np.percentile(times, [50, 99]) * 1000
+            print(f"{'session' if session else 'stateless':<9} {len(times)} positions to depth {depth}: "
+                  f"total {sum(times):.2f} s, p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+    finally:
+        engine.quit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares engine time to depth with and without a per-game session.")
+
+    parser.add_argument('--engine_path', type=str, default=None, help="The optional path to the engine.")
+    parser.add_argument('--plies', type=int, default=60, help="Length of the replayed game.")
+    parser.add_argument('--depth', type=int, default=18, help="Search depth per position.")
+    parser.add_argument('--hash', type=int, default=DEFAULT_HASH, help="Engine hash table size in MB.")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help="Search threads.")
+
+    args = parser.parse_args()
+    main(engine_path=args.engine_path, plies=args.plies, depth=args.depth, hash_size=args.hash, threads=args.threads)
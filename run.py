@@ -1,27 +1,50 @@
 from src.robot import setup_communication
 from src.camera import CameraBoardDetection, default_camera_setup
+from src.inference import InferenceClient
+from src.inference_server import RemoteDetector
 
 from src.gui import gui_main
 from src.game import Game
+from src.engine_cache import EngineCache
+from src.book import OpeningBook
+from src.ponder import Ponderer
+from src.multipv import MultiPVSearch
+from src.robot_queue import RobotQueue
+from src.graveyard import Graveyard
+from src.preposition import Prepositioner
+from src.engine_pool import EnginePool, PooledEngine, DEFAULT_HASH, DEFAULT_THREADS
 
-from ultralytics import YOLO
-import chess.engine
+from typing import Optional
 import logging
+import argparse
 
-def main():
+def main(inference_socket: Optional[str], book_path: Optional[str], engines: int, hash_size: int, threads: int, shared_search: bool, batch_commands: bool, preposition: bool, graveyard: bool):
     try:
         logging.basicConfig(format='%(asctime)s %(levelname)s:%(name)s:%(message)s', datefmt='%x %X', level=logging.INFO)
         
-        setup_communication()
+        setup_communication(batch=batch_commands)
 
-        model = YOLO("chess_200.pt")
+        if inference_socket:
+            # Model is held by a shared inference server
+            model = RemoteDetector(inference_socket)
+        else:
+            # Inference runs in a worker process to keep the GUI and robot I/O responsive
+            model = InferenceClient("chess_200.pt")
 
-        engine = chess.engine.SimpleEngine.popen_uci("stockfish")
+        # Searches can be cancelled when the player resigns, a crashed engine is restarted
+        engine = PooledEngine(EnginePool.popen_uci("stockfish", size=engines, options={"Hash": hash_size, "Threads": threads}))
         camera = default_camera_setup()
 
         detection = CameraBoardDetection(model, camera=camera)
 
-        game = Game(detection, engine)
+        book = OpeningBook(book_path) if book_path else None
+
+        robot_queue = RobotQueue()
+
+        # Positions repeat across games, engine answers and the graveyard inventory are kept on disk
+        game = Game(detection, engine, engine_cache=EngineCache(), book=book, ponderer=Ponderer(engine),
+                    shared_search=MultiPVSearch(engine) if shared_search else None, robot_queue=robot_queue,
+                    graveyard=Graveyard.load() if graveyard else None, prepositioner=Prepositioner(robot_queue) if preposition else None)
 
         gui_main(game)
 
@@ -29,4 +52,66 @@ def main():
         logging.exception(e)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Runs the chess robot station.")
+
+    parser.add_argument(
+        '--inference_socket',
+        type=str,
+        default=None,
+        help="Optional unix socket of a shared inference server (python -m src.inference_server serve)."
+    )
+
+    parser.add_argument(
+        '--book',
+        type=str,
+        default=None,
+        help="Optional polyglot opening book for robot moves."
+    )
+
+    parser.add_argument(
+        '--engines',
+        type=int,
+        default=1,
+        help="Number of engine processes."
+    )
+
+    parser.add_argument(
+        '--hash',
+        type=int,
+        default=DEFAULT_HASH,
+        help="Engine hash table size in MB, per engine process."
+    )
+
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=DEFAULT_THREADS,
+        help="Search threads per engine process."
+    )
+
+    parser.add_argument(
+        '--shared_search',
+        action='store_true',
+        help="Choose robot moves of every level from one MultiPV search per position."
+    )
+
+    parser.add_argument(
+        '--batch_commands',
+        action='store_true',
+        help="Send all steps of a move to the robot in one batched command, commands end with a newline."
+    )
+
+    parser.add_argument(
+        '--preposition',
+        action='store_true',
+        help="Hover the arm over the predicted robot move while the engine searches, needs robot hover support."
+    )
+
+    parser.add_argument(
+        '--graveyard',
+        action='store_true',
+        help="Put captured pieces on the nearest free off-board slot, needs robot support for all off-board squares."
+    )
+
+    args = parser.parse_args()
+    main(inference_socket=args.inference_socket, book_path=args.book, engines=args.engines, hash_size=args.hash, threads=args.threads, shared_search=args.shared_search, batch_commands=args.batch_commands, preposition=args.preposition, graveyard=args.graveyard)
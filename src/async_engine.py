@@ -0,0 +1,227 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Callable, Coroutine, Optional, Union
+import chess
+import chess.engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the engine process to start or quit
+STARTUP_TIMEOUT = 10
+
+class EngineCancelled(Exception):
+    pass
+
+class CancelToken:
+    """
+    Cancels engine commands that were started with it, e.g. when the player resigns
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.callbacks: list[Callable[[], None]] = []
+        self._cancelled = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self):
+        with self.lock:
+            self._cancelled = True
+            callbacks, self.callbacks = self.callbacks, []
+
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]):
+        with self.lock:
+            if not self._cancelled:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self.lock:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+
+class AsyncEngine:
+    """
+    UCI engine on the python-chess async API. Concurrent commands are queued
+    instead of preempting each other, each one can have a timeout and a cancel token.
+    """
+
+    def __init__(self, transport: asyncio.SubprocessTransport, protocol: chess.engine.UciProtocol) -> None:
+        self.transport = transport
+        self.protocol = protocol
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    async def popen_uci(cls, command: Union[str, list[str]], **popen_args) -> "AsyncEngine":
+        transport, protocol = await chess.engine.popen_uci(command, **popen_args)
+        return cls(transport, protocol)
+
+    async def play(self, board: chess.Board, limit: chess.engine.Limit, *, timeout: Optional[float] = None, token: Optional[CancelToken] = None, **kwargs) -> chess.engine.PlayResult:
+        return await self._run(lambda: self.protocol.play(board, limit, **kwargs), timeout, token)
+
+    async def analyse(self, board: chess.Board, limit: chess.engine.Limit, *, timeout: Optional[float] = None, token: Optional[CancelToken] = None, **kwargs):
+        return await self._run(lambda: self.protocol.analyse(board, limit, **kwargs), timeout, token)
+
+    async def analysis(self, board: chess.Board, limit: chess.engine.Limit, stop: asyncio.Event, started: Optional[Callable[[chess.engine.AnalysisResult], None]] = None, **kwargs) -> tuple[chess.engine.BestMove, list[chess.engine.InfoDict]]:
+        """
+        Runs until the limit is reached or stop is set, returns the best move and the last info of each line.
+        started gets the running analysis, whose info is updated as the engine sends it.
+        """
+        async with self.lock:
+            analysis = await self.protocol.analysis(board, limit, **kwargs)
+            if started:
+                started(analysis)
+            stopper = asyncio.ensure_future(stop.wait())
+            finished = asyncio.ensure_future(analysis.wait())
+
+            await asyncio.wait((stopper, finished), return_when=asyncio.FIRST_COMPLETED)
+            if not finished.done():
+                analysis.stop()
+            stopper.cancel()
+
+            return await finished, analysis.multipv
+
+    async def configure(self, options: chess.engine.ConfigMapping):
+        async with self.lock:
+            await self.protocol.configure(options)
+
+    async def ping(self):
+        async with self.lock:
+            await self.protocol.ping()
+
+    async def quit(self):
+        async with self.lock:
+            await self.protocol.quit()
+
+    async def _run(self, command: Callable[[], Coroutine[Any, Any, Any]], timeout: Optional[float], token: Optional[CancelToken]):
+        async with self.lock:
+            if token and token.cancelled:
+                raise EngineCancelled()
+
+            # Cancelling the task makes python-chess send "stop" to the engine
+            task = asyncio.ensure_future(command())
+            loop = asyncio.get_running_loop()
+
+            def cancel():
+                loop.call_soon_threadsafe(task.cancel)
+
+            if token:
+                token.add_callback(cancel)
+            try:
+                return await asyncio.wait_for(task, timeout)
+            except asyncio.CancelledError:
+                if token and token.cancelled:
+                    raise EngineCancelled()
+                raise
+            finally:
+                if token:
+                    token.remove_callback(cancel)
+
+class SyncAnalysis:
+    """
+    Blocking handle of a running analysis, mirrors chess.engine.SimpleAnalysisResult
+    """
+
+    def __init__(self, stop: asyncio.Event, loop: asyncio.AbstractEventLoop) -> None:
+        self.future: Optional[concurrent.futures.Future] = None
+        self.stop_event = stop
+        self.loop = loop
+        # Set on the event loop once the engine searches, python-chess keeps updating its info
+        self.running: Optional[chess.engine.AnalysisResult] = None
+        self.final: Optional[list[chess.engine.InfoDict]] = None
+
+    @property
+    def multipv(self) -> list[chess.engine.InfoDict]:
+        """
+        Last info of each line, also while the search is still running
+        """
+        if self.final is not None:
+            return self.final
+
+        running = self.running
+        if running is None:
+            return []
+        # Dict copies are atomic, the event loop thread keeps updating the originals
+        return [dict(info) for info in list(running.multipv)]
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.stop_event.set)
+
+    def wait(self) -> chess.engine.BestMove:
+        best, self.final = self.future.result()
+        return best
+
+    def _started(self, running: chess.engine.AnalysisResult):
+        self.running = running
+
+class SyncEngine:
+    """
+    Blocking facade over AsyncEngine for Game and board detection. The event loop
+    runs in its own thread, so commands can also be submitted and awaited later.
+    """
+
+    def __init__(self, engine: AsyncEngine, loop: asyncio.AbstractEventLoop, thread: threading.Thread) -> None:
+        self.engine = engine
+        self.loop = loop
+        self.thread = thread
+
+    @classmethod
+    def popen_uci(cls, command: Union[str, list[str]], **popen_args) -> "SyncEngine":
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        future = asyncio.run_coroutine_threadsafe(AsyncEngine.popen_uci(command, **popen_args), loop)
+        try:
+            engine = future.result(timeout=STARTUP_TIMEOUT)
+        except BaseException:
+            loop.call_soon_threadsafe(loop.stop)
+            raise
+
+        return cls(engine, loop, thread)
+
+    def submit_play(self, board: chess.Board, limit: chess.engine.Limit, **kwargs) -> concurrent.futures.Future:
+        # Board is copied, the caller may keep changing its own
+        return self._submit(self.engine.play(board.copy(), limit, **kwargs))
+
+    def play(self, board: chess.Board, limit: chess.engine.Limit, **kwargs) -> chess.engine.PlayResult:
+        return self._result(self.submit_play(board, limit, **kwargs))
+
+    def analyse(self, board: chess.Board, limit: chess.engine.Limit, **kwargs):
+        return self._result(self._submit(self.engine.analyse(board.copy(), limit, **kwargs)))
+
+    def analysis(self, board: chess.Board, limit: chess.engine.Limit, **kwargs) -> SyncAnalysis:
+        stop = asyncio.Event()
+        analysis = SyncAnalysis(stop, self.loop)
+        analysis.future = self._submit(self.engine.analysis(board.copy(), limit, stop, started=analysis._started, **kwargs))
+        return analysis
+
+    def configure(self, options: chess.engine.ConfigMapping):
+        self._result(self._submit(self.engine.configure(options)))
+
+    def ping(self, timeout: Optional[float] = None):
+        self._result(self._submit(self.engine.ping()), timeout=timeout)
+
+    def quit(self):
+        try:
+            self._result(self._submit(self.engine.quit()), timeout=STARTUP_TIMEOUT)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    def _submit(self, coroutine: Coroutine) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def _result(self, future: concurrent.futures.Future, timeout: Optional[float] = None):
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.CancelledError:
+            raise EngineCancelled()
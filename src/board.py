@@ -1,5 +1,6 @@
 import chess
-from typing import Optional, NamedTuple
+import numpy as np
+from typing import Optional, NamedTuple, Sequence, Union
 from abc import ABC, abstractmethod
 
 class SquareOffset(NamedTuple):
@@ -10,22 +11,66 @@ SQUARE_CENTER = SquareOffset(0, 0)
 
 # TODO: When perspective changes, offsets flip
 class RealBoard:
-    def __init__(self, board: Optional[chess.Board] = None, offsets: Optional[list[SquareOffset]] = None, perspective: chess.Color = chess.WHITE):
+    # Boards are created several times per polling cycle
+    __slots__ = ('chess_board', 'offsets', 'perspective')
+
+    def __init__(self, board: Optional[chess.Board] = None, offsets: Union[np.ndarray, Sequence[SquareOffset], None] = None, perspective: chess.Color = chess.WHITE):
         if board is None:
             board = chess.Board()
 
         if offsets is None:
-            offsets = [SQUARE_CENTER for _ in range(64)] 
+            offsets = np.zeros((64, 2), dtype=np.float32)
+        else:
+            offsets = np.asarray(offsets, dtype=np.float32).reshape(64, 2)
 
         self.chess_board = board
         self.offsets = offsets
         self.perspective = perspective
 
+    @classmethod
+    def from_pieces(cls, squares: Union[np.ndarray, Sequence[chess.Square]], pieces: Sequence[Optional[chess.Piece]], offsets: Optional[np.ndarray] = None, perspective: chess.Color = chess.WHITE) -> "RealBoard":
+        """
+        Builds a board from parallel square, piece and (N, 2) offset sequences in one step.
+        Later duplicates win, None pieces leave the square empty.
+        """
+        square_list = squares.tolist() if isinstance(squares, np.ndarray) else list(squares)
+        occupied_co = [chess.BB_EMPTY, chess.BB_EMPTY]
+        piece_masks = [chess.BB_EMPTY] * 7
+
+        placements = zip(square_list, pieces)
+        if len(set(square_list)) != len(square_list):
+            placements = dict(placements).items()
+
+        for square, piece in placements:
+            if piece is not None:
+                mask = chess.BB_SQUARES[square]
+                piece_masks[piece.piece_type] |= mask
+                occupied_co[piece.color] |= mask
+
+        board = chess.Board(None)
+        board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings = piece_masks[1:]
+        board.occupied_co[chess.WHITE] = occupied_co[chess.WHITE]
+        board.occupied_co[chess.BLACK] = occupied_co[chess.BLACK]
+        board.occupied = occupied_co[chess.WHITE] | occupied_co[chess.BLACK]
+        # Detection sees no history, kings and rooks on their home squares keep their castling rights
+        board.castling_rights = chess.BB_CORNERS
+        board.castling_rights = board.clean_castling_rights()
+
+        real_board = cls(board, perspective=perspective)
+        if offsets is not None and square_list:
+            real_board.set_offsets(squares, offsets)
+
+        return real_board
+
     def offset(self, square: chess.Square) -> SquareOffset:
-        return self.offsets[chess.square_rank(square) * 8 + chess.square_file(square)]
+        x, y = self.offsets[square]
+        return SquareOffset(float(x), float(y))
 
     def set_offset(self, square: chess.Square, offset: SquareOffset):
-        self.offsets[chess.square_rank(square) * 8 + chess.square_file(square)] = offset
+        self.offsets[square] = offset
+
+    def set_offsets(self, squares: Union[np.ndarray, Sequence[chess.Square]], offsets: np.ndarray):
+        self.offsets[squares] = offsets
 
     def remove_piece_at(self, square: chess.Square) -> Optional[chess.Piece]:
         piece = self.chess_board.remove_piece_at(square)
@@ -44,20 +89,50 @@ class RealBoard:
 
     def clear_board(self):
         self.chess_board.clear_board()
-        self.offsets = [SQUARE_CENTER for _ in range(64)]
+        self.offsets.fill(0)
 
     def __getattr__(self, name: str):
+        # Guard against recursion while slots are still unset (copy, pickle)
+        if name in RealBoard.__slots__:
+            raise AttributeError(name)
         return getattr(self.chess_board, name)
 
 
 class BoardDetection(ABC):
     @abstractmethod
-    def capture_board(self, perspective: chess.Color = chess.WHITE) -> Optional[RealBoard]:
+    def capture_board(self, perspective: chess.Color = chess.WHITE, after: Optional[float] = None) -> Optional[RealBoard]:
+        """
+        Stable board from frames exposed strictly after the time.monotonic() value after
+        """
         pass
 
-def boards_are_equal(board1: chess.Board, board2: chess.Board) -> bool:
-    for square in chess.SQUARES:
-        if board1.piece_at(square) != board2.piece_at(square):
-            return False
-    return True
+    def capture_frame(self, perspective: chess.Color = chess.WHITE, after: Optional[float] = None) -> Optional[RealBoard]:
+        """
+        Board of the first frame exposed strictly after after, without the stability check of capture_board.
+        Detections without frames of their own answer with a full capture.
+        """
+        return self.capture_board(perspective, after)
+
+def piece_masks(board: chess.BaseBoard) -> tuple[chess.Bitboard, ...]:
+    """
+    Piece placement as bitboards: one mask per piece type, then white and black occupancy
+    """
+    return (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+            board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK])
+
+def changed_squares(board1: chess.BaseBoard, board2: chess.BaseBoard) -> chess.Bitboard:
+    return ((board1.pawns ^ board2.pawns) | (board1.knights ^ board2.knights) | (board1.bishops ^ board2.bishops) |
+            (board1.rooks ^ board2.rooks) | (board1.queens ^ board2.queens) | (board1.kings ^ board2.kings) |
+            (board1.occupied_co[chess.WHITE] ^ board2.occupied_co[chess.WHITE]) |
+            (board1.occupied_co[chess.BLACK] ^ board2.occupied_co[chess.BLACK]))
+
+def board_diff(prev_board: chess.BaseBoard, current_board: chess.BaseBoard) -> tuple[chess.Bitboard, chess.Bitboard]:
+    """
+    Returns (disappeared, appeared) square masks. Disappeared squares were emptied,
+    appeared squares hold a new or different piece (e.g. captures).
+    """
+    changed = changed_squares(prev_board, current_board)
+    return changed & ~current_board.occupied, changed & current_board.occupied
 
+def boards_are_equal(board1: chess.BaseBoard, board2: chess.BaseBoard) -> bool:
+    return piece_masks(board1) == piece_masks(board2)
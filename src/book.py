@@ -0,0 +1,32 @@
+import random
+from typing import Iterable, Optional
+import chess
+import chess.polyglot
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Difficulty levels that pick book moves at random by weight,
+# other levels always play the most popular book move
+WEIGHTED_LEVELS = (1, 3)
+
+class OpeningBook:
+    def __init__(self, path: str, weighted_levels: Iterable[int] = WEIGHTED_LEVELS, rng: Optional[random.Random] = None) -> None:
+        self.reader = chess.polyglot.open_reader(path)
+        self.weighted_levels = set(weighted_levels)
+        self.random = rng if rng is not None else random.Random()
+        logger.info(f"Opened opening book {path}")
+
+    def choose(self, board: chess.Board, level: int) -> Optional[chess.Move]:
+        try:
+            if level in self.weighted_levels:
+                entry = self.reader.weighted_choice(board, random=self.random)
+            else:
+                entry = self.reader.find(board)
+        except IndexError:
+            return None
+
+        return entry.move
+
+    def close(self):
+        self.reader.close()
@@ -1,32 +1,92 @@
 import cv2
-from typing import Optional
+from typing import NamedTuple, Optional, Union, TYPE_CHECKING
 from pypylon import pylon
 import chess
-from ultralytics import YOLO
 import numpy as np
 import time
 from .aruco import detect_aruco_area
 from .board import RealBoard, BoardDetection, boards_are_equal
-from .image import crop_image_by_area, greyscale_to_board
+from .image import Detector, crop_image_by_area, greyscale_to_board
 import logging
 
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
 logger = logging.getLogger(__name__)
 
+FRAME_RATE = 5
+
+# Seconds between the exposures of the two frames capture_board compares
+STABILITY_INTERVAL = 0.3
+
+# Seconds after which the camera clock is latched again to follow drift
+CLOCK_RESYNC_INTERVAL = 60
+
+class Frame(NamedTuple):
+    image: np.ndarray
+    # time.monotonic() of the exposure, a lower bound from the receive time when the camera has no clock
+    timestamp: float
+
 def default_camera_setup():
     camera = pylon.InstantCamera(pylon.TlFactory.GetInstance().CreateFirstDevice())
     camera.Open()
 
     camera.AcquisitionFrameRateEnable.SetValue(True)
-    camera.AcquisitionFrameRate.SetValue(5)
+    camera.AcquisitionFrameRate.SetValue(FRAME_RATE)
     camera.ExposureAuto.SetValue('Continuous')
     camera.AcquisitionMode.SetValue("Continuous")
     camera.PixelFormat.SetValue("RGB8")
+
+    # Exposure timestamps travel with every frame where the camera supports chunks
+    try:
+        camera.ChunkModeActive.SetValue(True)
+        camera.ChunkSelector.SetValue("Timestamp")
+        camera.ChunkEnable.SetValue(True)
+    except Exception as e:
+        logger.info(f"Camera has no timestamp chunks: {e}")
+
     camera.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
 
     return camera
 
+class CameraClock:
+    """
+    Maps camera timestamp ticks to time.monotonic()
+    """
+
+    def __init__(self, offset: float, frequency: float) -> None:
+        self.offset = offset
+        self.frequency = frequency
+        self.latched_at = time.monotonic()
+
+    @classmethod
+    def latch(cls, camera: pylon.InstantCamera) -> Optional["CameraClock"]:
+        """
+        Reads the camera clock next to the host clock, None when the camera cannot latch it
+        """
+        try:
+            began = time.monotonic()
+            if hasattr(camera, "TimestampLatch"):
+                # USB cameras count nanoseconds
+                camera.TimestampLatch.Execute()
+                ticks = camera.TimestampLatchValue.GetValue()
+                frequency = 1e9
+            else:
+                camera.GevTimestampControlLatch.Execute()
+                ticks = camera.GevTimestampValue.GetValue()
+                frequency = camera.GevTimestampTickFrequency.GetValue()
+            host = (began + time.monotonic()) / 2
+        except Exception as e:
+            logger.info(f"Camera clock unavailable, frames are timed on receipt: {e}")
+            return None
+
+        return cls(host - ticks / frequency, frequency)
+
+    def to_host(self, ticks: int) -> float:
+        return self.offset + ticks / self.frequency
+
 class CameraBoardDetection(BoardDetection):
-    def __init__(self, model: YOLO, camera: Optional[pylon.InstantCamera] = None, timeout: int = 5000) -> None:
+    def __init__(self, model: Union["YOLO", Detector], camera: Optional[pylon.InstantCamera] = None, timeout: int = 5000) -> None:
         if camera:
             self.camera = camera
         else:
@@ -37,7 +97,14 @@ class CameraBoardDetection(BoardDetection):
         self.area = None
         self.board = None
 
-    def capture_image(self) -> Optional[np.ndarray]:
+        self.clock = CameraClock.latch(self.camera)
+        # With LatestImageOnly a frame received without a clock may be up to one interval old
+        self.frame_interval = 1 / FRAME_RATE
+
+    def capture_image(self, after: Optional[float] = None) -> Optional[Frame]:
+        """
+        First cropped frame exposed strictly after the time.monotonic() value after
+        """
         if not self.camera.IsGrabbing():
             logger.warning("Camera is not grabbing images")
             return 
@@ -50,6 +117,10 @@ class CameraBoardDetection(BoardDetection):
                 logger.warning("Failed to grab image from camera.")
                 continue
 
+            timestamp = self._frame_timestamp(grab_result)
+            if after is not None and timestamp <= after:
+                continue
+
             image = grab_result.Array
             image = self._preprocess_image(image)
             cropped_image = self._crop_image(image)
@@ -58,25 +129,51 @@ class CameraBoardDetection(BoardDetection):
                 logger.info('Waiting for image to be cropped')
                 time.sleep(1)
 
-        return cropped_image
+        return Frame(cropped_image, timestamp)
 
-    def capture_board(self, perspective: chess.Color = chess.WHITE) -> Optional[RealBoard]:
-        image1 = self.capture_image()
-        if not image1:
+    def capture_board(self, perspective: chess.Color = chess.WHITE, after: Optional[float] = None) -> Optional[RealBoard]:
+        frame1 = self.capture_image(after)
+        if frame1 is None:
             return
 
-        time.sleep(0.3)
-        image2 = self.capture_image()
-        if not image2:
+        frame2 = self.capture_image(frame1.timestamp + STABILITY_INTERVAL)
+        if frame2 is None:
             return
 
-        board1 = greyscale_to_board(image1, self.model, flip=perspective == chess.WHITE)
-        board2 = greyscale_to_board(image2, self.model, flip=perspective == chess.WHITE)
+        board1 = greyscale_to_board(frame1.image, self.model, flip=perspective == chess.WHITE)
+        board2 = greyscale_to_board(frame2.image, self.model, flip=perspective == chess.WHITE)
 
         if boards_are_equal(board1.chess_board, board2.chess_board):
             board2.perspective = perspective
             return board2
 
+    def capture_frame(self, perspective: chess.Color = chess.WHITE, after: Optional[float] = None) -> Optional[RealBoard]:
+        frame = self.capture_image(after)
+        if frame is None:
+            return
+
+        board = greyscale_to_board(frame.image, self.model, flip=perspective == chess.WHITE)
+        board.perspective = perspective
+        return board
+
+    def _frame_timestamp(self, grab_result) -> float:
+        if self.clock is None:
+            return time.monotonic() - self.frame_interval
+
+        if time.monotonic() - self.clock.latched_at > CLOCK_RESYNC_INTERVAL:
+            clock = CameraClock.latch(self.camera)
+            if clock is None:
+                # Keep the old mapping and retry after another interval, not on every frame
+                self.clock.latched_at = time.monotonic()
+            else:
+                self.clock = clock
+
+        try:
+            ticks = grab_result.ChunkTimestamp.Value
+        except Exception:
+            ticks = grab_result.TimeStamp
+        return self.clock.to_host(ticks)
+
     def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
         image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         return image
@@ -0,0 +1,121 @@
+from typing import Callable, Optional
+import chess
+import threading
+import logging
+from .game import Game, HUMAN, ROBOT
+
+logger = logging.getLogger(__name__)
+
+# Controller states, turns follow game.player
+HUMAN_TURN = HUMAN
+ROBOT_TURN = ROBOT
+FINISHED = 2
+STOPPED = 3
+# The game raised, nothing polls any more
+FAILED = 4
+
+STATE_NAMES = {HUMAN_TURN: "human turn", ROBOT_TURN: "robot turn", FINISHED: "finished", STOPPED: "stopped", FAILED: "failed"}
+
+# Seconds between captures right after the board changed
+MIN_POLL_INTERVAL = 0.05
+
+# Seconds between captures once the board has been still for a while
+MAX_POLL_INTERVAL = 1.0
+
+# Growth of the poll interval after each capture that saw no change
+POLL_BACKOFF = 1.5
+
+class GameController:
+    """
+    Plays a game on a worker thread, moving between turn states on board changes reported by detection.
+    Captures that see no change back the poll interval off, so waiting for a human costs next to no CPU.
+    """
+
+    def __init__(self,
+                 game: Game,
+                 on_state: Optional[Callable[[int], None]] = None,
+                 on_move: Optional[Callable[[chess.Move], None]] = None,
+                 min_interval: float = MIN_POLL_INTERVAL,
+                 max_interval: float = MAX_POLL_INTERVAL) -> None:
+        self.game = game
+        # Called from the worker thread, GUIs marshal to their own loop
+        self.on_state = on_state
+        self.on_move = on_move
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self.state: Optional[int] = None
+        self.interval = min_interval
+        self.polls = 0
+        self.stopped = threading.Event()
+        self.wake = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Ends the loop after the current capture or robot move, does not wait for it
+        """
+        self.stopped.set()
+        self.wake.set()
+
+    def join(self, timeout: Optional[float] = None):
+        if self.thread:
+            self.thread.join(timeout)
+
+    def notify(self):
+        """
+        Wakes an idle wait early, e.g. after the player resigned
+        """
+        self.wake.set()
+
+    def _run(self):
+        try:
+            while not self.stopped.is_set():
+                if self.game.result() != "*":
+                    self._enter(FINISHED)
+                    return
+
+                self._enter(ROBOT_TURN if self.game.player == ROBOT else HUMAN_TURN)
+                self.polls += 1
+
+                if self.game.player == ROBOT:
+                    move = self.game.robot_makes_move()
+                    changed = move is not None
+                else:
+                    move, changed = self.game.player_made_move()
+
+                if move is not None:
+                    self.interval = self.min_interval
+                    if self.on_move:
+                        self.on_move(move)
+                    continue
+
+                # An illegal move is a change too, the player is likely still at the board
+                if changed:
+                    self.interval = self.min_interval
+                self._wait()
+        except Exception as e:
+            logger.exception(e)
+            if not self.stopped.is_set():
+                self._enter(FAILED)
+        finally:
+            if self.stopped.is_set():
+                self._enter(STOPPED)
+
+    def _wait(self):
+        self.wake.wait(self.interval)
+        self.wake.clear()
+        self.interval = min(self.interval * POLL_BACKOFF, self.max_interval)
+
+    def _enter(self, state: int):
+        if state == self.state:
+            return
+
+        logger.info(f"Game {STATE_NAMES.get(self.state, 'started')} -> {STATE_NAMES[state]} ({self.polls} polls)")
+        self.state = state
+        if self.on_state:
+            self.on_state(state)
@@ -0,0 +1,107 @@
+from typing import NamedTuple
+import argparse
+import random
+import time
+import chess
+import chess.engine
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DifficultyProfile(NamedTuple):
+    name: str
+    # Stockfish "Skill Level", 0 - 20
+    skill: int
+    # Think time bound in seconds, nodes keep weak hosts from overrunning it
+    time: float
+    nodes: int
+    # Centipawns a move may lose against the best one when levels share one MultiPV search
+    loss_window: int
+
+    @property
+    def limit(self) -> chess.engine.Limit:
+        return chess.engine.Limit(time=self.time, nodes=self.nodes)
+
+    @property
+    def options(self) -> dict[str, int]:
+        return {"Skill Level": self.skill}
+
+# Profiles by the level the GUI selects
+DIFFICULTY_PROFILES = {
+    1: DifficultyProfile("beginner", skill=0, time=0.05, nodes=5_000, loss_window=300),
+    3: DifficultyProfile("intermediate", skill=5, time=0.1, nodes=50_000, loss_window=120),
+    6: DifficultyProfile("advanced", skill=12, time=0.3, nodes=300_000, loss_window=40),
+    10: DifficultyProfile("unbeatable", skill=20, time=1.0, nodes=2_000_000, loss_window=0),
+}
+
+DEFAULT_LEVEL = 3
+
+def difficulty_profile(level: int) -> DifficultyProfile:
+    """
+    Profile of the closest known level
+    """
+    closest = min(DIFFICULTY_PROFILES, key=lambda known: abs(known - level))
+    return DIFFICULTY_PROFILES[closest]
+
+def sample_positions(count: int, seed: int = 0, max_plies: int = 40) -> list[chess.Board]:
+    """
+    Positions reached by random play, repeatable through the seed
+    """
+    rng = random.Random(seed)
+    positions = []
+
+    while len(positions) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(0, max_plies)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+
+        if not board.is_game_over():
+            positions.append(board)
+
+    return positions
+
+def calibrate(engine, positions: list[chess.Board]) -> dict[int, tuple[float, float]]:
+    """
+    Measures robot move latency of every profile, returns level -> (p50, p99) in seconds
+    """
+    latencies = {}
+
+    for level, profile in DIFFICULTY_PROFILES.items():
+        samples = []
+        for board in positions:
+            began = time.perf_counter()
+            engine.play(board, profile.limit, options=profile.options)
+            samples.append(time.perf_counter() - began)
+
+        latencies[level] = tuple(np.percentile(samples, [50, 99]))
+
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures robot move latency of each difficulty profile on this host.")
+    parser.add_argument('--engine', type=str, default="stockfish", help="UCI engine command.")
+    parser.add_argument('--positions', type=int, default=50, help="Number of sampled positions per profile.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the sampled positions.")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(levelname)s:%(name)s:%(message)s', datefmt='%x %X', level=logging.INFO)
+
+    from .async_engine import SyncEngine
+
+    engine = SyncEngine.popen_uci(args.engine)
+    try:
+        latencies = calibrate(engine, sample_positions(args.positions, args.seed))
+    finally:
+        engine.quit()
+
+    for level, (p50, p99) in latencies.items():
+        profile = DIFFICULTY_PROFILES[level]
+        print(f"level {level:>2} {profile.name:<12} skill {profile.skill:>2}, budget {profile.time * 1000:.0f} ms / {profile.nodes} nodes: "
+              f"p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+import time
+from typing import Optional
+import chess
+import chess.engine
+import chess.polyglot
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "engine_cache.sqlite"
+
+# Size based eviction configuration
+MAX_CACHE_ENTRIES = 100000
+EVICTION_FRACTION = 0.1
+
+def limit_profile(limit: chess.engine.Limit, **settings) -> str:
+    """
+    Cache key part describing how a move was searched, e.g. "depth=4,Skill Level=4"
+    """
+    parts = [f"{name}={getattr(limit, name)}" for name in ("time", "depth", "nodes", "mate") if getattr(limit, name) is not None]
+    parts += [f"{name}={value}" for name, value in sorted(settings.items())]
+    return ",".join(parts)
+
+def _position_key(board: chess.Board) -> int:
+    # SQLite integers are signed 64 bit
+    key = chess.polyglot.zobrist_hash(board)
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+class EngineCache:
+    """
+    Persistent engine moves keyed by (zobrist hash, search profile), least recently used entries are evicted
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = MAX_CACHE_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Moves the engine had to search for
+        self.searches = 0
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS engine_moves (
+                position INTEGER NOT NULL,
+                profile TEXT NOT NULL,
+                move TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (position, profile)
+            )""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS engine_moves_last_used ON engine_moves (last_used)")
+        self.connection.commit()
+
+        self.entries, = self.connection.execute("SELECT COUNT(*) FROM engine_moves").fetchone()
+        logger.info(f"Engine cache {path} holds {self.entries} positions")
+
+    def get(self, board: chess.Board, profile: str) -> Optional[chess.Move]:
+        position = _position_key(board)
+
+        with self.lock:
+            row = self.connection.execute("SELECT move FROM engine_moves WHERE position = ? AND profile = ?", (position, profile)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connection.execute("UPDATE engine_moves SET last_used = ? WHERE position = ? AND profile = ?", (time.time(), position, profile))
+            self.connection.commit()
+
+        return chess.Move.from_uci(row[0])
+
+    def put(self, board: chess.Board, profile: str, move: chess.Move):
+        position = _position_key(board)
+
+        with self.lock:
+            cursor = self.connection.execute("INSERT OR REPLACE INTO engine_moves (position, profile, move, last_used) VALUES (?, ?, ?, ?)",
+                                             (position, profile, move.uci(), time.time()))
+            # Replacing a row reports it as inserted, recount occasionally instead
+            self.entries += cursor.rowcount
+
+            if self.entries > self.max_entries:
+                self._evict()
+
+            self.connection.commit()
+
+    def play(self, engine: chess.engine.SimpleEngine, board: chess.Board, limit: chess.engine.Limit, profile: Optional[str] = None, **kwargs) -> Optional[chess.Move]:
+        """
+        Read-through: returns the cached move or asks the engine and stores its answer,
+        kwargs are passed on to engine.play
+        """
+        if profile is None:
+            profile = limit_profile(limit)
+
+        move = self.get(board, profile)
+        if move is not None and move in board.legal_moves:
+            return move
+
+        self.searches += 1
+        move = engine.play(board, limit, **kwargs).move
+        if move is not None:
+            self.put(board, profile, move)
+        return move
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def _evict(self):
+        self.entries, = self.connection.execute("SELECT COUNT(*) FROM engine_moves").fetchone()
+        if self.entries <= self.max_entries:
+            return
+
+        evicted = self.entries - self.max_entries + int(self.max_entries * EVICTION_FRACTION)
+        self.connection.execute("DELETE FROM engine_moves WHERE rowid IN (SELECT rowid FROM engine_moves ORDER BY last_used LIMIT ?)", (evicted,))
+        self.entries -= evicted
+        logger.info(f"Evicted {evicted} least recently used engine cache entries")
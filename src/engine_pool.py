@@ -0,0 +1,197 @@
+import contextlib
+import threading
+import time
+from typing import Callable, Iterator, Optional, Union
+import chess
+import chess.engine
+import logging
+from .async_engine import SyncEngine, SyncAnalysis
+
+logger = logging.getLogger(__name__)
+
+# Engine processes started by default, enough for the robot and a simulated human
+POOL_SIZE = 2
+
+# Engine hash table size in MB and search threads of each process
+DEFAULT_HASH = 64
+DEFAULT_THREADS = 1
+
+# Seconds a checked out engine has to answer a ping before it is restarted
+HEALTH_TIMEOUT = 5
+
+# Errors after which an engine process is replaced
+ENGINE_FAILURES = (chess.engine.EngineTerminatedError, chess.engine.EngineError, TimeoutError)
+
+class EnginePool:
+    """
+    Several UCI engine processes, each checked out by one user at a time
+    """
+
+    def __init__(self, factory: Callable[[], SyncEngine], size: int = POOL_SIZE) -> None:
+        if size < 1:
+            raise ValueError(f"Engine pool needs at least one engine, got {size}")
+
+        self.factory = factory
+        self.size = size
+        self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)
+        self.idle: list[SyncEngine] = []
+        self.engines: list[SyncEngine] = []
+        self.restarts = 0
+        self.closed = False
+
+        for _ in range(size):
+            engine = factory()
+            self.engines.append(engine)
+            self.idle.append(engine)
+
+        logger.info(f"Engine pool started {size} engines")
+
+    @classmethod
+    def popen_uci(cls, command: Union[str, list[str]], size: int = POOL_SIZE, options: Optional[chess.engine.ConfigMapping] = None) -> "EnginePool":
+        def factory() -> SyncEngine:
+            engine = SyncEngine.popen_uci(command)
+            if options:
+                engine.configure(options)
+            return engine
+
+        return cls(factory, size)
+
+    def acquire(self, timeout: Optional[float] = None, prefer: Optional[SyncEngine] = None) -> SyncEngine:
+        """
+        Takes an idle engine, the preferred one if it is idle since its hash table
+        holds the caller's game. A dead or unresponsive engine is restarted first.
+        """
+        if self.closed:
+            raise RuntimeError("Engine pool is closed")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.available:
+            while not self.idle:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No idle engine in pool")
+                self.available.wait(remaining)
+
+            engine = prefer if prefer in self.idle else self.idle[0]
+            self.idle.remove(engine)
+
+        try:
+            engine.ping(timeout=HEALTH_TIMEOUT)
+        except ENGINE_FAILURES as e:
+            logger.warning(f"Engine failed health check ({e!r}), restarting")
+            engine = self._restart(engine)
+        except BaseException:
+            self._put_idle(engine)
+            raise
+
+        return engine
+
+    def release(self, engine: SyncEngine, failed: bool = False):
+        if failed:
+            try:
+                engine = self._restart(engine)
+            except Exception as e:
+                # Next checkout restarts it again
+                logger.exception(e)
+
+        self._put_idle(engine)
+
+    @contextlib.contextmanager
+    def checkout(self, timeout: Optional[float] = None, prefer: Optional[SyncEngine] = None) -> Iterator[SyncEngine]:
+        engine = self.acquire(timeout, prefer)
+        failed = False
+        try:
+            yield engine
+        except ENGINE_FAILURES:
+            failed = True
+            raise
+        finally:
+            self.release(engine, failed)
+
+    def close(self):
+        self.closed = True
+        with self.lock:
+            engines, self.engines = self.engines, []
+
+        for engine in engines:
+            self._quit(engine)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _put_idle(self, engine: SyncEngine):
+        with self.available:
+            self.idle.append(engine)
+            self.available.notify()
+
+    def _restart(self, engine: SyncEngine) -> SyncEngine:
+        self._quit(engine)
+        replacement = self.factory()
+
+        with self.lock:
+            self.engines = [replacement if e is engine else e for e in self.engines]
+            self.restarts += 1
+
+        logger.info(f"Engine restarted (restarts {self.restarts})")
+        return replacement
+
+    def _quit(self, engine: SyncEngine):
+        try:
+            engine.quit()
+        except Exception as e:
+            logger.debug(f"Engine did not quit cleanly ({e!r})")
+
+class PooledEngine:
+    """
+    Engine-like view of a pool, each command checks out an engine. Options are
+    sent with every command since the next command may run on another process,
+    the engine used last is preferred to keep its hash table warm.
+    """
+
+    def __init__(self, pool: EnginePool, options: Optional[chess.engine.ConfigMapping] = None) -> None:
+        self.pool = pool
+        self.options = dict(options or {})
+        self.last_engine: Optional[SyncEngine] = None
+
+    def configure(self, options: chess.engine.ConfigMapping):
+        self.options.update(options)
+
+    def play(self, board: chess.Board, limit: chess.engine.Limit, **kwargs) -> chess.engine.PlayResult:
+        return self._retry(lambda engine: engine.play(board, limit, **self._with_options(kwargs)))
+
+    def analyse(self, board: chess.Board, limit: chess.engine.Limit, **kwargs):
+        return self._retry(lambda engine: engine.analyse(board, limit, **self._with_options(kwargs)))
+
+    def analysis(self, board: chess.Board, limit: chess.engine.Limit, **kwargs) -> SyncAnalysis:
+        engine = self.pool.acquire(prefer=self.last_engine)
+        self.last_engine = engine
+        try:
+            analysis = engine.analysis(board, limit, **self._with_options(kwargs))
+        except BaseException:
+            self.pool.release(engine)
+            raise
+
+        # Engine goes back to the pool once the analysis is over. The callback runs on the
+        # engine's own event loop, which cannot quit it, a crash is caught by the next health check.
+        analysis.future.add_done_callback(lambda _: self.pool.release(engine))
+        return analysis
+
+    def _with_options(self, kwargs: dict) -> dict:
+        return {**kwargs, "options": {**self.options, **kwargs.get("options", {})}}
+
+    def _retry(self, command: Callable[[SyncEngine], object]):
+        # A crashed engine is restarted when returned, the command runs once more on a healthy one
+        try:
+            with self.pool.checkout(prefer=self.last_engine) as engine:
+                self.last_engine = engine
+                return command(engine)
+        except chess.engine.EngineTerminatedError as e:
+            logger.warning(f"Engine terminated during command ({e!r}), retrying")
+
+        with self.pool.checkout() as engine:
+            self.last_engine = engine
+            return command(engine)
@@ -1,25 +1,86 @@
 import chess
 import chess.engine
-from typing import Optional
-from .board import RealBoard, BoardDetection, boards_are_equal
+import chess.polyglot
+from typing import NamedTuple, Optional, Union
+from .board import RealBoard, BoardDetection, boards_are_equal, changed_squares
+from .engine_cache import EngineCache, limit_profile
+from .book import OpeningBook
+from .ponder import Ponderer
+from .difficulty import DifficultyProfile, difficulty_profile, DEFAULT_LEVEL
+from .multipv import MultiPVSearch
+from .robot_queue import RobotQueue
+from .graveyard import Graveyard
+from .preposition import Prepositioner
+from concurrent.futures import CancelledError
+from .async_engine import SyncEngine, CancelToken, EngineCancelled
+from .engine_pool import PooledEngine
 from . import robot
 from . import movement
+from . import reset_planner
+from . import geometry
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 HUMAN = 0
 ROBOT = 1
 
+# Seconds a queued robot move may take before it is given up
+ROBOT_MOVE_TIMEOUT = 60
+
+# Seconds the robot queue may need past a move's deadline to report it
+ROBOT_REPORT_GRACE = 5
+
+# Replans of a board reset whose verification capture still differs
+RESET_ATTEMPTS = 3
+
+# Captures during a reset that may detect no board, retried with backoff in seconds
+CAPTURE_ATTEMPTS = 20
+CAPTURE_DELAY = 0.05
+MAX_CAPTURE_DELAY = 1.0
+
+# Seconds after the arm cleared the board a robot move may stay unverified before full captures take over
+VERIFY_TIMEOUT = 3
+
+class MoveVerification(NamedTuple):
+    # Expected position, checked only on the squares the robot changed
+    board: chess.Board
+    squares: chess.Bitboard
+    # time.monotonic() at which the arm is clear of the board
+    after: float
+
 class Game:
     def __init__(self, 
                  detection: BoardDetection,
-                 engine: chess.engine.SimpleEngine,
+                 engine: Union[chess.engine.SimpleEngine, SyncEngine, PooledEngine],
                  perspective: chess.Color = chess.WHITE,
-                 depth: int = 4) -> None:
+                 level: int = DEFAULT_LEVEL,
+                 max_reconcile_plies: int = movement.MAX_RECONCILE_PLIES,
+                 engine_cache: Optional[EngineCache] = None,
+                 book: Optional[OpeningBook] = None,
+                 ponderer: Optional[Ponderer] = None,
+                 shared_search: Optional[MultiPVSearch] = None,
+                 robot_queue: Optional[RobotQueue] = None,
+                 graveyard: Optional[Graveyard] = None,
+                 prepositioner: Optional[Prepositioner] = None) -> None:
         self.detection = detection
-        self.depth = depth
         self.engine = engine
+        self.engine_cache = engine_cache
+        self.book = book
+        self.ponderer = ponderer
+        self.shared_search = shared_search
+        self.robot_queue = robot_queue
+        self.graveyard = graveyard
+        self.prepositioner = prepositioner
+        self.max_reconcile_plies = max_reconcile_plies
+
+        # Robot move sources
+        self.in_book = book is not None
+        # (zobrist hash, move) of the last book draw, shared by the arm prediction and the move played
+        self.book_choice: Optional[tuple[int, Optional[chess.Move]]] = None
+        self.book_moves = 0
+        self.engine_calls = 0
 
         self.board = RealBoard(perspective=perspective)
 
@@ -28,7 +89,19 @@ class Game:
         else:
             self.player = ROBOT
 
+        self.set_difficulty(level)
+
         self.resigned = False
+        # Interrupts the robot's search when the player resigns
+        self.cancel_token = CancelToken()
+        # Game identity for the engine, "ucinewgame" clears its hash table only when this changes
+        self.engine_session = object()
+        # Moves the robot played or would play by position, the only robot plies reconciliation may assume
+        self.robot_moves: dict[int, chess.Move] = {}
+        self.verification: Optional[MoveVerification] = None
+        self.arm_clear_at = 0.0
+        # Captures only use frames exposed after this time.monotonic(), set after robot commands and human moves
+        self.frames_after: Optional[float] = None
         robot.reset_state()
 
     def reset_board(self, 
@@ -52,15 +125,30 @@ class Game:
             self.player = ROBOT
 
         self.resigned = False
+        self.cancel_token = CancelToken()
+        self.engine_session = object()
+        self.in_book = self.book is not None
+        self.book_choice = None
+        self.robot_moves = {}
+        self.verification = None
         robot.reset_state()
+        if self.prepositioner:
+            self.prepositioner.reset()
+        self._start_pondering()
+
+    def set_difficulty(self, level: int = DEFAULT_LEVEL):
+        # Prepared responses were searched with the previous profile
+        if self.ponderer:
+            self.ponderer.cancel()
 
-    def set_depth(self, depth: int = 4):
-        # FIXME: Does not work, rename method, fix logic
-        self.depth = depth
-        self.engine.configure({"Skill Level": depth})
+        self.level = level
+        self.book_choice = None
+        self.difficulty: DifficultyProfile = difficulty_profile(level)
+        self.engine.configure(self.difficulty.options)
+        logger.info("Difficulty set to %s (skill %d, %.2f s / %d nodes)", self.difficulty.name, self.difficulty.skill, self.difficulty.time, self.difficulty.nodes)
 
     def robot_makes_move(self, move: Optional[chess.Move] = None) -> Optional[chess.Move]:
-        new_board = self.detection.capture_board(perspective=self.board.perspective)
+        new_board = self.detection.capture_board(perspective=self.board.perspective, after=self.frames_after)
         if not new_board:
             return
 
@@ -69,38 +157,71 @@ class Game:
             return 
 
         if move is None:
-            result = self.engine.play(self.board.chess_board, chess.engine.Limit(depth=self.depth))
-            move = result.move
+            try:
+                move = self._engine_move()
+            except EngineCancelled:
+                logger.info("Robot search cancelled")
+                return
 
         if not move or not self.validate_move(move):
             logger.error("Invalid robot move: %s", move.uci() if move else '')
             return 
 
         self.board.offsets = new_board.offsets
-        response = movement.reflect_move(self.board, move)
+        response = self._reflect_move(move)
         if response != robot.COMMAND_SUCCESS:
             return
         
+        previous_board = self.board.chess_board.copy(stack=False)
+        self.robot_moves[chess.polyglot.zobrist_hash(previous_board)] = move
         self.player = HUMAN
         self.board.push(move)
         logger.info("Robot made move %s", move.uci())
+
+        # The next human poll checks the moved squares once the arm is out of view
+        self.verification = MoveVerification(self.board.chess_board.copy(stack=False),
+                                             changed_squares(previous_board, self.board.chess_board), self.arm_clear_at)
+        self.frames_after = self.arm_clear_at
+
+        # Queued moves started pondering while the arm moved
+        if not self.robot_queue:
+            self._start_pondering()
         return move
     
     def player_made_move(self) -> tuple[Optional[chess.Move], bool]:
-        new_board = self.detection.capture_board(perspective=self.board.perspective)
+        if self.verification and not self._verify_robot_move():
+            return None, False
+
+        # One frame showing the known board means no move, the stability check is for changes
+        frame = self.detection.capture_frame(perspective=self.board.perspective, after=self.frames_after)
+        if frame is not None and boards_are_equal(frame.chess_board, self.board.chess_board):
+            return None, False
+
+        new_board = self.detection.capture_board(perspective=self.board.perspective, after=self.frames_after)
         if not new_board:
             return None, False
 
-        move = movement.identify_move(self.board.chess_board, new_board.chess_board)
+        move = movement.match_move(self.board.chess_board, new_board.chess_board)
         if not move:
-            return None, False
+            # Camera may have missed intermediate board states
+            move = self._reconcile(new_board)
+            if move:
+                return move, True
 
-        if not self.validate_move(move):
+            # Distinguish an illegal move from no move at all
+            if not movement.identify_move(self.board.chess_board, new_board.chess_board):
+                return None, False
+
+            nearest = movement.nearest_moves(self.board.chess_board, new_board.chess_board)
+            logger.info("Detected illegal move, nearest legal moves: %s",
+                        ", ".join(f"{match.move.uci()} ({match.distance})" for match in nearest))
             return None, True
 
         self.player = ROBOT
         self.board.push(move, to_offset=new_board.offset(move.to_square))
+        self.frames_after = time.monotonic()
         logger.info(f"Player made move {move.uci()}")
+        self._preposition_arm()
         return move, True
 
     def validate_move(self, move: Optional[chess.Move]) -> bool:
@@ -116,24 +237,271 @@ class Game:
     
     def resign_player(self):
         self.resigned = True
+        self.cancel_token.cancel()
+        if self.robot_queue:
+            self.robot_queue.cancel_pending()
+        if self.ponderer:
+            self.ponderer.cancel()
+        if self.prepositioner:
+            self.prepositioner.discard()
 
     def chess_board(self) -> chess.Board:
         return self.board.chess_board
 
+    def _engine_move(self) -> Optional[chess.Move]:
+        if self.in_book:
+            move = self._book_move()
+            if move:
+                self.book_moves += 1
+                logger.info("Robot plays book move %s (book moves %d, engine calls %d)", move.uci(), self.book_moves, self.engine_calls)
+                return move
+
+            # Engine takes over for the rest of the game once the position leaves the book
+            self.in_book = False
+
+        # Prepared responses are per profile, the shared search is not pondered
+        if self.ponderer and not self.shared_search:
+            move = self.ponderer.take(self.board.chess_board)
+            if move:
+                return move
+
+        return self._search(self.board.chess_board)
+
+    def _search(self, board: chess.Board) -> Optional[chess.Move]:
+        if self.shared_search:
+            # Level picks among the moves of one search, its own cache replaces the engine cache
+            searches = self.shared_search.misses
+            move = self.shared_search.choose(board, self.difficulty, **self._engine_kwargs())
+            self.engine_calls += self.shared_search.misses - searches
+            return move
+
+        limit = self.difficulty.limit
+        profile = limit_profile(limit, **self.difficulty.options)
+
+        if self.engine_cache:
+            searches = self.engine_cache.searches
+            move = self.engine_cache.play(self.engine, board, limit, profile, **self._engine_kwargs())
+            self.engine_calls += self.engine_cache.searches - searches
+            return move
+
+        self.engine_calls += 1
+        return self.engine.play(board, limit, **self._engine_kwargs()).move
+
+    def _book_move(self) -> Optional[chess.Move]:
+        # Weighted levels draw at random, one draw per position keeps the prediction and the move the same
+        key = chess.polyglot.zobrist_hash(self.board.chess_board)
+        if self.book_choice is None or self.book_choice[0] != key:
+            self.book_choice = (key, self.book.choose(self.board.chess_board, self.level))
+        return self.book_choice[1]
+
+    def _engine_kwargs(self) -> dict:
+        if isinstance(self.engine, (SyncEngine, PooledEngine)):
+            return {"game": self.engine_session, "token": self.cancel_token}
+
+        # Blocking engine cannot be interrupted
+        return {"game": self.engine_session}
+
+    def _reconcile(self, new_board: RealBoard) -> Optional[chess.Move]:
+        """
+        Catches up with several missed human plies, returns the last one
+        """
+        try:
+            moves = movement.reconcile_moves(self.board.chess_board, new_board.chess_board, self.max_reconcile_plies, self._reconcile_candidates)
+        except EngineCancelled:
+            logger.info("Reconciliation search cancelled")
+            return None
+        if not moves:
+            return None
+
+        for move in moves:
+            self.board.push(move, to_offset=new_board.offset(move.to_square))
+        self.frames_after = time.monotonic()
+
+        if self.board.turn == self.board.perspective:
+            self.player = HUMAN
+        else:
+            self.player = ROBOT
+
+        logger.warning("Recovered missed moves %s", " ".join(move.uci() for move in moves))
+        self._start_pondering()
+        return moves[-1]
+
+    def _reconcile_candidates(self, board: chess.Board) -> list[chess.Move]:
+        # A human playing the robot's side is not a missed move
+        if board.turn == self.board.perspective:
+            return list(board.legal_moves)
+
+        key = chess.polyglot.zobrist_hash(board)
+        if key not in self.robot_moves:
+            # Only positions that survived the reachability pruning of the search get here
+            self.robot_moves[key] = self._search(board)
+
+        move = self.robot_moves[key]
+        return [move] if move and board.is_legal(move) else []
+
+    def _reflect_move(self, move: chess.Move) -> int:
+        steps = movement.plan_move_steps(self.board, move, self.graveyard)
+        if steps is None:
+            return robot.COMMAND_FAILURE
+
+        issued_at = time.monotonic()
+        if not self.robot_queue:
+            response = movement.execute_steps(self.board, steps, self.graveyard)
+            self._save_graveyard()
+            self._track_arm(steps, issued_at)
+            return response
+
+        if self.prepositioner:
+            self.prepositioner.settle(steps)
+
+        future = self.robot_queue.submit(steps, self.board.perspective, timeout=ROBOT_MOVE_TIMEOUT)
+
+        # Work that does not need the arm in place runs while it moves
+        expected_board = self.board.chess_board.copy()
+        expected_board.push(move)
+        logger.info("Robot moving %s in %d steps", move.uci(), len(steps))
+        self._start_pondering(expected_board)
+
+        try:
+            completed = future.result(timeout=ROBOT_MOVE_TIMEOUT + ROBOT_REPORT_GRACE)
+        except (TimeoutError, CancelledError) as e:
+            logger.warning(f"Robot move {move.uci()} did not complete: {e!r}")
+            completed = 0
+
+        response = movement.apply_steps(self.board, steps, completed, self.graveyard)
+        self._save_graveyard()
+        self._track_arm(steps, issued_at)
+        if self.prepositioner:
+            self.prepositioner.moved(steps[:completed], self.board.perspective)
+        if response != robot.COMMAND_SUCCESS and self.ponderer:
+            self.ponderer.cancel()
+        return response
+
+    def _track_arm(self, steps: list[robot.MoveStep], issued_at: float):
+        if not steps:
+            # The arm did not move, it is wherever it was cleared before
+            return
+
+        # Replies of other commands or a mocked robot leave no usable completion time
+        completed_at = robot.last_completion()
+        if completed_at is None or completed_at < issued_at:
+            completed_at = time.monotonic()
+
+        place = geometry.perspective_position(steps[-1].to_square, self.board.perspective)
+        self.arm_clear_at = completed_at + geometry.board_exit_time(place)
+
+    def _verify_robot_move(self) -> bool:
+        verification = self.verification
+
+        # Frames from before the arm cleared the board may show it mid move
+        frame = self.detection.capture_frame(perspective=self.board.perspective, after=verification.after)
+        mismatched = changed_squares(frame.chess_board, verification.board) & verification.squares if frame else verification.squares
+        # A human reply already played on top of the robot move shows that it completed
+        if mismatched and frame and movement.match_move(verification.board, frame.chess_board):
+            mismatched = chess.BB_EMPTY
+
+        if not mismatched:
+            logger.info(f"Robot move verified {time.monotonic() - verification.after:.2f} s after the arm cleared the board")
+            self.verification = None
+            return True
+
+        if time.monotonic() > verification.after + VERIFY_TIMEOUT:
+            logger.warning("Robot move not verified on %s, falling back to full captures",
+                           " ".join(chess.square_name(square) for square in chess.scan_forward(mismatched)))
+            self.verification = None
+        return False
+
+    def _predicted_move(self) -> Optional[chess.Move]:
+        # Likely robot move known before the search ends
+        board = self.board.chess_board
+        if self.in_book and self.book:
+            move = self._book_move()
+            if move:
+                return move
+
+        if self.ponderer:
+            move = self.ponderer.predict(board)
+            if move:
+                return move
+
+        if self.shared_search:
+            candidates = self.shared_search.cached(board)
+            if candidates:
+                return candidates[0].move
+
+        return None
+
+    def _preposition_arm(self):
+        # Arm travel to the first pick overlaps the robot's search
+        if not self.prepositioner or self.resigned:
+            return
+
+        move = self._predicted_move()
+        steps = movement.plan_move_steps(self.board, move, self.graveyard) if move else None
+        if steps:
+            logger.info(f"Prepositioning arm for predicted move {move.uci()}")
+            self.prepositioner.hover(steps[0].from_square, self.board.perspective)
+
+    def _start_pondering(self, board: Optional[chess.Board] = None):
+        if board is None:
+            board = self.board.chess_board
+        human_to_move = board.turn == self.board.perspective
+
+        # Book moves need no search to prepare, the shared search is not prepared by pondering
+        if self.ponderer and not self.shared_search and human_to_move and not self.in_book and not self.resigned:
+            self.ponderer.start(board, self.difficulty.limit, game=self.engine_session)
+
     def _reshape_board(self, expected_board: RealBoard) -> int:
-        done = False
-        current_board = self.board
+        # Each attempt plans the whole reset from one capture and verifies it with the next
+        for attempt in range(RESET_ATTEMPTS + 1):
+            current_board = self._capture(expected_board.perspective)
+            if current_board is None:
+                logger.error(f"No board detected in {CAPTURE_ATTEMPTS} captures during reset")
+                return robot.COMMAND_FAILURE
+
+            if boards_are_equal(current_board.chess_board, expected_board.chess_board):
+                # Detected boards carry no history, only the piece offsets are taken from them
+                self.board = RealBoard(expected_board.chess_board, current_board.offsets, expected_board.perspective)
+                return robot.COMMAND_SUCCESS
 
-        while not done:
-            current_board = self.detection.capture_board(perspective=expected_board.perspective)
-            if not current_board:
+            if attempt == RESET_ATTEMPTS:
+                break
+
+            try:
+                steps = reset_planner.plan_reset(current_board, expected_board, self.graveyard)
+            except ValueError as e:
+                # The next capture may differ, e.g. after the player moved a piece
+                logger.warning(f"Reset attempt {attempt + 1} not planned: {e}")
                 continue
+            distance = reset_planner.travel_distance(steps, perspective=current_board.perspective)
+            logger.info(f"Reset plan of {len(steps)} moves, {distance:.0f} mm of arm travel")
 
-            response, done = movement.iter_reset_board(current_board, expected_board)
+            issued_at = time.monotonic()
+            response = movement.execute_steps(current_board, steps, self.graveyard)
+            self._save_graveyard()
             if response != robot.COMMAND_SUCCESS:
                 return response
 
-        self.board.chess_board = current_board.chess_board
-        self.board.offsets = current_board.offsets
-        return robot.COMMAND_SUCCESS
+            # Verification frames start once the arm is out of view
+            self._track_arm(steps, issued_at)
+            self.frames_after = self.arm_clear_at
+
+        logger.warning(f"Board still differs after {RESET_ATTEMPTS} reset attempts")
+        return robot.COMMAND_FAILURE
+
+    def _save_graveyard(self):
+        if self.graveyard:
+            self.graveyard.save()
+
+    def _capture(self, perspective: chess.Color) -> Optional[RealBoard]:
+        delay = CAPTURE_DELAY
+        for _ in range(CAPTURE_ATTEMPTS):
+            current_board = self.detection.capture_board(perspective=perspective, after=self.frames_after)
+            if current_board:
+                return current_board
+
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_CAPTURE_DELAY)
+
+        return None
     
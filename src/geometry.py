@@ -0,0 +1,106 @@
+import math
+from typing import NamedTuple
+import chess
+
+class Position(NamedTuple):
+    """
+    Arm position in millimetres, origin at the outer corner of a1, x along files
+    """
+    x: float
+    y: float
+
+# Board square edge in millimetres
+SQUARE_SIZE = 50.0
+
+# Off-board squares -1..-6 stand in a column left of the a file, -7..-12 right of the h file.
+# Graveyard slots -13..-32 fill the free ends of those columns and a second, outer column on each side.
+OFF_BOARD_GAP = 0.5
+OFF_BOARD_COUNT = 32
+LEGACY_OFF_BOARD_COUNT = 12
+EXTRA_SLOTS_PER_SIDE = 10
+
+# Arm timing model: travel speed, acceleration and settling per travel, gripping per pick or place
+ARM_SPEED = 250.0
+MOVE_OVERHEAD = 0.3
+GRIP_TIME = 0.8
+
+# Distance beyond the board edge at which the arm no longer hides squares from the camera
+ARM_CLEARANCE = 0.5 * SQUARE_SIZE
+
+# Where the arm rests after a reset
+HOME = Position(4 * SQUARE_SIZE, -2 * SQUARE_SIZE)
+
+def square_position(square: int) -> Position:
+    """
+    Centre of an on-board square (0..63) or off-board square (-1..-32)
+    """
+    if 0 <= square <= 63:
+        return Position((chess.square_file(square) + 0.5) * SQUARE_SIZE, (chess.square_rank(square) + 0.5) * SQUARE_SIZE)
+
+    if -OFF_BOARD_COUNT <= square < 0:
+        side, column, row = _off_board_slot(-square - 1)
+        offset = OFF_BOARD_GAP + 0.5 + column
+        x = -offset * SQUARE_SIZE if side == 0 else (8 + offset) * SQUARE_SIZE
+        return Position(x, (row + 0.5) * SQUARE_SIZE)
+
+    raise ValueError(f"Square {square} has no position")
+
+def _off_board_slot(index: int) -> tuple[int, int, int]:
+    # (side, column, row): side 0 is left of the a file, column 0 is next to the board
+    if index < LEGACY_OFF_BOARD_COUNT:
+        return index // 6, 0, index % 6 + 1
+
+    index -= LEGACY_OFF_BOARD_COUNT
+    side, slot = divmod(index, EXTRA_SLOTS_PER_SIDE)
+    if slot < 2:
+        return side, 0, 7 * slot
+    return side, 1, slot - 2
+
+def mirror_off_board(square: int) -> int:
+    """
+    Off-board square at the same place on the other side of the board, board squares are unchanged
+    """
+    if not -OFF_BOARD_COUNT <= square < 0:
+        return square
+
+    index = -square - 1
+    if index < LEGACY_OFF_BOARD_COUNT:
+        index = (index + 6) % LEGACY_OFF_BOARD_COUNT
+    else:
+        index = LEGACY_OFF_BOARD_COUNT + (index - LEGACY_OFF_BOARD_COUNT + EXTRA_SLOTS_PER_SIDE) % (2 * EXTRA_SLOTS_PER_SIDE)
+    return -index - 1
+
+def perspective_position(square: int, perspective: chess.Color = chess.WHITE) -> Position:
+    """
+    Position of a square as addressed in a game of perspective, black games mirror the off-board squares
+    """
+    return square_position(mirror_off_board(square) if perspective == chess.BLACK else square)
+
+def offset_position(square: int, offset_x: float = 0, offset_y: float = 0) -> Position:
+    # Offsets are fractions of half a square from its centre
+    center = square_position(square)
+    return Position(center.x + offset_x * SQUARE_SIZE / 2, center.y + offset_y * SQUARE_SIZE / 2)
+
+def distance(a: Position, b: Position) -> float:
+    return math.hypot(a.x - b.x, a.y - b.y)
+
+def travel_time(a: Position, b: Position) -> float:
+    if a == b:
+        return 0.0
+    return MOVE_OVERHEAD + distance(a, b) / ARM_SPEED
+
+def step_time(arm: Position, pick: Position, place: Position) -> float:
+    """
+    Seconds for the arm to reach a piece, pick it up and place it
+    """
+    return travel_time(arm, pick) + GRIP_TIME + travel_time(pick, place) + GRIP_TIME
+
+def board_exit_time(position: Position) -> float:
+    """
+    Seconds for the arm to leave the board area over its nearest edge
+    """
+    size = 8 * SQUARE_SIZE
+    inside = min(position.x, size - position.x, position.y, size - position.y) + ARM_CLEARANCE
+    if inside <= 0:
+        return 0.0
+    return MOVE_OVERHEAD + inside / ARM_SPEED
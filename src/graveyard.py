@@ -0,0 +1,116 @@
+from typing import Collection, Iterable, Optional
+import json
+import os
+import chess
+import logging
+from . import robot
+from . import geometry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRAVEYARD_PATH = "graveyard.json"
+
+# Pieces a new graveyard holds on their legacy off-board squares, promotions pick them up
+SPARE_PIECES = (chess.Piece(chess.QUEEN, chess.WHITE), chess.Piece(chess.QUEEN, chess.BLACK))
+
+def _physical(square: int, perspective: chess.Color) -> int:
+    # Off-board squares of black games are mirrored by robot.form_command
+    return geometry.mirror_off_board(square) if perspective == chess.BLACK else square
+
+class Graveyard:
+    """
+    Pieces standing on the off-board slots, keyed by the slot the robot receives.
+    Slots are chosen nearest to the board square they serve and the inventory persists across games.
+    """
+
+    def __init__(self, slots: Optional[dict[int, chess.Piece]] = None, path: Optional[str] = None) -> None:
+        if slots is None:
+            slots = {robot.off_board_square(piece.piece_type, piece.color): piece for piece in SPARE_PIECES}
+
+        self.slots = dict(slots)
+        self.path = path
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_GRAVEYARD_PATH) -> "Graveyard":
+        if not os.path.exists(path):
+            return cls(path=path)
+
+        try:
+            with open(path) as file:
+                data = json.load(file)
+            slots = {int(square): chess.Piece.from_symbol(symbol) for square, symbol in data["slots"].items()}
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable graveyard {path}: {e!r}")
+            return cls(path=path)
+
+        return cls(slots, path)
+
+    def save(self):
+        if not self.path:
+            return
+
+        data = {"slots": {str(square): piece.symbol() for square, piece in sorted(self.slots.items())}}
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(data, file)
+        os.replace(temporary, self.path)
+
+    def holding(self, piece: chess.Piece, perspective: chess.Color = chess.WHITE, exclude: Collection[int] = ()) -> list[int]:
+        """
+        Off-board squares of the perspective that hold piece
+        """
+        squares = [_physical(square, perspective) for square, held in self.slots.items() if held == piece]
+        return [square for square in squares if square not in exclude]
+
+    def empty(self, perspective: chess.Color = chess.WHITE, exclude: Collection[int] = ()) -> list[int]:
+        """
+        Off-board squares of the perspective that hold nothing
+        """
+        squares = [_physical(-index, perspective) for index in range(1, geometry.OFF_BOARD_COUNT + 1) if -index not in self.slots]
+        return [square for square in squares if square not in exclude]
+
+    def drop_slot(self, piece: chess.Piece, near: int, perspective: chess.Color = chess.WHITE, exclude: Collection[int] = ()) -> Optional[int]:
+        """
+        Empty slot closest to near, None when the graveyard is full
+        """
+        slot = _nearest(self.empty(perspective, exclude), near, perspective)
+        if slot is None:
+            # Stacking on a taken slot would lose track of the piece already there
+            logger.error(f"Graveyard is full, no slot for {piece.symbol()}")
+        return slot
+
+    def pickup_slot(self, piece: chess.Piece, near: int, perspective: chess.Color = chess.WHITE, exclude: Collection[int] = ()) -> int:
+        """
+        Slot holding piece closest to near, the legacy square of piece when none is known
+        """
+        slot = _nearest(self.holding(piece, perspective, exclude), near, perspective)
+        if slot is None:
+            logger.warning(f"No {piece.symbol()} known in the graveyard, picking from its legacy square")
+            return robot.off_board_square(piece.piece_type, piece.color)
+        return slot
+
+    def record(self, board: chess.BaseBoard, steps: Iterable[robot.MoveStep], perspective: chess.Color = chess.WHITE):
+        """
+        Updates occupancy with completed steps, board is the position before them
+        """
+        board = board.copy()
+        for step in steps:
+            if step.from_square >= 0:
+                piece = board.remove_piece_at(step.from_square)
+            else:
+                piece = self.slots.pop(_physical(step.from_square, perspective), None)
+
+            if piece is None:
+                continue
+
+            if step.to_square >= 0:
+                board.set_piece_at(step.to_square, piece)
+            else:
+                self.slots[_physical(step.to_square, perspective)] = piece
+
+def _nearest(squares: list[int], near: int, perspective: chess.Color) -> Optional[int]:
+    if not squares:
+        return None
+
+    position = geometry.perspective_position(near, perspective)
+    return min(squares, key=lambda square: geometry.distance(position, geometry.perspective_position(square, perspective)))
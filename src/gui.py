@@ -1,14 +1,14 @@
 import tkinter as tk
 from PIL import Image, ImageTk
 from .game import HUMAN, ROBOT
-import threading
+from .controller import GameController, FINISHED, FAILED
 import chess
 import logging
 
 logger = logging.getLogger(__name__)
 
 win_count = 0
-game_thread = None
+controller = None
 
 class ChessGUI:
     def __init__(self):
@@ -47,22 +47,9 @@ class ChessGUI:
                 y = (7 - row) * 80 + 40  # Centering the text within the square
                 self.canvas.create_text(x, y, text=self.piece_map[piece.symbol()], font=("Arial", 32), tags="pieces")
 
-    def move(self, coord):
-        move_str = coord
-        chess_move = self.parse_move(move_str)
-        if chess_move is not None:
-            self.make_move(chess_move)
-
-    def parse_move(self, move_str):
-        try:
-            from_square = chess.parse_square(move_str[:2])
-            to_square = chess.parse_square(move_str[2:])
-            return chess.Move(from_square, to_square)
-        except ValueError:
-            return None
-
-    def make_move(self, chess_move):
-        self.board.push(chess_move)
+    def sync(self, board: chess.Board):
+        # Game may push several moves at once when recovering missed ones
+        self.board = board.copy(stack=False)
         self.draw_board()
 def update_robot_win_count():
     global win_count
@@ -114,6 +101,7 @@ def show_wrong_move_msg():
     
 
 def clear_screen():
+    stop_game()
     for widget in root.winfo_children():
         if widget not in logo_widgets:
             widget.destroy()
@@ -179,34 +167,46 @@ def background():
     logo_widgets.append(count_label)
 
 
-def chess_engine_thread():
+def start_game():
+    global controller
     chess_gui = ChessGUI()
-    while True:
-        state = game.result()
-        root.after(0, update_turn)
+    current = None
+
+    def dispatch(callback, *args):
+        # Tk is not thread safe, callbacks run on its loop and are dropped once the game screen is left
+        root.after(0, lambda: None if current.stopped.is_set() else callback(*args))
 
-        if state != "*" or state == "resigned":
+    def on_state(state):
+        if state in (FINISHED, FAILED):
             print('Stopping game')
-            return show_game_result()
-        
+            dispatch(show_game_result)
+        else:
+            dispatch(update_turn)
 
-        valid_move = None
+    def on_move(move):
+        dispatch(chess_gui.sync, game.chess_board().copy(stack=False))
 
-        if game.player == ROBOT:
-            valid_move = game.robot_makes_move()
-            if valid_move is not None:
-                chess_gui.move(valid_move.uci())
-        elif game.player == HUMAN:
-            valid_move, detected_move = game.player_made_move()
-            if valid_move is not None:
-                chess_gui.move(valid_move.uci())
+    current = GameController(game, on_state=on_state, on_move=on_move)
+    controller = current
+    controller.start()
+
+def stop_game():
+    global controller
+    if controller:
+        controller.stop()
+        controller = None
+
+def resign_game():
+    game.resign_player()
+    if controller:
+        controller.notify()
 
 def select_level(level_value):
-    game.set_depth(level_value)
+    game.set_difficulty(level_value)
     color_screen()
 
         
-#in level screen: game.depth=level
+#in level screen: game.set_difficulty(level)
 def level_screen():
     clear_screen()
 
@@ -392,15 +392,12 @@ def game_screen():
     resign = Image.open("images/resign.png")
     resign = resign.resize((200, 100), Image.Resampling.LANCZOS)
     resign = ImageTk.PhotoImage(resign)
-    resign_button = tk.Button(root, image=resign, command=game.resign_player, borderwidth=0, highlightthickness=0, relief='flat', bg="#FFFFFF")
+    resign_button = tk.Button(root, image=resign, command=resign_game, borderwidth=0, highlightthickness=0, relief='flat', bg="#FFFFFF")
     resign_button.image = resign
     resign_button.place(x=20, y=screen_height - resign.height() - 50)
 
 
-
-    global game_thread
-    game_thread = threading.Thread(target=chess_engine_thread)
-    game_thread.start()
+    start_game()
 
 
 def gui_main(game_obj, fullscreen = True, splash = True):
@@ -420,3 +417,4 @@ def gui_main(game_obj, fullscreen = True, splash = True):
     level_screen()
 
     root.mainloop()
+    stop_game()
@@ -1,11 +1,16 @@
 import cv2
-from typing import NamedTuple, Optional
-from ultralytics import YOLO
+from typing import NamedTuple, Optional, Union, TYPE_CHECKING
+from functools import lru_cache
+from abc import ABC, abstractmethod
 import chess
 import chess.svg
 import numpy as np
 from .board import RealBoard, SquareOffset
 
+if TYPE_CHECKING:
+    # Stations using an inference server do not need ultralytics installed
+    from ultralytics import YOLO
+
 # Minimum piece detection confidence threshold
 THRESHOLD_CONFIDENCE = 0.5
 
@@ -18,30 +23,64 @@ class MappedSquare(NamedTuple):
     label: str
     confidence: float
 
+# Detection array columns: x1, y1, x2, y2, confidence, class id
+DETECTION_COLUMNS = 6
+
 # --- PIECE DETECTION ---
 
-def detect_greyscale(image: np.ndarray, model: YOLO) -> tuple[list, list[str], list[float]]:
+class Detector(ABC):
+    """
+    Runs piece detection somewhere other than the calling thread (e.g. worker process)
+    """
+
+    @property
+    @abstractmethod
+    def names(self) -> dict[int, str]:
+        pass
+
+    @abstractmethod
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        """Returns (N, DETECTION_COLUMNS) float32 detections for a greyscale image"""
+        pass
+
+def yolo_batch_detections(images: list[np.ndarray], model: "YOLO") -> list[np.ndarray]:
     # For greyscale
-    image = cv2.merge([image, image, image])
+    images = [cv2.merge([image, image, image]) for image in images]
+
+    results = model(images)
+    detections = []
+
+    for result in results:
+        boxes = result.boxes.xyxy.cpu().numpy()
+        confs = result.boxes.conf.cpu().numpy()
+        class_ids = result.boxes.cls.cpu().numpy()
+
+        detections.append(np.column_stack((boxes, confs, class_ids)).astype(np.float32).reshape(-1, DETECTION_COLUMNS))
+
+    return detections
+
+def yolo_detections(image: np.ndarray, model: "YOLO") -> np.ndarray:
+    return yolo_batch_detections([image], model)[0]
+
+def detect_pieces(image: np.ndarray, model: Union["YOLO", Detector]) -> np.ndarray:
+    if isinstance(model, Detector):
+        return model.detect(image)
+    return yolo_detections(image, model)
+
+def detect_greyscale(image: np.ndarray, model: Union["YOLO", Detector]) -> tuple[list, list[str], list[float]]:
+    detections = detect_pieces(image, model)
 
-    results = model(image)
     bbox = []
     label = []
     conf = []
 
     labels = model.names
-    
-    for result in results:
-        boxes = result.boxes.xyxy.cpu().numpy()
-        confs = result.boxes.conf.cpu().numpy()
-        class_ids = result.boxes.cls.cpu().numpy().astype(int)
-
-        for box, cf, class_id in zip(boxes, confs, class_ids):
-            if cf >= THRESHOLD_CONFIDENCE:
-                x1, y1, x2, y2 = map(int, box)
-                bbox.append([x1, y1, x2 - x1, y2 - y1])
-                label.append(labels[class_id])
-                conf.append(cf)
+
+    for x1, y1, x2, y2, cf, class_id in detections[detections[:, 4] >= THRESHOLD_CONFIDENCE]:
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        bbox.append([x1, y1, x2 - x1, y2 - y1])
+        label.append(labels[int(class_id)])
+        conf.append(float(cf))
     return bbox, label, conf
 
 # --- MAPPING TO SQUARES ---
@@ -83,48 +122,85 @@ def map_bboxes_to_squares(image: np.ndarray, bbox: list, label: list[str], confi
     return mapped_squares
 
 # --- MAPPING TO BOARD ---
+
+LABEL_PIECES = {
+    "black-bishop": chess.Piece(chess.BISHOP, chess.BLACK),
+    "black-king": chess.Piece(chess.KING, chess.BLACK),
+    "black-knight": chess.Piece(chess.KNIGHT, chess.BLACK),
+    "black-pawn": chess.Piece(chess.PAWN, chess.BLACK),
+    "black-queen": chess.Piece(chess.QUEEN, chess.BLACK),
+    "black-rook": chess.Piece(chess.ROOK, chess.BLACK),
+    "white-bishop": chess.Piece(chess.BISHOP, chess.WHITE),
+    "white-king": chess.Piece(chess.KING, chess.WHITE),
+    "white-knight": chess.Piece(chess.KNIGHT, chess.WHITE),
+    "white-pawn": chess.Piece(chess.PAWN, chess.WHITE),
+    "white-queen": chess.Piece(chess.QUEEN, chess.WHITE),
+    "white-rook": chess.Piece(chess.ROOK, chess.WHITE)
+}
+
 def map_squares_to_board(mapped_squares: list[MappedSquare], flip: bool = False) -> RealBoard:
-    board = RealBoard()
-    board.clear_board()
-    
-    for mapped_square in mapped_squares:
-        if flip:
-            chess_square = 63 - mapped_square.chess_square
-            offset = SquareOffset(-mapped_square.offset.x, -mapped_square.offset.y)
-        else:
-            chess_square = mapped_square.chess_square
-            offset = mapped_square.offset
-
-        piece = label_to_piece(mapped_square.label)
-        
-        # Place the piece on the board
-        board.set_piece_at(chess_square, piece, offset=offset)
-        
-    return board
+    if not mapped_squares:
+        return RealBoard.from_pieces([], [])
+
+    squares = np.fromiter((mapped_square.chess_square for mapped_square in mapped_squares), dtype=np.intp, count=len(mapped_squares))
+    offsets = np.array([mapped_square.offset for mapped_square in mapped_squares], dtype=np.float32)
+
+    if flip:
+        squares = 63 - squares
+        offsets = -offsets
+
+    pieces = [LABEL_PIECES.get(mapped_square.label) for mapped_square in mapped_squares]
+    return RealBoard.from_pieces(squares, pieces, offsets)
+
+def map_detections_to_board(image_shape: tuple[int, ...], detections: np.ndarray, pieces: tuple[Optional[chess.Piece], ...], flip: bool = False) -> RealBoard:
+    """
+    Vectorized map_bboxes_to_squares and map_squares_to_board for a (N, DETECTION_COLUMNS) array,
+    pieces is the class index -> piece table of the model
+    """
+    img_height, img_width = image_shape[:2]
+    square_size = np.array([img_width // 8, img_height // 8])
+
+    # Maximum possible distance from square center, as (x, y) columns like the corners
+    max_center_distance = square_size // 2
+
+    detections = detections[detections[:, 4] >= THRESHOLD_CONFIDENCE]
+    corners = detections[:, :4].astype(np.int64)
+    class_ids = detections[:, 5].astype(np.intp)
+
+    centers = (corners[:, :2] + corners[:, 2:]) // 2
+    cells = centers // square_size
+    distances = (centers - cells * square_size - max_center_distance) / max_center_distance
+
+    # Filter out pieces too far from the square center, outside the board or with unknown labels
+    keep = (np.abs(distances) <= THRESHOLD_DISTANCE).all(axis=1)
+    keep &= ((cells >= 0) & (cells < 8)).all(axis=1)
+    keep &= (class_ids >= 0) & (class_ids < len(pieces))
+
+    cells = cells[keep]
+    squares = cells[:, 1] * 8 + cells[:, 0]
+    offsets = distances[keep].astype(np.float32)
+
+    if flip:
+        squares = 63 - squares
+        offsets = -offsets
+
+    board_pieces = [pieces[class_id] for class_id in class_ids[keep].tolist()]
+    return RealBoard.from_pieces(squares, board_pieces, offsets)
 
 def label_to_piece(label: str) -> Optional[chess.Piece]:
-    piece_mapping = {
-        "black-bishop": chess.Piece(chess.BISHOP, chess.BLACK),
-        "black-king": chess.Piece(chess.KING, chess.BLACK),
-        "black-knight": chess.Piece(chess.KNIGHT, chess.BLACK),
-        "black-pawn": chess.Piece(chess.PAWN, chess.BLACK),
-        "black-queen": chess.Piece(chess.QUEEN, chess.BLACK),
-        "black-rook": chess.Piece(chess.ROOK, chess.BLACK),
-        "white-bishop": chess.Piece(chess.BISHOP, chess.WHITE),
-        "white-king": chess.Piece(chess.KING, chess.WHITE),
-        "white-knight": chess.Piece(chess.KNIGHT, chess.WHITE),
-        "white-pawn": chess.Piece(chess.PAWN, chess.WHITE),
-        "white-queen": chess.Piece(chess.QUEEN, chess.WHITE),
-        "white-rook": chess.Piece(chess.ROOK, chess.WHITE)
-    }
-
-    return piece_mapping.get(label)
-
-def greyscale_to_board(image: np.ndarray, model: YOLO, flip: bool = False) -> RealBoard:
-    bbox, label, conf = detect_greyscale(image, model)
-    mapped_squares = map_bboxes_to_squares(image, bbox, label, conf)
-
-    board = map_squares_to_board(mapped_squares, flip)
+    return LABEL_PIECES.get(label)
+
+@lru_cache(maxsize=None)
+def _piece_table(labels: tuple[str, ...]) -> tuple[Optional[chess.Piece], ...]:
+    return tuple(LABEL_PIECES.get(label) for label in labels)
+
+def piece_table(names: dict[int, str]) -> tuple[Optional[chess.Piece], ...]:
+    return _piece_table(tuple(names.get(index, "") for index in range(max(names, default=-1) + 1)))
+
+def greyscale_to_board(image: np.ndarray, model: Union["YOLO", Detector], flip: bool = False) -> RealBoard:
+    detections = detect_pieces(image, model)
+
+    board = map_detections_to_board(image.shape, detections, piece_table(model.names), flip)
     return board
 
 def crop_image_by_area(image: np.ndarray, area) -> np.ndarray:
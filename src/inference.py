@@ -0,0 +1,181 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import Future
+from typing import Optional
+import itertools
+import threading
+import queue
+import numpy as np
+import logging
+from .image import Detector, DETECTION_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Number of frame slots in the shared memory ring
+SLOT_COUNT = 4
+
+# Largest greyscale frame (height, width) a slot can hold
+MAX_FRAME_SHAPE = (1200, 1920)
+
+# Seconds to wait for the worker to load the model
+STARTUP_TIMEOUT = 120
+
+# Seconds a detection may take before the caller gives up
+DETECT_TIMEOUT = 10
+
+# Seconds between checks that the worker is still alive
+WATCH_INTERVAL = 0.5
+
+def load_yolo(model_path: str):
+    # Imported here so that only the worker process loads torch
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+def _worker_main(model_path: str, shm_name: str, slot_bytes: int, requests: mp.Queue, responses: mp.Queue, model_loader=load_yolo):
+    from .image import detect_pieces
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        model = model_loader(model_path)
+        responses.put((None, dict(model.names)))
+
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+
+            request_id, slot, shape = request
+            image = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+
+            try:
+                detections = detect_pieces(image, model)
+            except Exception as e:
+                logger.exception(e)
+                detections = np.empty((0, DETECTION_COLUMNS), dtype=np.float32)
+
+            # Drop the view before the next request reuses the slot
+            del image
+            responses.put((request_id, detections))
+    finally:
+        shm.close()
+
+class InferenceClient(Detector):
+    """
+    Runs YOLO inference in a separate process, frames are passed through shared memory slots.
+    Pending detections fail with a RuntimeError once the worker exits.
+    """
+
+    def __init__(self, model_path: str, slot_count: int = SLOT_COUNT, max_frame_shape: tuple[int, int] = MAX_FRAME_SHAPE, model_loader=load_yolo) -> None:
+        self.slot_bytes = max_frame_shape[0] * max_frame_shape[1]
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_count * self.slot_bytes)
+
+        self.free_slots: queue.Queue[int] = queue.Queue()
+        for slot in range(slot_count):
+            self.free_slots.put(slot)
+
+        # model_loader runs in the spawned worker, so it must be a module level function
+        self.pending: dict[int, Future] = {}
+        self.pending_lock = threading.Lock()
+        self.request_ids = itertools.count()
+        # Set once the worker is gone, later requests fail at once
+        self.failure: Optional[Exception] = None
+        self.closed = threading.Event()
+
+        # Spawn avoids forking Tk and camera threads into the worker
+        context = mp.get_context("spawn")
+        self.requests = context.Queue()
+        self.responses = context.Queue()
+        self.process = context.Process(target=_worker_main,
+                                       args=(model_path, self.shm.name, self.slot_bytes, self.requests, self.responses, model_loader),
+                                       daemon=True)
+        self.process.start()
+
+        _, self._names = self.responses.get(timeout=STARTUP_TIMEOUT)
+        logger.info(f"Inference worker started (pid {self.process.pid}) with {slot_count} frame slots")
+
+        self.receiver = threading.Thread(target=self._receive, daemon=True)
+        self.receiver.start()
+
+    @property
+    def names(self) -> dict[int, str]:
+        return self._names
+
+    def detect(self, image: np.ndarray, timeout: Optional[float] = DETECT_TIMEOUT) -> np.ndarray:
+        if image.ndim != 2 or image.size > self.slot_bytes:
+            raise ValueError(f"Frame of shape {image.shape} does not fit into inference slot")
+        if self.failure:
+            raise self.failure
+
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        try:
+            slot = self.free_slots.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free inference slot within {timeout} s")
+
+        view = np.ndarray(image.shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+        np.copyto(view, image)
+        del view
+
+        # Slot is reused only after the worker answered, even if the caller timed out
+        future = Future()
+        future.add_done_callback(lambda _: self.free_slots.put(slot))
+
+        with self.pending_lock:
+            if self.failure:
+                future.set_exception(self.failure)
+                return future.result()
+
+            request_id = next(self.request_ids)
+            self.pending[request_id] = future
+
+        self.requests.put((request_id, slot, image.shape))
+        return future.result(timeout=timeout)
+
+    def close(self):
+        if self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+
+        # Not signalled through the response queue, a killed worker may still hold its lock
+        self.closed.set()
+        self.receiver.join(timeout=5)
+
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _receive(self):
+        while not self.closed.is_set():
+            try:
+                response = self.responses.get(timeout=WATCH_INTERVAL)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    self._fail(RuntimeError(f"Inference worker exited with code {self.process.exitcode}"))
+                    return
+                continue
+
+            request_id, detections = response
+            with self.pending_lock:
+                future = self.pending.pop(request_id, None)
+
+            if future is not None:
+                future.set_result(detections)
+
+        self._fail(RuntimeError("Inference client closed"))
+
+    def _fail(self, failure: Exception):
+        with self.pending_lock:
+            self.failure = failure
+            pending, self.pending = self.pending, {}
+
+        if pending:
+            logger.error(f"{failure}, failing {len(pending)} pending detections")
+        for future in pending.values():
+            future.set_exception(failure)
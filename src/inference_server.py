@@ -0,0 +1,301 @@
+from concurrent.futures import Future
+from typing import Optional
+import collections
+import threading
+import argparse
+import socket
+import struct
+import queue
+import json
+import time
+import os
+import numpy as np
+import logging
+from .image import Detector, DETECTION_COLUMNS, yolo_batch_detections
+from .inference import DETECT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "/tmp/chess_inference.sock"
+
+# Dynamic batching configuration
+MAX_BATCH_SIZE = 8
+MAX_BATCH_WAIT = 0.02
+
+# Request header: frame height and width, followed by greyscale pixels
+REQUEST_HEADER = struct.Struct("!II")
+
+# Response header: detection rows, followed by float32 detections
+RESPONSE_HEADER = struct.Struct("!I")
+
+# Greeting header: length of the JSON encoded model class names
+NAMES_HEADER = struct.Struct("!I")
+
+def _recv_exactly(connection: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+
+    while received < size:
+        count = connection.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Inference connection closed")
+        received += count
+
+    return buffer
+
+class InferenceServer:
+    """
+    Holds one model and serves detection requests from many stations in dynamic batches
+    """
+
+    def __init__(self, model, socket_path: str = DEFAULT_SOCKET_PATH, max_batch_size: int = MAX_BATCH_SIZE, max_wait: float = MAX_BATCH_WAIT,
+                 request_timeout: float = DETECT_TIMEOUT) -> None:
+        self.model = model
+        self.socket_path = socket_path
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        # Seconds a request may wait for its batch before the station is dropped
+        self.request_timeout = request_timeout
+
+        self.names = json.dumps({int(k): v for k, v in model.names.items()}).encode('utf-8')
+        self.requests: queue.Queue[Optional[tuple[np.ndarray, Future]]] = queue.Queue()
+        self.batch_sizes: collections.Counter[int] = collections.Counter()
+        self.stopped = threading.Event()
+        self.listener = None
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        self.listener.listen()
+
+        batcher = threading.Thread(target=self._run_batches, daemon=True)
+        batcher.start()
+        logger.info(f"Inference server listening on {self.socket_path} (batch {self.max_batch_size}, wait {self.max_wait} s)")
+
+        try:
+            while not self.stopped.is_set():
+                try:
+                    connection, _ = self.listener.accept()
+                except OSError:
+                    break
+                threading.Thread(target=self._serve_client, args=(connection,), daemon=True).start()
+        finally:
+            self.requests.put(None)
+            batcher.join()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        self.stopped.set()
+        if self.listener:
+            # Closing alone does not wake a blocked accept on Linux
+            try:
+                self.listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.listener.close()
+
+    def _serve_client(self, connection: socket.socket):
+        logger.info("Station connected")
+        try:
+            connection.sendall(NAMES_HEADER.pack(len(self.names)) + self.names)
+
+            while True:
+                height, width = REQUEST_HEADER.unpack(_recv_exactly(connection, REQUEST_HEADER.size))
+                pixels = _recv_exactly(connection, height * width)
+                image = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width)
+
+                future = Future()
+                self.requests.put((image, future))
+                detections = future.result(timeout=self.request_timeout)
+
+                connection.sendall(RESPONSE_HEADER.pack(len(detections)))
+                connection.sendall(np.ascontiguousarray(detections, dtype=np.float32).data)
+        except ConnectionError:
+            logger.info("Station disconnected")
+        except TimeoutError:
+            logger.warning(f"Inference took over {self.request_timeout} s, dropping station")
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            connection.close()
+
+    def _run_batches(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+
+            # Collect more requests until the batch is full or the oldest request waited long enough
+            batch = [request]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                try:
+                    request = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+                if request is None:
+                    self.requests.put(None)
+                    break
+                batch.append(request)
+
+            self.batch_sizes[len(batch)] += 1
+
+            try:
+                results = yolo_batch_detections([image for image, _ in batch], self.model)
+            except Exception as e:
+                logger.exception(e)
+                results = [np.empty((0, DETECTION_COLUMNS), dtype=np.float32) for _ in batch]
+
+            for (_, future), detections in zip(batch, results):
+                future.set_result(detections)
+
+class RemoteDetector(Detector):
+    """
+    Detection client for a station, the model lives in the inference server
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: Optional[float] = DETECT_TIMEOUT) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.connection = None
+        self._names = {}
+        self._connect()
+
+    @property
+    def names(self) -> dict[int, str]:
+        return self._names
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+
+        with self.lock:
+            try:
+                return self._request(image)
+            except TimeoutError:
+                # A late reply would answer the next request, start over on a new connection
+                self.close()
+                raise
+            except OSError as e:
+                # Server restarted, retry once on a new connection
+                logger.warning(f"Inference request failed ({e}), reconnecting")
+                self._connect()
+                return self._request(image)
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _connect(self):
+        self.close()
+
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.settimeout(self.timeout)
+        self.connection.connect(self.socket_path)
+
+        length, = NAMES_HEADER.unpack(_recv_exactly(self.connection, NAMES_HEADER.size))
+        names = json.loads(_recv_exactly(self.connection, length).decode('utf-8'))
+        self._names = {int(k): v for k, v in names.items()}
+
+    def _request(self, image: np.ndarray) -> np.ndarray:
+        if self.connection is None:
+            self._connect()
+
+        self.connection.sendall(REQUEST_HEADER.pack(*image.shape))
+        self.connection.sendall(image.data)
+
+        rows, = RESPONSE_HEADER.unpack(_recv_exactly(self.connection, RESPONSE_HEADER.size))
+        data = _recv_exactly(self.connection, rows * DETECTION_COLUMNS * 4)
+        return np.frombuffer(data, dtype=np.float32).reshape(rows, DETECTION_COLUMNS)
+
+def run_load(socket_path: str, clients: int, requests: int, image: np.ndarray) -> list[float]:
+    """
+    Sends requests from several stations at once, returns request latencies in seconds
+    """
+    latencies: list[float] = []
+    latencies_lock = threading.Lock()
+    start = threading.Barrier(clients)
+
+    def station():
+        with RemoteDetector(socket_path) as detector:
+            start.wait()
+            for _ in range(requests):
+                began = time.perf_counter()
+                detector.detect(image)
+                elapsed = time.perf_counter() - began
+
+                with latencies_lock:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=station) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared piece detection server for several stations.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Load the model and serve stations.")
+    serve_parser.add_argument('--model', type=str, default="chess_200.pt", help="YOLO model path.")
+    serve_parser.add_argument('--socket', type=str, default=DEFAULT_SOCKET_PATH, help="Unix socket path.")
+    serve_parser.add_argument('--max_batch_size', type=int, default=MAX_BATCH_SIZE, help="Largest inference batch.")
+    serve_parser.add_argument('--max_wait', type=float, default=MAX_BATCH_WAIT, help="Seconds a request may wait for a batch to fill.")
+
+    bench_parser = subparsers.add_parser("bench", help="Generate load from several local stations.")
+    bench_parser.add_argument('--socket', type=str, default=DEFAULT_SOCKET_PATH, help="Unix socket path.")
+    bench_parser.add_argument('--clients', type=int, default=4, help="Number of concurrent stations.")
+    bench_parser.add_argument('--requests', type=int, default=50, help="Requests per station.")
+    bench_parser.add_argument('--image', type=str, default=None, help="Greyscale board image, random noise if omitted.")
+
+    args = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s %(levelname)s:%(name)s:%(message)s', datefmt='%x %X', level=logging.INFO)
+
+    if args.command == "serve":
+        from ultralytics import YOLO
+
+        server = InferenceServer(YOLO(args.model), args.socket, args.max_batch_size, args.max_wait)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+        finally:
+            logger.info(f"Batch sizes served: {dict(sorted(server.batch_sizes.items()))}")
+    else:
+        if args.image:
+            import cv2
+            image = cv2.imread(args.image, cv2.IMREAD_GRAYSCALE)
+        else:
+            image = np.random.randint(0, 256, (640, 640), dtype=np.uint8)
+
+        began = time.perf_counter()
+        latencies = run_load(args.socket, args.clients, args.requests, image)
+        elapsed = time.perf_counter() - began
+
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{len(latencies)} requests from {args.clients} stations in {elapsed:.2f} s "
+              f"({len(latencies) / elapsed:.1f} req/s), latency p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+if __name__ == "__main__":
+    main()
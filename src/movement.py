@@ -1,87 +1,141 @@
 import logging
-from typing import List, Optional, Tuple
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
 import chess
+import chess.polyglot
 from . import robot
-from .board import RealBoard, SQUARE_CENTER
+from .board import RealBoard, SQUARE_CENTER, board_diff, changed_squares, piece_masks
+from .graveyard import Graveyard
 
 logger = logging.getLogger(__name__)
 
-def reflect_move(board: RealBoard, move: chess.Move) -> int:
+# Number of positions whose legal move index is kept
+MOVE_INDEX_CACHE_SIZE = 256
+
+# Longest sequence of missed plies searched by reconcile_moves
+MAX_RECONCILE_PLIES = 3
+
+MoveSignature = Tuple[chess.Bitboard, ...]
+
+class MoveMatch(NamedTuple):
+    move: chess.Move
+    distance: int
+
+_move_indexes: "OrderedDict[int, dict[MoveSignature, chess.Move]]" = OrderedDict()
+_move_indexes_lock = threading.Lock()
+
+def reflect_move(board: RealBoard, move: chess.Move, graveyard: Optional[Graveyard] = None) -> int:
     """
     Makes move physically, does not save the move in board
     """
+    steps = plan_move_steps(board, move, graveyard)
+    if steps is None:
+        return robot.COMMAND_FAILURE
 
-    response = robot.COMMAND_SUCCESS
+    return execute_steps(board, steps, graveyard)
+
+def plan_move_steps(board: RealBoard, move: chess.Move, graveyard: Optional[Graveyard] = None) -> Optional[List[robot.MoveStep]]:
+    """
+    Ordered pick and place steps that make move physically
+    """
+    steps: List[robot.MoveStep] = []
     from_square, to_square = (move.from_square, move.to_square)
 
+    # Graveyard slots used by earlier steps of this move
+    reserved: set[int] = set()
+
+    def step(from_square: int, to_square: int):
+        offset = board.offset(from_square) if 0 <= from_square <= 63 else SQUARE_CENTER
+        steps.append(robot.MoveStep(from_square, to_square, offset))
+
+    def drop(piece: chess.Piece, near: int) -> Optional[int]:
+        if graveyard is None:
+            return robot.off_board_square(piece.piece_type, piece.color)
+        slot = graveyard.drop_slot(piece, near, board.perspective, exclude=reserved)
+        if slot is not None:
+            reserved.add(slot)
+        return slot
+
+    def pickup(piece: chess.Piece, near: int) -> int:
+        if graveyard is None:
+            return robot.off_board_square(piece.piece_type, piece.color)
+        slot = graveyard.pickup_slot(piece, near, board.perspective, exclude=reserved)
+        reserved.add(slot)
+        return slot
+
     if board.chess_board.is_castling(move):
         rook_move = castle_rook_move(board.chess_board, move)
         if not rook_move:
-            return robot.COMMAND_FAILURE
-
-        response = move_piece(board, from_square, to_square, response)
-        response = move_piece(board, rook_move.from_square, rook_move.to_square, response)
-    else:  # Regular moves
-        if board.chess_board.is_capture(move):
-            captured_piece = board.piece_at(to_square)
-            piece_type, color = (captured_piece.piece_type, captured_piece.color)
-            off_board_place = robot.off_board_square(piece_type, color)
-
-            # Remove captured piece
-            response = move_piece(board, to_square, off_board_place, response)
-        if board.chess_board.is_en_passant(move):
-            captured_square = en_passant_captured(move)
-            captured_piece = board.piece_at(captured_square)
-            piece_type, color = (captured_piece.piece_type, captured_piece.color)
-            off_board_place = robot.off_board_square(piece_type, color)
-
-            # Remove captured piece
-            response = move_piece(board, captured_square, off_board_place, response)
-        if move.promotion:
-            removed_piece = board.piece_at(move.from_square)
-            piece_type, color = (removed_piece.piece_type, removed_piece.color)
-            off_board_place_removed = robot.off_board_square(piece_type, color)
-            off_board_place_promoted = robot.off_board_square(
-                move.promotion, color
-            )
-
-            # Remove original piece off the board
-            response = move_piece(board, from_square, off_board_place_removed, response)
-
-            # Set new piece to be moved
-            from_square = off_board_place_promoted
-
-        response = move_piece(board, from_square, to_square, response)
-
-    return response
-
-def move_piece(board: RealBoard, from_square: chess.Square, to_square: chess.Square, prev_response=robot.COMMAND_SUCCESS) -> int:
-    """Assume move is valid, call before pushing move in memory!"""
-    if prev_response == robot.COMMAND_SUCCESS:
-        offset = board.offset(from_square)
-
-        command = robot.form_command(from_square, to_square, offset, perspective=board.perspective)
-        response = robot.issue_command(command)
-
-        from_str = chess.square_name(from_square) if 0 <= from_square <= 63 else from_square
-        to_str = chess.square_name(to_square) if 0 <= to_square <= 63 else to_square
+            return None
+
+        step(from_square, to_square)
+        step(rook_move.from_square, rook_move.to_square)
+        return steps
+
+    # Regular moves
+    if board.chess_board.is_en_passant(move):
+        captured_square = en_passant_captured(move)
+    elif board.chess_board.is_capture(move):
+        captured_square = to_square
+    else:
+        captured_square = None
+
+    if captured_square is not None:
+        captured_piece = board.piece_at(captured_square)
+
+        # Remove captured piece
+        slot = drop(captured_piece, captured_square)
+        if slot is None:
+            return None
+        step(captured_square, slot)
+
+    if move.promotion:
+        color = board.piece_at(from_square).color
+
+        # Remove original piece off the board, new piece is moved in from off board
+        slot = drop(chess.Piece(chess.PAWN, color), from_square)
+        if slot is None:
+            return None
+        step(from_square, slot)
+        from_square = pickup(chess.Piece(move.promotion, color), to_square)
+
+    step(from_square, to_square)
+    return steps
+
+def execute_steps(board: RealBoard, steps: List[robot.MoveStep], graveyard: Optional[Graveyard] = None) -> int:
+    """
+    Issues steps as one batch where the robot supports it
+    """
+    completed = robot.issue_steps(steps, perspective=board.perspective)
+    return apply_steps(board, steps, completed, graveyard)
+
+def apply_steps(board: RealBoard, steps: List[robot.MoveStep], completed: int, graveyard: Optional[Graveyard] = None) -> int:
+    """
+    Centers offsets of pieces moved by the completed steps and records them in the graveyard
+    """
+    if graveyard is not None:
+        graveyard.record(board.chess_board, steps[:completed], board.perspective)
+
+    for index, step in enumerate(steps):
+        from_str = chess.square_name(step.from_square) if 0 <= step.from_square <= 63 else step.from_square
+        to_str = chess.square_name(step.to_square) if 0 <= step.to_square <= 63 else step.to_square
         move_str = f"{from_str} -> {to_str}"
 
-        if response == robot.COMMAND_SUCCESS:
+        if index < completed:
             # Update board offsets
-            if 0 <= from_square <= 63:
-                board.set_offset(from_square, SQUARE_CENTER)
+            if 0 <= step.from_square <= 63:
+                board.set_offset(step.from_square, SQUARE_CENTER)
 
-            if 0 <= to_square <= 63:
-                board.set_offset(to_square, SQUARE_CENTER)
+            if 0 <= step.to_square <= 63:
+                board.set_offset(step.to_square, SQUARE_CENTER)
 
             logger.info(f"Moved piece {move_str} success")
         else:
             logger.warning(f"Moved piece {move_str} failed!")
+            break
 
-        return response
-    else:
-        return prev_response
+    return robot.COMMAND_SUCCESS if completed == len(steps) else robot.COMMAND_FAILURE
 
 def identify_move(prev_board: chess.Board, current_board: chess.Board) -> Optional[chess.Move]:
     """
@@ -89,18 +143,10 @@ def identify_move(prev_board: chess.Board, current_board: chess.Board) -> Option
     """
 
     # Find piece differences
-    dissapeared: List[chess.Square] = []
-    appeared: List[chess.Square] = []
-
-    for square in chess.SQUARES:
-        prev_piece = prev_board.piece_at(square)
-        curr_piece = current_board.piece_at(square)
+    dissapeared_mask, appeared_mask = board_diff(prev_board, current_board)
 
-        if prev_piece != curr_piece:
-            if prev_piece is not None and curr_piece is None:
-                dissapeared.append(square)
-            else: # New piece or captured
-                appeared.append(square)
+    dissapeared: List[chess.Square] = list(chess.scan_forward(dissapeared_mask))
+    appeared: List[chess.Square] = list(chess.scan_forward(appeared_mask))
 
     # Validate normal and promotion moves
     if len(dissapeared) == 1 and len(appeared) == 1:
@@ -172,6 +218,128 @@ def identify_move(prev_board: chess.Board, current_board: chess.Board) -> Option
 
     return None
  
+def legal_move_index(board: chess.Board) -> dict[MoveSignature, chess.Move]:
+    """
+    Maps the piece placement after each legal move to the move, cached by zobrist hash
+    """
+    key = chess.polyglot.zobrist_hash(board)
+
+    with _move_indexes_lock:
+        index = _move_indexes.get(key)
+        if index is not None:
+            _move_indexes.move_to_end(key)
+            return index
+
+    index = {}
+    after_board = board.copy(stack=False)
+    for move in board.legal_moves:
+        after_board.push(move)
+        index[piece_masks(after_board)] = move
+        after_board.pop()
+
+    with _move_indexes_lock:
+        _move_indexes[key] = index
+        if len(_move_indexes) > MOVE_INDEX_CACHE_SIZE:
+            _move_indexes.popitem(last=False)
+
+    return index
+
+def match_move(board: chess.Board, observed_board: chess.BaseBoard) -> Optional[chess.Move]:
+    """
+    Returns the legal move that leads to the observed piece placement
+    """
+    return legal_move_index(board).get(piece_masks(observed_board))
+
+def nearest_moves(board: chess.Board, observed_board: chess.BaseBoard, limit: int = 3) -> List[MoveMatch]:
+    """
+    Legal moves ranked by how many piece bits differ from the observed placement
+    """
+    observed = piece_masks(observed_board)
+    matches = [
+        MoveMatch(move, sum((mask ^ observed_mask).bit_count() for mask, observed_mask in zip(signature, observed)))
+        for signature, move in legal_move_index(board).items()
+    ]
+    matches.sort(key=lambda match: match.distance)
+    return matches[:limit]
+
+def reconcile_moves(board: chess.Board, observed_board: chess.BaseBoard, max_plies: int = MAX_RECONCILE_PLIES,
+                    candidate_moves: Optional[Callable[[chess.Board], Iterable[chess.Move]]] = None) -> Optional[List[chess.Move]]:
+    """
+    Finds the shortest sequence of legal moves (up to max_plies) that leads to the observed placement,
+    used when the camera missed intermediate board states.
+    candidate_moves restricts the moves a ply may be in a position, all legal moves by default.
+    """
+
+    target = piece_masks(observed_board)
+    target_material = _material(observed_board)
+    search_board = board.copy()
+    failed: set[tuple[int, int]] = set()
+
+    def candidates(position: chess.Board) -> Iterable[chess.Move]:
+        return position.legal_moves if candidate_moves is None else candidate_moves(position)
+
+    def search(remaining: int) -> Optional[List[chess.Move]]:
+        if piece_masks(search_board) == target:
+            return []
+        if remaining == 0 or not _reachable(search_board, observed_board, target_material, remaining):
+            return None
+
+        if remaining == 1:
+            move = match_move(search_board, observed_board)
+            return [move] if move and move in candidates(search_board) else None
+
+        key = (chess.polyglot.zobrist_hash(search_board), remaining)
+        if key in failed:
+            return None
+
+        for move in list(candidates(search_board)):
+            search_board.push(move)
+            moves = search(remaining - 1)
+            search_board.pop()
+
+            if moves is not None:
+                return [move] + moves
+
+        failed.add(key)
+        return None
+
+    # Iterative deepening returns the shortest explanation first
+    for plies in range(1, max_plies + 1):
+        moves = search(plies)
+        if moves:
+            return moves
+
+    return None
+
+def _material(board: chess.BaseBoard) -> List[int]:
+    return [(board.pieces_mask(piece_type, color)).bit_count() for color in chess.COLORS for piece_type in chess.PIECE_TYPES]
+
+def _reachable(board: chess.Board, observed_board: chess.BaseBoard, observed_material: List[int], plies: int) -> bool:
+    # Every ply changes at most 4 squares (castling) and empties at most 2 (castling, en passant)
+    if changed_squares(board, observed_board).bit_count() > 4 * plies:
+        return False
+    if (board.occupied & ~observed_board.occupied).bit_count() > 2 * plies:
+        return False
+
+    material = _material(board)
+    captures = 0
+
+    for color_offset in (0, len(chess.PIECE_TYPES)):
+        pawns = material[color_offset] - observed_material[color_offset]
+        promotions = 0
+
+        for type_offset in range(1, len(chess.PIECE_TYPES)):
+            promotions += max(0, observed_material[color_offset + type_offset] - material[color_offset + type_offset])
+
+        # Pieces only appear through promotion of own pawns
+        if pawns < promotions:
+            return False
+
+        captures += sum(material[color_offset:color_offset + len(chess.PIECE_TYPES)]) - sum(observed_material[color_offset:color_offset + len(chess.PIECE_TYPES)])
+
+    # At most one capture per ply
+    return 0 <= captures <= plies
+
 def castle_rook_move(board: chess.Board, king_move: chess.Move) -> Optional[chess.Move]:
     if board.piece_at(king_move.from_square).piece_type == chess.KING and board.is_castling(king_move):
         rook_from, rook_to = None, None
@@ -205,73 +373,3 @@ def is_en_passant(board, move):
         if abs(move.from_square - move.to_square) in (7, 9) and not board.piece_at(move.to_square):
             return True
     return False
-
-def iter_reset_board(board: RealBoard, expected_board: RealBoard) -> Tuple[int, bool]:
-    """
-    Resets the board to match the expected_board configuration.
-    If no expected_board is provided, it resets to the default chess starting position.
-    If perspective is provided, adjusts the perspective accordingly.
-    """
-    # Create mappings for current and expected piece positions
-    current_positions = {square: board.piece_at(square) for square in chess.SQUARES if board.piece_at(square)}
-    expected_positions = {square: expected_board.piece_at(square) for square in chess.SQUARES if expected_board.piece_at(square)}
-
-    # Find pieces that are correctly placed, to avoid unnecessary moves
-    correctly_placed = {square: piece for square, piece in expected_positions.items() if current_positions.get(square) == piece}
-
-    # Remove correctly placed pieces from current and expected mappings
-    for square in list(correctly_placed.keys()):
-        current_positions.pop(square, None)
-        expected_positions.pop(square, None)
-
-    # Use list to track empty squares on the board
-    empty_squares = [square for square in chess.SQUARES if square not in current_positions and square not in expected_positions]
-
-    # Helper function to move a piece and update mappings
-    def move_piece_and_update(start_square: chess.Square, end_square: chess.Square) -> int:
-        piece = board.piece_at(start_square)
-        response = move_piece(board, start_square, end_square)
-        if response != robot.COMMAND_SUCCESS:
-            return response
-
-        current_positions.pop(start_square)
-        current_positions[end_square] = piece
-
-        if end_square in expected_positions and expected_positions[end_square] == piece:
-            expected_positions.pop(end_square)
-
-        return robot.COMMAND_SUCCESS
-
-    # First pass: move pieces directly to their target positions if possible
-    for square, piece in list(expected_positions.items()):
-        if piece in current_positions.values():
-            for start_square, current_piece in list(current_positions.items()):
-                if current_piece == piece:
-                    response = move_piece_and_update(start_square, square)
-                    return response, False
-
-    # Second pass: move remaining pieces out of the way, using empty squares as intermediate holding spots
-    for start_square, piece in list(current_positions.items()):
-        if piece not in expected_positions.values():
-            if empty_squares:
-                temp_square = empty_squares.pop(0)
-                response = move_piece_and_update(start_square, temp_square)
-                return response, False
-
-    # Third pass: place pieces in their final positions from temporary spots or off-board
-    for square, piece in list(expected_positions.items()):
-        origin_square = None
-        for temp_square, current_piece in list(current_positions.items()):
-            if current_piece == piece:
-                origin_square = temp_square
-                break
-        if origin_square is None:
-            origin_square = robot.off_board_square(piece.piece_type, piece.color)
-        response = move_piece_and_update(origin_square, square)
-        return response, False
-
-    board.chess_board = expected_board.chess_board
-    board.perspective = expected_board.perspective
-
-    return robot.COMMAND_SUCCESS, True
-
@@ -0,0 +1,97 @@
+import random
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+import chess
+import chess.engine
+import chess.polyglot
+import logging
+from .difficulty import DifficultyProfile
+
+logger = logging.getLogger(__name__)
+
+# Fixed budget of the shared search, the same for every level
+SHARED_LIMIT = chess.engine.Limit(time=0.5, nodes=1_000_000)
+
+# Best lines kept from the shared search
+MULTIPV_LINES = 8
+
+# Number of positions whose search is kept
+SEARCH_CACHE_SIZE = 256
+
+# Strength the shared search runs at, levels weaken through move choice instead
+FULL_STRENGTH = {"Skill Level": 20}
+
+# Centipawns standing in for a forced mate
+MATE_SCORE = 100_000
+
+class Candidate(NamedTuple):
+    move: chess.Move
+    # Centipawns from the view of the side to move
+    score: int
+
+class MultiPVSearch:
+    """
+    One fixed-budget MultiPV search per position, shared by the robot moves of every level.
+    Levels choose among the top moves that lose at most their eval-loss window.
+    """
+
+    def __init__(self, engine, limit: chess.engine.Limit = SHARED_LIMIT, lines: int = MULTIPV_LINES,
+                 cache_size: int = SEARCH_CACHE_SIZE, rng: Optional[random.Random] = None) -> None:
+        self.engine = engine
+        self.limit = limit
+        self.lines = lines
+        self.cache_size = cache_size
+        self.random = rng if rng is not None else random.Random()
+
+        self.lock = threading.Lock()
+        self.searches: "OrderedDict[int, list[Candidate]]" = OrderedDict()
+        self.hits = 0
+        # Every miss runs one engine search
+        self.misses = 0
+
+    def candidates(self, board: chess.Board, **kwargs) -> list[Candidate]:
+        """
+        Top moves best first, extra arguments (game, token) are passed on to the engine
+        """
+        key = chess.polyglot.zobrist_hash(board)
+
+        with self.lock:
+            candidates = self.searches.get(key)
+            if candidates is not None:
+                self.searches.move_to_end(key)
+                self.hits += 1
+                return candidates
+            self.misses += 1
+
+        infos = self.engine.analyse(board, self.limit, multipv=self.lines, options=FULL_STRENGTH, **kwargs)
+        candidates = [Candidate(info["pv"][0], info["score"].pov(board.turn).score(mate_score=MATE_SCORE))
+                      for info in infos if info.get("pv") and "score" in info]
+        candidates.sort(key=lambda candidate: candidate.score, reverse=True)
+
+        with self.lock:
+            self.searches[key] = candidates
+            if len(self.searches) > self.cache_size:
+                self.searches.popitem(last=False)
+
+        return candidates
+
+    def cached(self, board: chess.Board) -> Optional[list[Candidate]]:
+        """
+        Top moves of an earlier search of board, never searches
+        """
+        with self.lock:
+            return self.searches.get(chess.polyglot.zobrist_hash(board))
+
+    def choose(self, board: chess.Board, profile: DifficultyProfile, **kwargs) -> Optional[chess.Move]:
+        candidates = self.candidates(board, **kwargs)
+        if not candidates:
+            return None
+
+        best = candidates[0].score
+        allowed = [candidate for candidate in candidates if best - candidate.score <= profile.loss_window]
+        choice = self.random.choice(allowed)
+
+        logger.info("Shared search: %s chose %s (loss %d cp) among %d of %d moves",
+                    profile.name, choice.move.uci(), best - choice.score, len(allowed), len(candidates))
+        return choice.move
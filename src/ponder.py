@@ -0,0 +1,161 @@
+import threading
+from typing import Optional, Union
+import chess
+import chess.engine
+import chess.polyglot
+import logging
+from .async_engine import SyncEngine, SyncAnalysis
+
+logger = logging.getLogger(__name__)
+
+# Most likely human replies that get a prepared robot response
+PONDER_REPLIES = 3
+
+# Search used to predict human replies
+PREDICTION_LIMIT = chess.engine.Limit(depth=10)
+
+class Ponderer:
+    """
+    Prepares robot responses to the most likely human replies while the human thinks
+    """
+
+    def __init__(self, engine: Union[chess.engine.SimpleEngine, SyncEngine], replies: int = PONDER_REPLIES, prediction_limit: chess.engine.Limit = PREDICTION_LIMIT) -> None:
+        self.engine = engine
+        self.replies = replies
+        self.prediction_limit = prediction_limit
+
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.analysis: Optional[Union[chess.engine.SimpleAnalysisResult, SyncAnalysis]] = None
+        self.current_key: Optional[int] = None
+        self.stopped = True
+        self.interrupted = False
+        self.active = False
+        self.game: object = None
+
+        # Zobrist hash of the position after a human reply -> robot response
+        self.responses: dict[int, chess.Move] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, board: chess.Board, limit: chess.engine.Limit, game: object = None):
+        """
+        Starts pondering on the position where the human is to move, limit is the robot's own search
+        and game the engine game identity of the robot's searches
+        """
+        self.cancel()
+
+        with self.lock:
+            self.responses = {}
+            self.stopped = False
+            self.interrupted = False
+            self.active = True
+            self.game = game
+
+        self.thread = threading.Thread(target=self._run, args=(board.copy(), limit), daemon=True)
+        self.thread.start()
+
+    def take(self, board: chess.Board) -> Optional[chess.Move]:
+        """
+        Stops pondering and returns the prepared response for the position after the human reply
+        """
+        key = chess.polyglot.zobrist_hash(board)
+
+        with self.lock:
+            if not self.active:
+                return None
+            self.active = False
+
+            # The reply being analysed right now is a hit, let it finish
+            self._stop(interrupt=self.current_key != key)
+
+        self._join()
+
+        move = self.responses.get(key)
+        if move is not None and move in board.legal_moves:
+            self.hits += 1
+            logger.info("Ponder hit %s (hits %d, misses %d)", move.uci(), self.hits, self.misses)
+            return move
+
+        self.misses += 1
+        logger.info("Ponder miss (hits %d, misses %d)", self.hits, self.misses)
+        return None
+
+    def predict(self, board: chess.Board) -> Optional[chess.Move]:
+        """
+        Prepared response, or the best move so far of the one being searched, pondering goes on
+        """
+        key = chess.polyglot.zobrist_hash(board)
+
+        with self.lock:
+            if not self.active:
+                return None
+
+            move = self.responses.get(key)
+            if move is None and self.current_key == key and self.analysis:
+                lines = self.analysis.multipv
+                if lines and lines[0].get("pv"):
+                    move = lines[0]["pv"][0]
+
+        return move if move in board.legal_moves else None
+
+    def cancel(self):
+        with self.lock:
+            self.active = False
+            self._stop(interrupt=True)
+        self._join()
+
+    def _stop(self, interrupt: bool):
+        self.stopped = True
+        if interrupt:
+            self.interrupted = True
+            if self.analysis:
+                self.analysis.stop()
+
+    def _join(self):
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def _analyse(self, board: chess.Board, limit: chess.engine.Limit, key: Optional[int] = None, multipv: Optional[int] = None) -> Optional[Union[chess.engine.SimpleAnalysisResult, SyncAnalysis]]:
+        with self.lock:
+            if self.stopped:
+                return None
+            self.current_key = key
+            self.analysis = self.engine.analysis(board, limit, multipv=multipv, game=self.game)
+            return self.analysis
+
+    def _run(self, board: chess.Board, limit: chess.engine.Limit):
+        try:
+            analysis = self._analyse(board, self.prediction_limit, multipv=self.replies)
+            if not analysis:
+                return
+            analysis.wait()
+
+            replies = [info["pv"][0] for info in analysis.multipv if info.get("pv")]
+            logger.info("Pondering on human replies %s", " ".join(reply.uci() for reply in replies))
+
+            for reply in replies:
+                board.push(reply)
+                key = chess.polyglot.zobrist_hash(board)
+
+                analysis = self._analyse(board, limit, key=key)
+                if not analysis:
+                    return
+                best = analysis.wait()
+                board.pop()
+
+                with self.lock:
+                    # Stopped searches return a weaker move than the robot would play
+                    if not self.interrupted and best.move is not None:
+                        self.responses[key] = best.move
+                    self.current_key = None
+                    if self.stopped:
+                        return
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            with self.lock:
+                self.analysis = None
+                self.current_key = None
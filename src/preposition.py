@@ -0,0 +1,93 @@
+from concurrent.futures import Future
+from typing import Optional
+import chess
+import logging
+from . import robot
+from . import geometry
+from .robot_queue import RobotQueue
+
+logger = logging.getLogger(__name__)
+
+class Prepositioner:
+    """
+    Hovers the arm over the first pick of the predicted robot move while the engine searches.
+    Hits, misses and the modelled arm time saved are counted when the real move is planned.
+    """
+
+    def __init__(self, robot_queue: RobotQueue) -> None:
+        self.robot_queue = robot_queue
+
+        # Physical arm position as last commanded
+        self.arm = geometry.HOME
+        self.hovered: Optional[int] = None
+        self.perspective = chess.WHITE
+        self.future: Optional[Future] = None
+
+        self.hits = 0
+        self.misses = 0
+        # Seconds, misses that hover away from the real pick count against it
+        self.saved = 0.0
+
+    def hover(self, square: int, perspective: chess.Color = chess.WHITE):
+        self.discard()
+        self.hovered = square
+        self.perspective = perspective
+        self.future = self.robot_queue.submit_hover(square, perspective)
+
+    def settle(self, steps: list[robot.MoveStep]) -> bool:
+        """
+        Scores the hover against steps about to be submitted, returns whether it hit
+        """
+        hovered, future = self.hovered, self.future
+        self.hovered, self.future = None, None
+        if hovered is None or not steps or not self._moved(future):
+            return False
+
+        hover_position = geometry.perspective_position(hovered, self.perspective)
+        pick = geometry.perspective_position(steps[0].from_square, self.perspective)
+        saved = geometry.travel_time(self.arm, pick) - geometry.travel_time(hover_position, pick)
+        self.arm = hover_position
+
+        hit = hovered == steps[0].from_square
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.saved += saved
+
+        logger.info(f"Arm preposition {'hit' if hit else 'miss'} {saved:+.2f} s "
+                    f"(hits {self.hits}, misses {self.misses}, saved {self.saved:.2f} s)")
+        return hit
+
+    def moved(self, steps: list[robot.MoveStep], perspective: chess.Color = chess.WHITE):
+        """
+        Follows the arm to the end of completed steps
+        """
+        if steps:
+            self.arm = geometry.perspective_position(steps[-1].to_square, perspective)
+
+    def discard(self):
+        """
+        Drops a hover that was not sent yet, one in flight still moves the arm
+        """
+        if self._moved(self.future):
+            self.arm = geometry.perspective_position(self.hovered, self.perspective)
+        self.hovered, self.future = None, None
+
+    def reset(self):
+        # robot.reset_state returns the arm home
+        self.discard()
+        self.arm = geometry.HOME
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _moved(self, future: Optional[Future]) -> bool:
+        # A pending hover is cancelled, one that started is waited for
+        if future is None or future.cancel():
+            return False
+        try:
+            return future.result() == robot.COMMAND_SUCCESS
+        except Exception:
+            return False
@@ -0,0 +1,217 @@
+from typing import NamedTuple, Optional
+import chess
+import logging
+from . import robot
+from . import geometry
+from .board import RealBoard, SQUARE_CENTER
+from .graveyard import Graveyard
+
+logger = logging.getLogger(__name__)
+
+class Transfer(NamedTuple):
+    # Off board squares are negative
+    from_square: int
+    to_square: int
+
+def hungarian(cost: list[list[float]]) -> list[int]:
+    """
+    Minimum cost assignment of a square matrix, returns the column of every row
+    """
+    n = len(cost)
+    infinity = float("inf")
+
+    # Potentials and matching are 1-indexed, column 0 is a virtual start
+    row_potential = [0.0] * (n + 1)
+    column_potential = [0.0] * (n + 1)
+    column_row = [0] * (n + 1)
+    way = [0] * (n + 1)
+
+    for row in range(1, n + 1):
+        column_row[0] = row
+        column = 0
+        min_slack = [infinity] * (n + 1)
+        used = [False] * (n + 1)
+
+        while True:
+            used[column] = True
+            current_row = column_row[column]
+            delta = infinity
+            next_column = 0
+
+            for j in range(1, n + 1):
+                if used[j]:
+                    continue
+
+                slack = cost[current_row - 1][j - 1] - row_potential[current_row] - column_potential[j]
+                if slack < min_slack[j]:
+                    min_slack[j] = slack
+                    way[j] = column
+                if min_slack[j] < delta:
+                    delta = min_slack[j]
+                    next_column = j
+
+            for j in range(n + 1):
+                if used[j]:
+                    row_potential[column_row[j]] += delta
+                    column_potential[j] -= delta
+                else:
+                    min_slack[j] -= delta
+
+            column = next_column
+            if column_row[column] == 0:
+                break
+
+        # Flip the augmenting path
+        while column:
+            previous = way[column]
+            column_row[column] = column_row[previous]
+            column = previous
+
+    assignment = [0] * n
+    for column in range(1, n + 1):
+        assignment[column_row[column] - 1] = column - 1
+    return assignment
+
+# Cost of pairs the assignment must not choose
+FORBIDDEN = 1e9
+
+def _travel(from_square: int, to_square: int, perspective: chess.Color = chess.WHITE) -> float:
+    return geometry.distance(geometry.perspective_position(from_square, perspective), geometry.perspective_position(to_square, perspective))
+
+def _assign(sources: list[int], targets: list[int], perspective: chess.Color) -> list[Transfer]:
+    # Unmatched rows and columns are padded with None, only off-board squares may stay unmatched
+    size = max(len(sources), len(targets))
+    sources = sources + [None] * (size - len(sources))
+    targets = targets + [None] * (size - len(targets))
+
+    def cost(source: Optional[int], target: Optional[int]) -> float:
+        if source is None or target is None:
+            square = target if source is None else source
+            return 0.0 if square is None or square < 0 else FORBIDDEN
+        if source < 0 and target < 0:
+            return 0.0 if source == target else FORBIDDEN
+        return _travel(source, target, perspective)
+
+    matrix = [[cost(source, target) for target in targets] for source in sources]
+    transfers = []
+    for row, column in enumerate(hungarian(matrix)):
+        source, target = sources[row], targets[column]
+        if source is not None and target is not None and (source >= 0 or target >= 0):
+            transfers.append(Transfer(source, target))
+    return transfers
+
+def assign_transfers(board: chess.BaseBoard, expected_board: chess.BaseBoard, graveyard: Optional[Graveyard] = None,
+                     perspective: chess.Color = chess.WHITE) -> list[Transfer]:
+    """
+    Pairs misplaced pieces with the squares that need them at least total travel,
+    surplus pieces go off board and missing ones come from off board
+    """
+    transfers: list[Transfer] = []
+    reserved: set[int] = set()
+
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            current = board.pieces_mask(piece_type, color)
+            expected = expected_board.pieces_mask(piece_type, color)
+
+            sources = list(chess.scan_forward(current & ~expected))
+            targets = list(chess.scan_forward(expected & ~current))
+            if not sources and not targets:
+                continue
+
+            piece = chess.Piece(piece_type, color)
+            legacy = robot.off_board_square(piece_type, color)
+            surplus = len(sources) - len(targets)
+
+            if graveyard is None:
+                # Every kind has one off-board square that supplies and takes any number of pieces
+                sources += [legacy] * -surplus
+                targets += [legacy] * surplus
+            elif surplus > 0:
+                # Any empty slot may take a surplus piece, slots never stack
+                slots = graveyard.empty(perspective, exclude=reserved)
+                if len(slots) < surplus:
+                    raise ValueError(f"Graveyard has {len(slots)} free slots for {surplus} surplus {piece.symbol()}")
+                targets += slots
+            elif surplus < 0:
+                slots = graveyard.holding(piece, perspective, exclude=reserved)
+                if len(slots) < -surplus:
+                    logger.warning(f"Graveyard knows {len(slots)} of {-surplus} missing {piece.symbol()}, rest come from the legacy square")
+                sources += slots + [legacy] * max(0, -surplus - len(slots))
+
+            for transfer in _assign(sources, targets, perspective):
+                reserved.update(square for square in transfer if square < 0)
+                transfers.append(transfer)
+
+    return transfers
+
+def order_transfers(transfers: list[Transfer], occupied: chess.Bitboard, final: chess.Bitboard, arm: geometry.Position = geometry.HOME,
+                    perspective: chess.Color = chess.WHITE) -> list[Transfer]:
+    """
+    Orders transfers so every target is empty when reached, nearest pick first.
+    Cycles are broken through the free buffer square nearest to the cycle.
+    """
+    pending = list(transfers)
+    ordered: list[Transfer] = []
+    arm_position = arm
+
+    while pending:
+        ready = [transfer for transfer in pending if transfer.to_square < 0 or not occupied & chess.BB_SQUARES[transfer.to_square]]
+
+        if not ready:
+            # Only cycles remain, park one piece on a square that is empty now and at the end
+            transfer = min(pending, key=lambda t: geometry.distance(arm_position, geometry.perspective_position(t.from_square, perspective)))
+            buffers = list(chess.scan_forward(~occupied & ~final & chess.BB_ALL))
+            if not buffers:
+                raise ValueError("No free square to break a reset cycle")
+            buffer = min(buffers, key=lambda square: _travel(transfer.from_square, square, perspective))
+
+            pending.remove(transfer)
+            pending.append(Transfer(buffer, transfer.to_square))
+            ready = [Transfer(transfer.from_square, buffer)]
+            logger.debug(f"Breaking reset cycle through {buffer}")
+
+        transfer = min(ready, key=lambda t: geometry.distance(arm_position, geometry.perspective_position(t.from_square, perspective)))
+        if transfer in pending:
+            pending.remove(transfer)
+        ordered.append(transfer)
+
+        if transfer.from_square >= 0:
+            occupied &= ~chess.BB_SQUARES[transfer.from_square]
+        if transfer.to_square >= 0:
+            occupied |= chess.BB_SQUARES[transfer.to_square]
+        arm_position = geometry.perspective_position(transfer.to_square, perspective)
+
+    return ordered
+
+def plan_reset(board: RealBoard, expected_board: RealBoard, graveyard: Optional[Graveyard] = None) -> list[robot.MoveStep]:
+    """
+    Pick and place steps turning board into expected_board, spare pieces come from graveyard slots when given
+    """
+    perspective = board.perspective
+    transfers = assign_transfers(board.chess_board, expected_board.chess_board, graveyard, perspective)
+    ordered = order_transfers(transfers, board.chess_board.occupied, expected_board.chess_board.occupied, perspective=perspective)
+
+    steps = []
+    moved = set()
+    for transfer in ordered:
+        # Pieces the robot placed are centred
+        if 0 <= transfer.from_square <= 63 and transfer.from_square not in moved:
+            offset = board.offset(transfer.from_square)
+        else:
+            offset = SQUARE_CENTER
+        moved.add(transfer.to_square)
+        steps.append(robot.MoveStep(transfer.from_square, transfer.to_square, offset))
+
+    return steps
+
+def travel_distance(steps: list[robot.MoveStep], arm: geometry.Position = geometry.HOME, perspective: chess.Color = chess.WHITE) -> float:
+    """
+    Millimetres the arm travels for steps, including moves between them
+    """
+    total = 0.0
+    for step in steps:
+        pick, place = geometry.perspective_position(step.from_square, perspective), geometry.perspective_position(step.to_square, perspective)
+        total += geometry.distance(arm, pick) + geometry.distance(pick, place)
+        arm = place
+    return total
@@ -1,8 +1,13 @@
+from typing import NamedTuple, Optional
+import collections
+import threading
+import select
 import socket
 import time
 import chess
 import logging
 from .board import SquareOffset, SQUARE_CENTER
+from . import geometry
 
 logger = logging.getLogger(__name__)
 
@@ -28,14 +33,57 @@ DELAY_TIMEOUT = 30
 COMMAND_FAILURE = 0
 COMMAND_SUCCESS = 1
 
+# Batched command: prefix, step count, then the steps separated by ";", one reply per step
+BATCH_COMMAND = "batch"
+BATCH_SEPARATOR = " ; "
+
+# Moves the arm over a square without gripping, one reply
+HOVER_COMMAND = "hover"
+
+# Replies end with a newline. Commands too, but only for firmware with batched commands,
+# older firmware reads a command from a single recv and takes the newline as part of it.
+TERMINATOR = b"\n"
+
+# Replies recognised without a terminator, and seconds to wait for the rest of such a reply
+KNOWN_RESPONSES = (b"success", b"failure")
+LEGACY_REPLY_WAIT = 0.05
+
+# Reconnect backoff in seconds
+RECONNECT_ATTEMPTS = 5
+RECONNECT_DELAY = 0.1
+MAX_RECONNECT_DELAY = 2.0
+
+# Number of recent command round trip times kept
+RTT_SAMPLES = 500
+
 ip_address = '192.168.1.6'
 port = 6001
 
-def setup_communication(new_ip_address: str = '192.168.1.6', new_port: int = 6001):
-    global ip_address, port
+# Robot firmware understands batched commands, otherwise steps are sent one by one
+batch_commands = False
+
+client: Optional["RobotClient"] = None
+client_lock = threading.Lock()
+
+class MoveStep(NamedTuple):
+    """
+    One pick and place, off board squares are negative
+    """
+    from_square: int
+    to_square: int
+    offset: SquareOffset = SQUARE_CENTER
+
+def setup_communication(new_ip_address: str = '192.168.1.6', new_port: int = 6001, batch: bool = False):
+    global ip_address, port, client, batch_commands
 
     ip_address = new_ip_address
     port = new_port
+    batch_commands = batch
+
+    with client_lock:
+        if client is not None:
+            client.close()
+        client = RobotClient(ip_address, port, terminate_commands=batch_commands)
 
 def reset_state():
     return issue_command("99 99 99 99")
@@ -49,16 +97,9 @@ def form_command(from_square: chess.Square, to_square: chess.Square, offset: Squ
     offset_y = int(max(min(offset.y * 100, 100), -100))
 
     if perspective == chess.BLACK:
-        # Flip off board squares
-        if -6 <= from_square < 0:
-            from_square -= 6
-        else:
-            from_square += 6
-
-        if -6 <= to_square < 0:
-            to_square -= 6
-        else:
-            to_square += 6
+        # Flip off board squares, board squares keep their index
+        from_square = geometry.mirror_off_board(from_square)
+        to_square = geometry.mirror_off_board(to_square)
 
     # Form the command parts as integers
     command_parts = [from_square, offset_x, offset_y, to_square]
@@ -68,31 +109,232 @@ def form_command(from_square: chess.Square, to_square: chess.Square, offset: Squ
     
     return command_string
 
+def form_batch_command(steps: list[MoveStep], perspective: chess.Color = chess.WHITE) -> str:
+    commands = [form_command(step.from_square, step.to_square, step.offset, perspective) for step in steps]
+    return f"{BATCH_COMMAND} {len(steps)} {BATCH_SEPARATOR.join(commands)}"
+
+def form_hover_command(square: int, perspective: chess.Color = chess.WHITE) -> str:
+    if perspective == chess.BLACK:
+        square = geometry.mirror_off_board(square)
+    return f"{HOVER_COMMAND} {square}"
+
 def issue_command(command: str, timeout_max=DELAY_TIMEOUT) -> int:
-    robot_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    robot_socket.settimeout(timeout_max)
-
-    try:
-        robot_socket.connect((ip_address, port))
-        logger.info(f"Connected to {ip_address}:{port}")
-        
-        # Convert command to a space-separated string and encode to bytes
-        message = command.encode('utf-8')
-                    
-        # Send the message to the robot server
-        robot_socket.sendall(message)
-        
-        # Wait for and receive a response from the robot server
-        response = robot_socket.recv(1024)
-        if response:
-            decoded_response = response.decode('utf-8').strip()
-            if decoded_response == "success":
-                return COMMAND_SUCCESS
-
-        return COMMAND_FAILURE
-    except Exception as e:
-        logging.exception(e)
-        return COMMAND_FAILURE
-    finally:
-        robot_socket.close()
+    return get_client().command(command, timeout_max)
+
+def issue_steps(steps: list[MoveStep], perspective: chess.Color = chess.WHITE, timeout_max=DELAY_TIMEOUT, deadline: Optional[float] = None) -> int:
+    """
+    Executes steps in order until one fails, returns the number of completed steps.
+    timeout_max applies to each step, the time.monotonic() deadline to all of them.
+    """
+    if batch_commands:
+        return get_client().batch(form_batch_command(steps, perspective), len(steps), timeout_max, deadline)
+
+    # Compatibility mode, one round trip per step
+    for index, step in enumerate(steps):
+        timeout = timeout_max
+        if deadline is not None:
+            timeout = min(timeout_max, deadline - time.monotonic())
+            if timeout <= 0:
+                logger.warning(f"Robot move deadline passed after {index} of {len(steps)} steps")
+                return index
+
+        if issue_command(form_command(step.from_square, step.to_square, step.offset, perspective), timeout) != COMMAND_SUCCESS:
+            return index
+
+    return len(steps)
+
+def issue_hover(square: int, perspective: chess.Color = chess.WHITE, timeout_max=DELAY_TIMEOUT) -> int:
+    return issue_command(form_hover_command(square, perspective), timeout_max)
+
+def get_client() -> "RobotClient":
+    global client
+
+    with client_lock:
+        if client is None:
+            client = RobotClient(ip_address, port, terminate_commands=batch_commands)
+        return client
+
+def rtt_stats() -> dict[str, float]:
+    return get_client().rtt_stats()
+
+def last_completion() -> Optional[float]:
+    """
+    time.monotonic() of the last robot reply, None before the first one
+    """
+    return get_client().completed_at
+
+class RobotClient:
+    """
+    Keeps one connection to the robot open, reconnects with backoff when it drops
+    """
+
+    def __init__(self, address: str, port: int, timeout: float = DELAY_TIMEOUT, reconnect_attempts: int = RECONNECT_ATTEMPTS, terminate_commands: bool = False) -> None:
+        self.address = address
+        self.port = port
+        self.timeout = timeout
+        self.reconnect_attempts = reconnect_attempts
+        self.terminator = TERMINATOR if terminate_commands else b""
+
+        self.lock = threading.Lock()
+        self.connection: Optional[socket.socket] = None
+        self.buffer = b""
+
+        self.round_trips: collections.deque[float] = collections.deque(maxlen=RTT_SAMPLES)
+        self.connections = 0
+        # time.monotonic() of the last reply
+        self.completed_at: Optional[float] = None
+
+    def command(self, command: str, timeout: Optional[float] = None) -> int:
+        """
+        Sends one command and waits for its reply, a command is never resent once it was sent
+        """
+        responses = self._exchange(command, 1, timeout)
+        return COMMAND_SUCCESS if responses == ["success"] else COMMAND_FAILURE
+
+    def batch(self, command: str, steps: int, timeout: Optional[float] = None, deadline: Optional[float] = None) -> int:
+        """
+        Sends a batched command, the robot acknowledges every step and stops at the first failed one.
+        Returns the number of completed steps, timeout applies to each step, the time.monotonic() deadline to all.
+        """
+        responses = self._exchange(command, steps, timeout, deadline)
+
+        completed = 0
+        while completed < len(responses) and responses[completed] == "success":
+            completed += 1
+
+        if completed < steps:
+            logger.warning(f"Robot batch stopped after {completed} of {steps} steps")
+        return completed
+
+    def _exchange(self, command: str, replies: int, timeout: Optional[float], deadline: Optional[float] = None) -> list[str]:
+        # Reads replies until all arrived or one is not a success
+        with self.lock:
+            try:
+                self._ensure_connected()
+            except OSError as e:
+                logger.error(f"Robot at {self.address}:{self.port} unreachable: {e}")
+                return []
+
+            responses = []
+            try:
+                step_timeout = self.timeout if timeout is None else timeout
+                self.connection.settimeout(step_timeout)
+
+                began = time.perf_counter()
+                self.connection.sendall(command.encode('utf-8') + self.terminator)
+                while len(responses) < replies and (not responses or responses[-1] == "success") and self.connection:
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError(f"Deadline passed after {len(responses)} of {replies} replies")
+                        self.connection.settimeout(min(step_timeout, remaining))
+                    responses.append(self._read_response())
+                    self.completed_at = time.monotonic()
+                self.round_trips.append(time.perf_counter() - began)
+            except (OSError, ConnectionError) as e:
+                # Robot may have executed the command, caller decides what to do
+                logger.error(f"Robot command '{command}' failed: {e!r}")
+                self.close()
+                return responses
+
+            logger.debug(f"Robot command '{command}' -> {responses} in {self.round_trips[-1] * 1000:.1f} ms")
+            return responses
+
+    def rtt_stats(self) -> dict[str, float]:
+        """
+        Round trip times of recent commands in seconds
+        """
+        with self.lock:
+            samples = sorted(self.round_trips)
+
+        if not samples:
+            return {"count": 0}
+
+        return {
+            "count": len(samples),
+            "mean": sum(samples) / len(samples),
+            "p50": samples[len(samples) // 2],
+            "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+            "max": samples[-1],
+        }
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        self.buffer = b""
+
+    def _ensure_connected(self):
+        if self.connection and not self._is_stale():
+            return
+
+        self.close()
+        delay = RECONNECT_DELAY
+
+        for attempt in range(self.reconnect_attempts):
+            try:
+                self.connection = self._connect()
+                return
+            except OSError as e:
+                if attempt == self.reconnect_attempts - 1:
+                    raise
+                logger.warning(f"Connecting to robot failed ({e}), retrying in {delay:.1f} s")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _connect(self) -> socket.socket:
+        connection = socket.create_connection((self.address, self.port), timeout=self.timeout)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+        # Notice a dead robot within a minute instead of hours, Linux only options
+        for option, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+            if hasattr(socket, option):
+                connection.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+        self.connections += 1
+        logger.info(f"Connected to {self.address}:{self.port} (connection {self.connections})")
+        return connection
+
+    def _is_stale(self) -> bool:
+        # Robot closed an idle connection, readable with no data means end of stream
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        if not readable:
+            return False
+
+        try:
+            data = self.connection.recv(1024, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+        if not data:
+            return True
+
+        # Stray bytes from an earlier timed out command
+        logger.warning(f"Discarding unexpected robot data {data!r}")
+        self.connection.recv(len(data))
+        return False
+
+    def _read_response(self) -> str:
+        while True:
+            line, separator, rest = self.buffer.partition(TERMINATOR)
+            if separator:
+                self.buffer = rest
+                return line.decode('utf-8').strip()
+
+            # Older robot firmware replies without a terminator and hangs up. Wait briefly for
+            # either, closing right away avoids racing its hang up with the next command.
+            wait = LEGACY_REPLY_WAIT if self.buffer.strip() in KNOWN_RESPONSES else None
+            if wait is not None and not select.select([self.connection], [], [], wait)[0]:
+                response = self.buffer.decode('utf-8').strip()
+                self.buffer = b""
+                return response
 
+            data = self.connection.recv(1024)
+            if not data:
+                response = self.buffer.decode('utf-8').strip()
+                self.close()
+                if response:
+                    return response
+                raise ConnectionError("Robot closed the connection")
+            self.buffer += data
@@ -0,0 +1,117 @@
+from concurrent.futures import Future
+from typing import NamedTuple, Optional
+import threading
+import queue
+import time
+import chess
+import logging
+from . import robot
+
+logger = logging.getLogger(__name__)
+
+class RobotCommand(NamedTuple):
+    steps: list[robot.MoveStep]
+    perspective: chess.Color
+    # time.monotonic() by which all steps must be done, later steps are not started
+    deadline: Optional[float]
+    future: Future
+    # Square to hover over instead of steps, the future then holds the command response
+    hover: Optional[int] = None
+
+class RobotQueue:
+    """
+    Runs robot commands in order on a worker thread. Callers get a future with the number
+    of completed steps and wait for it only where the arm position matters.
+    """
+
+    def __init__(self) -> None:
+        self.commands: queue.Queue[Optional[RobotCommand]] = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, steps: list[robot.MoveStep], perspective: chess.Color = chess.WHITE, timeout: Optional[float] = None) -> Future:
+        future = Future()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.commands.put(RobotCommand(steps, perspective, deadline, future))
+        return future
+
+    def submit_hover(self, square: int, perspective: chess.Color = chess.WHITE) -> Future:
+        """
+        Moves the arm over square unless other commands are waiting by then
+        """
+        future = Future()
+        self.commands.put(RobotCommand([], perspective, None, future, hover=square))
+        return future
+
+    def cancel_pending(self) -> int:
+        """
+        Cancels commands that were not sent yet, the one in flight completes
+        """
+        cancelled = 0
+        while True:
+            try:
+                command = self.commands.get_nowait()
+            except queue.Empty:
+                break
+
+            if command is None:
+                # Keep the close request
+                self.commands.put(None)
+                break
+
+            if command.future.cancel():
+                cancelled += 1
+
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} pending robot commands")
+        return cancelled
+
+    def close(self):
+        self.cancel_pending()
+        self.commands.put(None)
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _run(self):
+        while True:
+            command = self.commands.get()
+            if command is None:
+                return
+
+            if not command.future.set_running_or_notify_cancel():
+                continue
+
+            if command.hover is not None:
+                self._hover(command)
+                continue
+
+            if command.deadline is not None and command.deadline <= time.monotonic():
+                command.future.set_exception(TimeoutError("Robot command deadline passed before it was sent"))
+                continue
+
+            try:
+                completed = robot.issue_steps(command.steps, command.perspective, deadline=command.deadline)
+            except Exception as e:
+                logger.exception(e)
+                command.future.set_exception(e)
+            else:
+                command.future.set_result(completed)
+
+    def _hover(self, command: RobotCommand):
+        if not self.commands.empty():
+            # The arm goes straight to the queued work
+            command.future.set_result(robot.COMMAND_FAILURE)
+            return
+
+        try:
+            response = robot.issue_hover(command.hover, command.perspective)
+        except Exception as e:
+            logger.exception(e)
+            command.future.set_exception(e)
+        else:
+            command.future.set_result(response)
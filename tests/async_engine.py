@@ -0,0 +1,104 @@
+import sys
+import threading
+import time
+import unittest
+import chess
+import chess.engine
+from src.async_engine import SyncEngine, CancelToken, EngineCancelled
+
+# Minimal UCI engine: plays its first legal move, "go movetime" searches until the time is up or "stop"
+ENGINE_SCRIPT = r'''
+import sys, threading, chess
+board = chess.Board()
+stop = threading.Event()
+
+def out(line):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+def go(seconds):
+    stop.wait(seconds)
+    out("bestmove " + next(iter(board.legal_moves)).uci())
+
+for line in sys.stdin:
+    words = line.split()
+    if not words:
+        continue
+    if words[0] == "uci":
+        out("id name Fake")
+        out("uciok")
+    elif words[0] == "isready":
+        out("readyok")
+    elif words[0] == "position":
+        board = chess.Board()
+        if "moves" in words:
+            for move in words[words.index("moves") + 1:]:
+                board.push_uci(move)
+    elif words[0] == "go":
+        seconds = int(words[words.index("movetime") + 1]) / 1000 if "movetime" in words else 0
+        stop.clear()
+        threading.Thread(target=go, args=(seconds,)).start()
+    elif words[0] == "stop":
+        stop.set()
+    elif words[0] == "quit":
+        stop.set()
+        break
+'''
+
+
+class TestSyncEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = SyncEngine.popen_uci([sys.executable, "-c", ENGINE_SCRIPT])
+        self.addCleanup(self.engine.quit)
+
+    def test_play(self):
+        board = chess.Board()
+        result = self.engine.play(board, chess.engine.Limit(depth=1))
+        self.assertIn(result.move, board.legal_moves)
+
+    def test_cancel_mid_search(self):
+        token = CancelToken()
+        timer = threading.Timer(0.2, token.cancel)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        start = time.monotonic()
+        with self.assertRaises(EngineCancelled):
+            self.engine.play(chess.Board(), chess.engine.Limit(time=30), token=token)
+        self.assertLess(time.monotonic() - start, 10)
+
+        # The engine stopped searching and answers the next command
+        board = chess.Board()
+        board.push_uci("e2e4")
+        result = self.engine.play(board, chess.engine.Limit(depth=1), token=CancelToken())
+        self.assertIn(result.move, board.legal_moves)
+
+    def test_cancelled_token_does_not_search(self):
+        token = CancelToken()
+        token.cancel()
+
+        with self.assertRaises(EngineCancelled):
+            self.engine.play(chess.Board(), chess.engine.Limit(time=30), token=token)
+        self.assertEqual([], token.callbacks)
+
+
+class TestCancelToken(unittest.TestCase):
+    def test_callbacks_run_once(self):
+        token = CancelToken()
+        calls = []
+        token.add_callback(lambda: calls.append("first"))
+        removed = lambda: calls.append("removed")
+        token.add_callback(removed)
+        token.remove_callback(removed)
+
+        token.cancel()
+        token.cancel()
+        # Added after cancelling, runs at once
+        token.add_callback(lambda: calls.append("late"))
+
+        self.assertTrue(token.cancelled)
+        self.assertEqual(["first", "late"], calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
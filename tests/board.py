@@ -0,0 +1,134 @@
+import unittest
+import copy
+import chess
+import numpy as np
+from src.board import RealBoard, SquareOffset, SQUARE_CENTER, board_diff, boards_are_equal
+
+
+class TestRealBoardOffsets(unittest.TestCase):
+    def setUp(self):
+        self.board = RealBoard()
+
+    def test_default_offsets_centered(self):
+        for square in chess.SQUARES:
+            self.assertEqual(SQUARE_CENTER, self.board.offset(square))
+
+    def test_set_offset(self):
+        self.board.set_offset(chess.E4, SquareOffset(0.5, -0.25))
+        self.assertEqual(SquareOffset(0.5, -0.25), self.board.offset(chess.E4))
+        self.assertEqual(SQUARE_CENTER, self.board.offset(chess.E5))
+
+    def test_set_offsets_bulk(self):
+        squares = np.array([chess.A1, chess.H8])
+        offsets = np.array([[0.1, 0.2], [-0.3, -0.4]], dtype=np.float32)
+        self.board.set_offsets(squares, offsets)
+
+        self.assertAlmostEqual(0.1, self.board.offset(chess.A1).x, places=6)
+        self.assertAlmostEqual(-0.4, self.board.offset(chess.H8).y, places=6)
+
+    def test_offsets_from_list(self):
+        offsets = [SquareOffset(square / 100, 0) for square in chess.SQUARES]
+        board = RealBoard(offsets=offsets)
+
+        self.assertEqual((64, 2), board.offsets.shape)
+        self.assertAlmostEqual(0.63, board.offset(chess.H8).x, places=6)
+
+    def test_push_resets_from_offset(self):
+        self.board.set_offset(chess.E2, SquareOffset(0.5, 0.5))
+        self.board.push(chess.Move.from_uci("e2e4"), to_offset=SquareOffset(0.1, 0.1))
+
+        self.assertEqual(SQUARE_CENTER, self.board.offset(chess.E2))
+        self.assertAlmostEqual(0.1, self.board.offset(chess.E4).x, places=6)
+
+    def test_clear_board(self):
+        self.board.set_offset(chess.E2, SquareOffset(0.5, 0.5))
+        self.board.clear_board()
+
+        self.assertFalse(self.board.offsets.any())
+        self.assertEqual(0, len(self.board.piece_map()))
+
+    def test_copy(self):
+        board = copy.copy(self.board)
+        self.assertIs(board.chess_board, self.board.chess_board)
+
+
+class TestRealBoardFromPieces(unittest.TestCase):
+    def test_matches_piece_map(self):
+        expected = chess.Board()
+        piece_map = expected.piece_map()
+
+        board = RealBoard.from_pieces(list(piece_map.keys()), list(piece_map.values()))
+
+        self.assertEqual(expected.board_fen(), board.board_fen())
+        self.assertEqual(expected.occupied, board.occupied)
+        self.assertFalse(board.offsets.any())
+
+    def test_home_pieces_keep_castling_rights(self):
+        piece_map = chess.Board().piece_map()
+        board = RealBoard.from_pieces(list(piece_map.keys()), list(piece_map.values()))
+        self.assertEqual(chess.BB_CORNERS, board.chess_board.castling_rights)
+
+        del piece_map[chess.H1]
+        board = RealBoard.from_pieces(list(piece_map.keys()), list(piece_map.values()))
+        self.assertEqual(chess.BB_A1 | chess.BB_A8 | chess.BB_H8, board.chess_board.castling_rights)
+
+    def test_offsets_attached(self):
+        squares = np.array([chess.E4, chess.D5])
+        pieces = [chess.Piece(chess.PAWN, chess.WHITE), chess.Piece(chess.PAWN, chess.BLACK)]
+        offsets = np.array([[0.1, 0.2], [0.3, 0.4]], dtype=np.float32)
+
+        board = RealBoard.from_pieces(squares, pieces, offsets, perspective=chess.BLACK)
+
+        self.assertEqual(chess.BLACK, board.perspective)
+        self.assertEqual(pieces[1], board.piece_at(chess.D5))
+        self.assertAlmostEqual(0.3, board.offset(chess.D5).x, places=6)
+
+    def test_later_duplicate_wins(self):
+        pieces = [chess.Piece(chess.ROOK, chess.WHITE), chess.Piece(chess.QUEEN, chess.BLACK)]
+        board = RealBoard.from_pieces([chess.A1, chess.A1], pieces)
+
+        self.assertEqual(pieces[1], board.piece_at(chess.A1))
+        self.assertEqual(1, len(board.piece_map()))
+
+    def test_none_pieces_skipped(self):
+        board = RealBoard.from_pieces([chess.A1, chess.B1], [None, chess.Piece(chess.KING, chess.WHITE)])
+
+        self.assertIsNone(board.piece_at(chess.A1))
+        self.assertEqual(chess.B1, board.king(chess.WHITE))
+
+
+class TestBoardDiff(unittest.TestCase):
+    def assert_diff_matches_squares(self, prev_board: chess.Board, current_board: chess.Board):
+        disappeared, appeared = board_diff(prev_board, current_board)
+
+        for square in chess.SQUARES:
+            prev_piece = prev_board.piece_at(square)
+            curr_piece = current_board.piece_at(square)
+
+            self.assertEqual(prev_piece is not None and curr_piece is None, bool(disappeared & chess.BB_SQUARES[square]))
+            self.assertEqual(prev_piece != curr_piece and curr_piece is not None, bool(appeared & chess.BB_SQUARES[square]))
+
+    def test_equal(self):
+        self.assertTrue(boards_are_equal(chess.Board(), chess.Board()))
+        self.assertEqual((0, 0), board_diff(chess.Board(), chess.Board()))
+
+    def test_colour_change(self):
+        board = chess.Board()
+        board.set_piece_at(chess.E2, chess.Piece(chess.PAWN, chess.BLACK))
+
+        self.assertFalse(boards_are_equal(chess.Board(), board))
+        self.assertEqual(chess.BB_E2, board_diff(chess.Board(), board)[1])
+
+    def test_moves_match_square_comparison(self):
+        board = chess.Board("r3k2r/pPp2ppp/8/3pP3/8/8/PPP2PPP/R3K2R w KQkq d6 0 1")
+
+        for move in board.legal_moves:
+            after = board.copy(stack=False)
+            after.push(move)
+
+            self.assertFalse(boards_are_equal(board, after))
+            self.assert_diff_matches_squares(board, after)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import os
+import random
+import struct
+import tempfile
+import chess
+import chess.polyglot
+from src.book import OpeningBook
+
+
+def polyglot_move(move: chess.Move) -> int:
+    return (chess.square_file(move.to_square) | chess.square_rank(move.to_square) << 3 |
+            chess.square_file(move.from_square) << 6 | chess.square_rank(move.from_square) << 9)
+
+
+class TestOpeningBook(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.bin")
+
+        key = chess.polyglot.zobrist_hash(chess.Board())
+        with open(self.path, "wb") as book_file:
+            for uci, weight in (("e2e4", 10), ("d2d4", 1)):
+                book_file.write(struct.pack(">QHHI", key, polyglot_move(chess.Move.from_uci(uci)), weight, 0))
+
+        self.book = OpeningBook(self.path, weighted_levels=(1,), rng=random.Random(0))
+
+    def tearDown(self):
+        self.book.close()
+        self.directory.cleanup()
+
+    def test_strongest_level_plays_best_move(self):
+        for _ in range(10):
+            self.assertEqual(chess.Move.from_uci("e2e4"), self.book.choose(chess.Board(), level=10))
+
+    def test_weighted_level_varies(self):
+        moves = {self.book.choose(chess.Board(), level=1) for _ in range(100)}
+        self.assertEqual({chess.Move.from_uci("e2e4"), chess.Move.from_uci("d2d4")}, moves)
+
+    def test_out_of_book(self):
+        board = chess.Board()
+        board.push_uci("a2a3")
+        self.assertIsNone(self.book.choose(board, level=10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import time
+import unittest
+from unittest import mock
+import numpy as np
+from src import camera
+from src.camera import CameraBoardDetection, CameraClock
+
+
+class Node:
+    def __init__(self, value=None):
+        self.value = value
+        self.executed = 0
+
+    def Execute(self):
+        self.executed += 1
+        if isinstance(self.value, Exception):
+            raise self.value
+
+    def GetValue(self):
+        return self.value() if callable(self.value) else self.value
+
+
+class Chunk:
+    def __init__(self, value: int):
+        self.Value = value
+
+
+class GrabResult:
+    def __init__(self, ticks: int, image: np.ndarray):
+        self.ChunkTimestamp = Chunk(ticks)
+        self.Array = image
+
+    def GrabSucceeded(self) -> bool:
+        return True
+
+
+class FakeCamera:
+    """USB camera whose clock counts nanoseconds since it was created"""
+
+    def __init__(self, frame_times: list[float]):
+        self.epoch = time.monotonic()
+        self.TimestampLatch = Node()
+        self.TimestampLatchValue = Node(lambda: self.ticks(time.monotonic()))
+        # Exposure times of the frames in the buffer, as time.monotonic()
+        self.frames = [GrabResult(self.ticks(at), np.full((2, 2), index, dtype=np.uint8)) for index, at in enumerate(frame_times)]
+
+    def ticks(self, host: float) -> int:
+        return int((host - self.epoch) * 1e9)
+
+    def IsGrabbing(self) -> bool:
+        return True
+
+    def RetrieveResult(self, timeout: int, handling) -> GrabResult:
+        return self.frames.pop(0)
+
+
+class TestCameraClock(unittest.TestCase):
+    def test_to_host(self):
+        clock = CameraClock(offset=10.0, frequency=1e9)
+        self.assertAlmostEqual(12.5, clock.to_host(2_500_000_000))
+
+    def test_latch_maps_ticks_to_host_time(self):
+        fake = FakeCamera([])
+        clock = CameraClock.latch(fake)
+
+        now = time.monotonic()
+        self.assertAlmostEqual(now, clock.to_host(fake.ticks(now)), places=2)
+
+
+class TestCaptureImage(unittest.TestCase):
+    def make_detection(self, fake: FakeCamera) -> CameraBoardDetection:
+        detection = CameraBoardDetection(model=None, camera=fake)
+        # Frames are used as they come, without colour conversion and board cropping
+        for name in ("_preprocess_image", "_crop_image"):
+            patcher = mock.patch.object(detection, name, lambda image: image)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return detection
+
+    def test_frames_before_after_are_skipped(self):
+        now = time.monotonic()
+        detection = self.make_detection(FakeCamera([now - 1.0, now - 0.1, now + 0.1, now + 0.2]))
+
+        frame = detection.capture_image(after=now)
+
+        self.assertEqual(2, frame.image[0, 0])
+        self.assertAlmostEqual(now + 0.1, frame.timestamp, places=2)
+
+    def test_without_after_first_frame_is_used(self):
+        now = time.monotonic()
+        detection = self.make_detection(FakeCamera([now - 1.0, now]))
+        self.assertEqual(0, detection.capture_image().image[0, 0])
+
+    def test_failed_resync_waits_another_interval(self):
+        now = time.monotonic()
+        fake = FakeCamera([now + 0.1, now + 0.2, now + 0.3])
+        detection = self.make_detection(fake)
+        fake.TimestampLatch = Node(RuntimeError("latch not supported"))
+        detection.clock.latched_at -= camera.CLOCK_RESYNC_INTERVAL + 1
+
+        for _ in range(3):
+            detection.capture_image()
+
+        self.assertEqual(1, fake.TimestampLatch.executed)
+
+
+if __name__ == '__main__':
+    unittest.main()
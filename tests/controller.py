@@ -0,0 +1,106 @@
+import unittest
+import threading
+import chess
+from src.game import HUMAN, ROBOT
+from src.controller import GameController, HUMAN_TURN, ROBOT_TURN, FINISHED, STOPPED, FAILED
+
+
+class FakeGame:
+    """Human moves after a number of idle polls, the robot replies at once"""
+
+    def __init__(self, idle_polls: int, moves: int):
+        self.player = HUMAN
+        self.idle_polls = idle_polls
+        self.moves = moves
+        self.human_polls = 0
+        self.resigned = False
+
+    def result(self) -> str:
+        if self.resigned:
+            return "resigned"
+        return "*" if self.moves else "1-0"
+
+    def player_made_move(self):
+        self.human_polls += 1
+        if self.human_polls <= self.idle_polls:
+            return None, False
+        self.human_polls = 0
+        self.player = ROBOT
+        return chess.Move.from_uci("e2e4"), True
+
+    def robot_makes_move(self):
+        self.moves -= 1
+        self.player = HUMAN
+        return chess.Move.from_uci("e7e5")
+
+
+class TestGameController(unittest.TestCase):
+    def run_controller(self, game, **kwargs) -> tuple[GameController, list[int], list[chess.Move]]:
+        states, moves = [], []
+        controller = GameController(game, on_state=states.append, on_move=moves.append, **kwargs)
+        controller.start()
+        self.addCleanup(controller.stop)
+        return controller, states, moves
+
+    def test_plays_through_turn_states(self):
+        controller, states, moves = self.run_controller(FakeGame(idle_polls=2, moves=2), min_interval=0.001, max_interval=0.002)
+        controller.join(timeout=5)
+
+        self.assertEqual([HUMAN_TURN, ROBOT_TURN, HUMAN_TURN, ROBOT_TURN, FINISHED], states)
+        self.assertEqual(4, len(moves))
+
+    def test_idle_polls_back_off(self):
+        game = FakeGame(idle_polls=10, moves=1)
+        controller = GameController(game, min_interval=0.001, max_interval=0.004)
+        intervals = []
+        player_made_move = game.player_made_move
+        game.player_made_move = lambda: (intervals.append(controller.interval), player_made_move())[1]
+
+        controller.start()
+        controller.join(timeout=5)
+
+        self.assertEqual(sorted(intervals), intervals)
+        self.assertAlmostEqual(0.004, intervals[-1])
+        self.assertAlmostEqual(0.001, controller.interval)
+        self.assertEqual(12, controller.polls)
+
+    def test_stop_ends_an_idle_wait(self):
+        game = FakeGame(idle_polls=1000, moves=1)
+        polled = threading.Event()
+        player_made_move = game.player_made_move
+        game.player_made_move = lambda: (player_made_move(), polled.set())[0]
+
+        controller, states, moves = self.run_controller(game, min_interval=10, max_interval=10)
+        self.assertTrue(polled.wait(timeout=5))
+        controller.stop()
+        controller.join(timeout=5)
+
+        self.assertFalse(controller.thread.is_alive())
+        self.assertEqual(STOPPED, states[-1])
+
+    def test_resign_notify_finishes(self):
+        game = FakeGame(idle_polls=1000, moves=1)
+        controller, states, moves = self.run_controller(game, min_interval=10, max_interval=10)
+
+        game.resigned = True
+        controller.notify()
+        controller.join(timeout=5)
+
+        self.assertEqual(FINISHED, states[-1])
+
+    def test_game_error_fails(self):
+        game = FakeGame(idle_polls=0, moves=1)
+
+        def robot_makes_move():
+            raise RuntimeError("Robot hand timed out")
+
+        game.robot_makes_move = robot_makes_move
+        controller, states, moves = self.run_controller(game, min_interval=0.001, max_interval=0.001)
+        controller.join(timeout=5)
+
+        self.assertFalse(controller.thread.is_alive())
+        self.assertEqual([HUMAN_TURN, ROBOT_TURN, FAILED], states)
+
+
+if __name__ == '__main__':
+    unittest.main()
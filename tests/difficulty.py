@@ -0,0 +1,33 @@
+import unittest
+from src.difficulty import DIFFICULTY_PROFILES, difficulty_profile, sample_positions
+
+
+class TestDifficulty(unittest.TestCase):
+    def test_gui_levels(self):
+        for level in (1, 3, 6, 10):
+            self.assertIs(DIFFICULTY_PROFILES[level], difficulty_profile(level))
+
+    def test_unknown_level_uses_closest(self):
+        self.assertEqual("intermediate", difficulty_profile(4).name)
+        self.assertEqual("unbeatable", difficulty_profile(20).name)
+
+    def test_think_time_grows_with_level(self):
+        profiles = [DIFFICULTY_PROFILES[level] for level in sorted(DIFFICULTY_PROFILES)]
+        for weaker, stronger in zip(profiles, profiles[1:]):
+            self.assertLess(weaker.time, stronger.time)
+            self.assertLess(weaker.skill, stronger.skill)
+
+    def test_limit_bounds_time_and_nodes(self):
+        limit = difficulty_profile(6).limit
+        self.assertIsNotNone(limit.time)
+        self.assertIsNotNone(limit.nodes)
+        self.assertIsNone(limit.depth)
+
+    def test_sample_positions_repeatable(self):
+        first = [board.fen() for board in sample_positions(5, seed=1)]
+        second = [board.fen() for board in sample_positions(5, seed=1)]
+        self.assertEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
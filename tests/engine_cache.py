@@ -0,0 +1,85 @@
+import unittest
+import os
+import tempfile
+import chess
+import chess.engine
+from src.engine_cache import EngineCache, limit_profile
+
+
+class FixedEngine:
+    def __init__(self, move: str):
+        self.move = chess.Move.from_uci(move)
+        self.calls = 0
+        self.kwargs = {}
+
+    def play(self, board: chess.Board, limit: chess.engine.Limit, **kwargs) -> chess.engine.PlayResult:
+        self.calls += 1
+        self.kwargs = kwargs
+        return chess.engine.PlayResult(self.move, None)
+
+
+class TestEngineCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite")
+        self.limit = chess.engine.Limit(depth=4)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_through(self):
+        engine = FixedEngine("e2e4")
+        cache = EngineCache(self.path)
+
+        for _ in range(3):
+            self.assertEqual(engine.move, cache.play(engine, chess.Board(), self.limit))
+
+        self.assertEqual(1, engine.calls)
+        self.assertEqual(2, cache.hits)
+        self.assertEqual(1, cache.searches)
+        cache.close()
+
+    def test_search_arguments_passed_on(self):
+        engine = FixedEngine("e2e4")
+        cache = EngineCache(self.path)
+
+        cache.play(engine, chess.Board(), self.limit, game="session")
+        self.assertEqual({"game": "session"}, engine.kwargs)
+        cache.close()
+
+    def test_persistent(self):
+        cache = EngineCache(self.path)
+        cache.play(FixedEngine("d2d4"), chess.Board(), self.limit)
+        cache.close()
+
+        engine = FixedEngine("e2e4")
+        cache = EngineCache(self.path)
+        self.assertEqual(chess.Move.from_uci("d2d4"), cache.play(engine, chess.Board(), self.limit))
+        self.assertEqual(0, engine.calls)
+        cache.close()
+
+    def test_profiles_separate(self):
+        cache = EngineCache(self.path)
+        cache.put(chess.Board(), limit_profile(self.limit, level=1), chess.Move.from_uci("a2a3"))
+
+        self.assertIsNone(cache.get(chess.Board(), limit_profile(self.limit, level=2)))
+        self.assertEqual("depth=4,level=1", limit_profile(self.limit, level=1))
+        cache.close()
+
+    def test_eviction(self):
+        cache = EngineCache(self.path, max_entries=10)
+        board = chess.Board()
+
+        for move in list(board.legal_moves):
+            board.push(move)
+            cache.put(board, "profile", chess.Move.from_uci("a7a6"))
+            board.pop()
+
+        self.assertLessEqual(cache.entries, 10)
+        count, = cache.connection.execute("SELECT COUNT(*) FROM engine_moves").fetchone()
+        self.assertEqual(cache.entries, count)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
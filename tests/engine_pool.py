@@ -0,0 +1,83 @@
+import unittest
+import chess
+import chess.engine
+from src.engine_pool import EnginePool, PooledEngine
+
+
+class FakeEngine:
+    def __init__(self):
+        self.alive = True
+        self.crash_next_play = False
+        self.options = []
+
+    def ping(self, timeout=None):
+        if not self.alive:
+            raise chess.engine.EngineTerminatedError("engine process died")
+
+    def play(self, board: chess.Board, limit: chess.engine.Limit, options=None) -> chess.engine.PlayResult:
+        if self.crash_next_play:
+            self.alive = False
+            raise chess.engine.EngineTerminatedError("engine process died")
+
+        self.options.append(options)
+        return chess.engine.PlayResult(next(iter(board.legal_moves)), None)
+
+    def quit(self):
+        self.alive = False
+
+
+class TestEnginePool(unittest.TestCase):
+    def setUp(self):
+        self.started = []
+
+        def factory():
+            engine = FakeEngine()
+            self.started.append(engine)
+            return engine
+
+        self.pool = EnginePool(factory, size=2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_checkout_is_exclusive(self):
+        with self.pool.checkout() as first, self.pool.checkout() as second:
+            self.assertIsNot(first, second)
+            self.assertEqual(0, len(self.pool.idle))
+
+        self.assertEqual(2, len(self.pool.idle))
+
+    def test_dead_engine_restarted_on_checkout(self):
+        for engine in self.started:
+            engine.alive = False
+
+        with self.pool.checkout() as engine:
+            self.assertTrue(engine.alive)
+
+        self.assertEqual(1, self.pool.restarts)
+        self.assertEqual(3, len(self.started))
+
+    def test_crash_during_command_retried(self):
+        crashing = self.started[0]
+        crashing.crash_next_play = True
+
+        result = PooledEngine(self.pool).play(chess.Board(), chess.engine.Limit(depth=1))
+
+        self.assertIn(result.move, chess.Board().legal_moves)
+        self.assertEqual(1, self.pool.restarts)
+        self.assertNotIn(crashing, self.pool.engines)
+
+    def test_last_engine_preferred(self):
+        pooled = PooledEngine(self.pool)
+        for _ in range(3):
+            pooled.play(chess.Board(), chess.engine.Limit(depth=1))
+
+        self.assertEqual([3, 0], [len(engine.options) for engine in self.started])
+
+    def test_options_sent_with_every_command(self):
+        pooled = PooledEngine(self.pool, {"Skill Level": 3})
+        pooled.play(chess.Board(), chess.engine.Limit(depth=1), options={"Hash": 32})
+        pooled.play(chess.Board(), chess.engine.Limit(depth=1))
+
+        sent = [options for engine in self.started for options in engine.options]
+        self.assertEqual([{"Skill Level": 3, "Hash": 32}, {"Skill Level": 3}], sent)
@@ -0,0 +1,354 @@
+import os
+import tempfile
+import unittest
+from typing import Optional
+from unittest import mock
+import chess
+import chess.engine
+import numpy as np
+from src import robot
+from src.board import RealBoard, BoardDetection
+from src.engine_cache import EngineCache
+from src.multipv import MultiPVSearch
+from src import game as game_module
+from src.game import Game, HUMAN, ROBOT
+
+
+class FakeEngine:
+    """Plays a fixed move when it is legal, the first legal move otherwise"""
+
+    def __init__(self, move: Optional[str] = None):
+        self.move = chess.Move.from_uci(move) if move else None
+        self.calls = 0
+
+    def configure(self, options: dict):
+        pass
+
+    def play(self, board: chess.Board, limit: chess.engine.Limit, **kwargs) -> chess.engine.PlayResult:
+        self.calls += 1
+        move = self.move if self.move in board.legal_moves else next(iter(board.legal_moves))
+        return chess.engine.PlayResult(move, None)
+
+
+class FakeDetection(BoardDetection):
+    """Shows the placement of board to every capture, upcoming boards replace it one per capture"""
+
+    def __init__(self, board: Optional[chess.Board] = None):
+        self.board = board or chess.Board()
+        self.upcoming: list[Optional[chess.Board]] = []
+        self.captures = 0
+
+    def capture_board(self, perspective: chess.Color = chess.WHITE, after: Optional[float] = None) -> Optional[RealBoard]:
+        self.captures += 1
+        if self.upcoming:
+            self.board = self.upcoming.pop(0)
+        return detected(self.board, perspective)
+
+
+class FrameDetection(FakeDetection):
+    """Single frames show the boards of frames while there are any, then board"""
+
+    def __init__(self, board: Optional[chess.Board] = None):
+        super().__init__(board)
+        self.frames: list[chess.Board] = []
+        self.frame_afters: list[Optional[float]] = []
+
+    def capture_frame(self, perspective: chess.Color = chess.WHITE, after: Optional[float] = None) -> Optional[RealBoard]:
+        self.frame_afters.append(after)
+        return detected(self.frames.pop(0) if self.frames else self.board, perspective)
+
+
+def detected(board: Optional[chess.Board], perspective: chess.Color = chess.WHITE) -> Optional[RealBoard]:
+    # Like detected boards: placement only, built without history
+    if board is None:
+        return None
+    piece_map = board.piece_map()
+    return RealBoard.from_pieces(list(piece_map), list(piece_map.values()), perspective=perspective)
+
+
+def played(*moves: str, board: Optional[chess.Board] = None) -> chess.Board:
+    board = (board or chess.Board()).copy()
+    for move in moves:
+        board.push_uci(move)
+    return board
+
+
+class GameTestCase(unittest.TestCase):
+    def setUp(self):
+        self.commands = []
+
+        def issue_command(command: str, timeout_max=robot.DELAY_TIMEOUT) -> int:
+            self.commands.append(command)
+            return robot.COMMAND_SUCCESS
+
+        patcher = mock.patch.object(robot, "issue_command", issue_command)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.detection = FakeDetection()
+        self.engine = FakeEngine()
+
+    def make_game(self, **kwargs) -> Game:
+        return Game(self.detection, self.engine, **kwargs)
+
+
+class TestReconcile(GameTestCase):
+    def test_human_move_is_detected(self):
+        game = self.make_game()
+        self.detection.board = played("e2e4")
+
+        move, detected = game.player_made_move()
+
+        self.assertEqual(chess.Move.from_uci("e2e4"), move)
+        self.assertEqual(ROBOT, game.player)
+
+    def test_missed_plies_in_new_position(self):
+        game = self.make_game()
+        self.engine.move = chess.Move.from_uci("e7e5")
+        self.detection.board = played("e2e4", "e7e5", "g1f3")
+
+        move, detected = game.player_made_move()
+
+        # Any order of the two human moves around the robot's reply explains the board
+        self.assertIsNotNone(move)
+        self.assertEqual(ROBOT, game.player)
+        self.assertEqual(played("e2e4", "e7e5", "g1f3").board_fen(), game.chess_board().board_fen())
+        self.assertEqual(3, len(game.chess_board().move_stack))
+
+    def test_human_cannot_play_robot_side(self):
+        game = self.make_game()
+        self.engine.move = chess.Move.from_uci("c7c5")
+        self.detection.board = played("e2e4", "e7e5", "g1f3")
+
+        move, detected = game.player_made_move()
+
+        self.assertIsNone(move)
+        self.assertEqual(HUMAN, game.player)
+        self.assertEqual(chess.Board().fen(), game.chess_board().fen())
+
+    def test_robot_turn_does_not_reconcile(self):
+        game = self.make_game()
+        self.detection.board = played("e2e4")
+        game.player_made_move()
+
+        # The human moves a black pawn for the robot
+        self.detection.board = played("e2e4", "e7e5")
+        self.assertIsNone(game.robot_makes_move())
+        self.assertEqual(0, self.engine.calls)
+        self.assertEqual(ROBOT, game.player)
+
+    def test_robot_move_of_repeated_position_is_assumed(self):
+        game = self.make_game()
+        moves = ["g1f3", "g8f6", "f3g1", "f6g8"]
+        self.engine.move = None
+
+        # Robot shuffles its knight, the same position comes back
+        for human, reply in (("g1f3", "g8f6"), ("f3g1", "f6g8")):
+            self.detection.board = played(human, board=game.chess_board())
+            game.player_made_move()
+            self.engine.move = chess.Move.from_uci(reply)
+            self.detection.board = game.chess_board()
+            self.assertEqual(self.engine.move, game.robot_makes_move())
+
+        self.assertEqual(played(*moves).fen(), game.chess_board().fen())
+
+        # The robot's last move is seen in place
+        self.assertEqual((None, False), game.player_made_move())
+
+        # Missed: the human repeats g1f3, the robot its known reply, the human plays e2e4
+        self.detection.board = played("g1f3", "g8f6", "e2e4", board=game.chess_board())
+        move, detected = game.player_made_move()
+
+        self.assertEqual(chess.Move.from_uci("e2e4"), move)
+        self.assertEqual(ROBOT, game.player)
+
+
+class TestRobotMoveVerification(GameTestCase):
+    def setUp(self):
+        super().setUp()
+        self.detection = FrameDetection()
+        self.engine.move = chess.Move.from_uci("e7e5")
+
+        self.game = self.make_game()
+        self.detection.board = played("e2e4")
+        self.game.player_made_move()
+        self.detection.board = self.game.chess_board()
+        self.game.robot_makes_move()
+        self.captures = self.detection.captures
+        self.frames = len(self.detection.frame_afters)
+
+    def test_verified_move(self):
+        verification = self.game.verification
+        self.assertIsNotNone(verification)
+        self.assertEqual(chess.BB_E7 | chess.BB_E5, verification.squares)
+
+        self.assertEqual((None, False), self.game.player_made_move())
+        self.assertIsNone(self.game.verification)
+        self.assertEqual(verification.after, self.detection.frame_afters[self.frames])
+        # The second frame showed the known board, no full capture was needed
+        self.assertEqual(self.frames + 2, len(self.detection.frame_afters))
+        self.assertEqual(self.captures, self.detection.captures)
+
+    def test_mismatch_on_changed_square(self):
+        # The arm dropped the pawn before e5
+        self.detection.frames = [played("e2e4", "e7e6")]
+
+        self.assertEqual((None, False), self.game.player_made_move())
+        self.assertIsNotNone(self.game.verification)
+        self.assertEqual(self.captures, self.detection.captures)
+
+    def test_human_reply_on_top_verifies(self):
+        self.detection.board = played("e2e4", "e7e5", "g1f3")
+        self.detection.frames = [played("e2e4", "e7e5", "d2d4")]
+
+        move, detected_move = self.game.player_made_move()
+
+        self.assertIsNone(self.game.verification)
+        self.assertEqual(chess.Move.from_uci("g1f3"), move)
+
+    def test_timeout_falls_back_to_full_captures(self):
+        self.detection.frames = [played("e2e4", "e7e6")]
+
+        with mock.patch.object(game_module, "VERIFY_TIMEOUT", -60):
+            self.assertEqual((None, False), self.game.player_made_move())
+        self.assertIsNone(self.game.verification)
+
+        # The next poll is a normal one
+        self.detection.board = played("e2e4", "e7e5", "g1f3")
+        move, detected_move = self.game.player_made_move()
+        self.assertEqual(chess.Move.from_uci("g1f3"), move)
+        self.assertEqual(self.captures + 1, self.detection.captures)
+
+
+class TestReset(GameTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ("CAPTURE_DELAY", "MAX_CAPTURE_DELAY"):
+            patcher = mock.patch.object(game_module, name, 0)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reset_board_can_castle(self):
+        game = self.make_game()
+        # Knights scattered, the next capture shows the arm's work
+        self.detection.upcoming = [played("g1f3", "g8f6", "b1c3", "b8c6"), chess.Board()]
+        game.reset_board(move_pieces=True)
+
+        board = game.chess_board()
+        self.assertEqual(chess.Board().fen(), board.fen())
+        for move in ("g1f3", "g8f6", "g2g3", "g7g6", "f1g2", "f8g7", "e1g1"):
+            board.push_uci(move)
+        self.assertIn(chess.Move.from_uci("e8g8"), board.legal_moves)
+
+    def test_reset_keeps_detected_offsets(self):
+        game = self.make_game()
+        offset_board = RealBoard.from_pieces([chess.E1], [chess.Piece(chess.KING, chess.WHITE)],
+                                             np.array([[0.25, -0.5]], dtype=np.float32))
+        self.detection.capture_board = lambda perspective=chess.WHITE, after=None: RealBoard(chess.Board(), offset_board.offsets)
+        game.reset_board(move_pieces=True)
+
+        self.assertAlmostEqual(0.25, game.board.offset(chess.E1).x)
+        self.assertTrue(game.chess_board().has_kingside_castling_rights(chess.WHITE))
+
+    def test_no_board_detected_gives_up(self):
+        game = self.make_game()
+        self.detection.board = None
+
+        with self.assertRaises(RuntimeError):
+            game.reset_board(move_pieces=True)
+        self.assertEqual(game_module.CAPTURE_ATTEMPTS, self.detection.captures)
+
+    def test_unplannable_reset_is_retried(self):
+        game = self.make_game()
+        scattered = played("g1f3", "g8f6")
+        self.detection.upcoming = [scattered, scattered, chess.Board()]
+        plan_reset = game_module.reset_planner.plan_reset
+        plans = [mock.Mock(side_effect=ValueError("No free square to break a reset cycle")), plan_reset]
+
+        with mock.patch.object(game_module.reset_planner, "plan_reset", lambda *args: plans.pop(0)(*args)):
+            game.reset_board(move_pieces=True)
+
+        self.assertEqual(chess.Board().fen(), game.chess_board().fen())
+        self.assertEqual([], plans)
+        self.assertEqual(3, self.detection.captures)
+
+    def test_empty_reset_plan(self):
+        game = self.make_game()
+        arm_clear_at = game.arm_clear_at
+        self.detection.upcoming = [played("g1f3", "g8f6"), chess.Board()]
+
+        with mock.patch.object(game_module.reset_planner, "plan_reset", return_value=[]):
+            game.reset_board(move_pieces=True)
+
+        self.assertEqual(chess.Board().fen(), game.chess_board().fen())
+        self.assertEqual(arm_clear_at, game.arm_clear_at)
+
+
+class RandomBook:
+    """Draws the next of its replies on every choose, like a weighted book"""
+
+    def __init__(self, *replies: str):
+        self.replies = [chess.Move.from_uci(reply) for reply in replies]
+        self.draws = 0
+
+    def choose(self, board: chess.Board, level: int) -> Optional[chess.Move]:
+        self.draws += 1
+        return self.replies[(self.draws - 1) % len(self.replies)]
+
+
+class TestBookMoves(GameTestCase):
+    def test_prediction_is_the_move_played(self):
+        book = RandomBook("e7e5", "c7c5")
+        game = self.make_game(book=book)
+        self.detection.board = played("e2e4")
+        game.player_made_move()
+
+        predicted = game._predicted_move()
+        self.detection.board = game.chess_board()
+
+        self.assertEqual(predicted, game.robot_makes_move())
+        self.assertEqual(1, book.draws)
+        self.assertEqual(0, self.engine.calls)
+
+
+class TestEngineMoves(GameTestCase):
+    def play_reply(self, game: Game) -> Optional[chess.Move]:
+        self.detection.board = played("e2e4")
+        game.player_made_move()
+        self.detection.board = game.chess_board()
+        return game.robot_makes_move()
+
+    def test_cache_hits_are_not_engine_calls(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = EngineCache(os.path.join(directory.name, "cache.sqlite"))
+        self.addCleanup(cache.close)
+        self.engine.move = chess.Move.from_uci("e7e5")
+
+        first, second = self.make_game(engine_cache=cache), self.make_game(engine_cache=cache)
+        self.assertEqual(self.engine.move, self.play_reply(first))
+        self.assertEqual(self.engine.move, self.play_reply(second))
+
+        self.assertEqual((1, 0), (first.engine_calls, second.engine_calls))
+        self.assertEqual(1, self.engine.calls)
+
+    def test_shared_search_hits_are_not_engine_calls(self):
+        analyses = []
+
+        def analyse(board: chess.Board, limit: chess.engine.Limit, **kwargs):
+            analyses.append(board.fen())
+            return [{"pv": [chess.Move.from_uci("e7e5")], "score": chess.engine.PovScore(chess.engine.Cp(0), board.turn)}]
+
+        self.engine.analyse = analyse
+        search = MultiPVSearch(self.engine)
+
+        first, second = self.make_game(shared_search=search), self.make_game(shared_search=search)
+        self.assertEqual(chess.Move.from_uci("e7e5"), self.play_reply(first))
+        self.assertEqual(chess.Move.from_uci("e7e5"), self.play_reply(second))
+
+        self.assertEqual((1, 0), (first.engine_calls, second.engine_calls))
+        self.assertEqual(1, len(analyses))
+
+
+if __name__ == '__main__':
+    unittest.main()
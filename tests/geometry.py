@@ -0,0 +1,37 @@
+import unittest
+import chess
+from src import geometry
+
+
+class TestGeometry(unittest.TestCase):
+    def test_board_squares(self):
+        self.assertEqual((25.0, 25.0), geometry.square_position(chess.A1))
+        self.assertEqual((375.0, 375.0), geometry.square_position(chess.H8))
+
+    def test_off_board_sides(self):
+        for square in range(-1, -7, -1):
+            self.assertLess(geometry.square_position(square).x, 0)
+        for square in range(-7, -13, -1):
+            self.assertGreater(geometry.square_position(square).x, 8 * geometry.SQUARE_SIZE)
+
+    def test_invalid_square(self):
+        with self.assertRaises(ValueError):
+            geometry.square_position(64)
+
+    def test_longer_travel_takes_longer(self):
+        arm = geometry.square_position(chess.E1)
+        near = geometry.step_time(arm, geometry.square_position(chess.E2), geometry.square_position(chess.E4))
+        far = geometry.step_time(arm, geometry.square_position(chess.A8), geometry.square_position(chess.H1))
+        self.assertLess(near, far)
+        self.assertEqual(0.0, geometry.travel_time(arm, arm))
+
+    def test_board_exit_time(self):
+        edge = geometry.board_exit_time(geometry.square_position(chess.A4))
+        center = geometry.board_exit_time(geometry.square_position(chess.E4))
+        self.assertLess(edge, center)
+        self.assertEqual(0.0, geometry.board_exit_time(geometry.square_position(-1)))
+        self.assertEqual(0.0, geometry.board_exit_time(geometry.HOME))
+
+
+if __name__ == '__main__':
+    unittest.main()
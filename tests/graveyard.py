@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+import chess
+from src import geometry, robot
+from src.board import RealBoard
+from src.graveyard import Graveyard
+from src.movement import plan_move_steps, apply_steps
+from src.reset_planner import plan_reset
+
+WHITE_QUEEN = chess.Piece(chess.QUEEN, chess.WHITE)
+BLACK_PAWN = chess.Piece(chess.PAWN, chess.BLACK)
+
+
+def replay(board: chess.BaseBoard, graveyard: Graveyard, steps) -> chess.BaseBoard:
+    """Applies steps like the arm would, failing when a target is taken"""
+    board = board.copy()
+    for step in steps:
+        piece = board.piece_at(step.from_square) if step.from_square >= 0 else graveyard.slots[step.from_square]
+        if step.to_square >= 0:
+            assert board.piece_at(step.to_square) is None, f"Square {step.to_square} is occupied"
+        else:
+            assert step.to_square not in graveyard.slots, f"Slot {step.to_square} is taken"
+
+        graveyard.record(board, [step])
+        if step.from_square >= 0:
+            board.remove_piece_at(step.from_square)
+        if step.to_square >= 0:
+            board.set_piece_at(step.to_square, piece)
+    return board
+
+
+class TestGraveyard(unittest.TestCase):
+    def test_new_graveyard_holds_spare_queens(self):
+        graveyard = Graveyard()
+        self.assertEqual([robot.off_board_square(chess.QUEEN, chess.WHITE)], graveyard.holding(WHITE_QUEEN))
+        self.assertEqual(geometry.OFF_BOARD_COUNT - 2, len(graveyard.empty()))
+
+    def test_drop_slot_is_nearest_empty(self):
+        graveyard = Graveyard({})
+        slot = graveyard.drop_slot(BLACK_PAWN, chess.H8)
+        nearest = min(range(-1, -geometry.OFF_BOARD_COUNT - 1, -1),
+                      key=lambda square: geometry.distance(geometry.square_position(chess.H8), geometry.square_position(square)))
+        self.assertEqual(nearest, slot)
+        self.assertNotEqual(slot, graveyard.drop_slot(BLACK_PAWN, chess.H8, exclude={slot}))
+
+    def test_captures_fill_separate_slots(self):
+        graveyard = Graveyard({})
+        board = RealBoard(chess.Board("4k3/8/8/8/p7/p7/8/R3K3 w - - 0 1"))
+
+        for move in (chess.Move.from_uci("a1a3"), chess.Move.from_uci("a3a4")):
+            board.chess_board.turn = chess.WHITE
+            steps = plan_move_steps(board, move, graveyard)
+            apply_steps(board, steps, len(steps), graveyard)
+            board.chess_board.push(move)
+
+        self.assertEqual(2, len(graveyard.holding(BLACK_PAWN)))
+
+    def test_promotion_picks_up_the_known_queen(self):
+        slot = -20
+        graveyard = Graveyard({slot: WHITE_QUEEN})
+        board = RealBoard(chess.Board("4k3/P7/8/8/8/8/8/4K3 w - - 0 1"))
+
+        steps = plan_move_steps(board, chess.Move.from_uci("a7a8q"), graveyard)
+        self.assertEqual(slot, steps[-1].from_square)
+
+        apply_steps(board, steps, len(steps), graveyard)
+        self.assertEqual([], graveyard.holding(WHITE_QUEEN))
+        self.assertEqual(1, len(graveyard.holding(chess.Piece(chess.PAWN, chess.WHITE))))
+
+    def test_black_perspective_uses_mirrored_slots(self):
+        graveyard = Graveyard({-1: WHITE_QUEEN})
+        self.assertEqual([geometry.mirror_off_board(-1)], graveyard.holding(WHITE_QUEEN, chess.BLACK))
+
+    def test_reset_returns_and_restores_pieces(self):
+        graveyard = Graveyard({})
+        start = chess.Board()
+        current = chess.Board("4k3/8/8/8/8/8/8/4K3 w - - 0 1")
+
+        # Clearing the board fills the graveyard, setting it up again empties it
+        steps = plan_reset(RealBoard(start), RealBoard(current), graveyard)
+        self.assertEqual(current.board_fen(), replay(start, graveyard, steps).board_fen())
+        self.assertEqual(30, len(graveyard.slots))
+
+        steps = plan_reset(RealBoard(current), RealBoard(start), graveyard)
+        self.assertEqual(start.board_fen(), replay(current, graveyard, steps).board_fen())
+        self.assertEqual({}, graveyard.slots)
+
+    def test_full_graveyard_refuses_drops(self):
+        slots = {-index: BLACK_PAWN for index in range(1, geometry.OFF_BOARD_COUNT + 1)}
+        graveyard = Graveyard(slots)
+        board = RealBoard(chess.Board("4k3/8/8/8/p7/8/8/R3K3 w - - 0 1"))
+
+        self.assertIsNone(graveyard.drop_slot(BLACK_PAWN, chess.A4))
+        self.assertIsNone(plan_move_steps(board, chess.Move.from_uci("a1a4"), graveyard))
+        with self.assertRaises(ValueError):
+            plan_reset(board, RealBoard(chess.Board("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")), graveyard)
+        self.assertEqual(slots, graveyard.slots)
+
+    def test_persists(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "graveyard.json")
+            graveyard = Graveyard.load(path)
+            graveyard.slots[-15] = BLACK_PAWN
+            graveyard.save()
+
+            self.assertEqual(graveyard.slots, Graveyard.load(path).slots)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+from src.image import map_bboxes_to_squares, map_squares_to_board, map_detections_to_board, piece_table
+
+NAMES = {0: "white-king", 1: "black-pawn", 2: "white-rook", 3: "black-queen"}
+
+# Image of 8x8 squares of 100x80 pixels
+IMAGE_SHAPE = (640, 800)
+
+
+def reference_board(detections: np.ndarray, flip: bool):
+    """Scalar path: boxes as (x, y, w, h) like detect_greyscale returns them"""
+    bbox, label, conf = [], [], []
+    for x1, y1, x2, y2, cf, class_id in detections[detections[:, 4] >= 0.5]:
+        bbox.append([int(x1), int(y1), int(x2) - int(x1), int(y2) - int(y1)])
+        label.append(NAMES[int(class_id)])
+        conf.append(float(cf))
+
+    mapped = map_bboxes_to_squares(np.zeros(IMAGE_SHAPE, dtype=np.uint8), bbox, label, conf)
+    return map_squares_to_board(mapped, flip=flip)
+
+
+class TestMapDetectionsToBoard(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        count = 200
+
+        # Random boxes inside the image, many centers beyond the distance threshold
+        x1 = rng.integers(0, 760, count)
+        y1 = rng.integers(0, 600, count)
+        x2 = np.minimum(x1 + rng.integers(10, 120, count), 799)
+        y2 = np.minimum(y1 + rng.integers(10, 120, count), 639)
+        confidence = rng.uniform(0.3, 1.0, count)
+        class_ids = rng.integers(0, len(NAMES), count)
+
+        self.detections = np.column_stack((x1, y1, x2, y2, confidence, class_ids)).astype(np.float32)
+
+    def assert_matches_reference(self, detections: np.ndarray, flip: bool):
+        expected = reference_board(detections, flip)
+        board = map_detections_to_board(IMAGE_SHAPE, detections, piece_table(NAMES), flip=flip)
+
+        self.assertEqual(expected.chess_board.board_fen(), board.chess_board.board_fen())
+        np.testing.assert_allclose(expected.offsets, board.offsets, atol=1e-6)
+
+    def test_matches_scalar_path(self):
+        for flip in (False, True):
+            with self.subTest(flip=flip):
+                self.assert_matches_reference(self.detections, flip)
+
+    def test_out_of_threshold_boxes_dropped(self):
+        # Centered on e1 (x 400-500, y 0-80), then pushed off center past the threshold
+        detections = np.array([[420, 10, 480, 70, 0.9, 0],
+                               [485, 10, 499, 70, 0.9, 1],
+                               [420, 5, 480, 10, 0.9, 2],
+                               [420, 10, 480, 70, 0.4, 3]], dtype=np.float32)
+
+        for flip in (False, True):
+            with self.subTest(flip=flip):
+                self.assert_matches_reference(detections, flip)
+                board = map_detections_to_board(IMAGE_SHAPE, detections, piece_table(NAMES), flip=flip)
+                self.assertEqual(1, len(board.chess_board.piece_map()))
+
+    def test_no_detections(self):
+        board = map_detections_to_board(IMAGE_SHAPE, np.empty((0, 6), dtype=np.float32), piece_table(NAMES))
+        self.assertEqual(0, board.chess_board.occupied)
+
+
+if __name__ == '__main__':
+    unittest.main()
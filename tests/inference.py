@@ -0,0 +1,82 @@
+import os
+import time
+import unittest
+import numpy as np
+from src.image import Detector
+from src.inference import InferenceClient
+
+# Pixel values that make the fake worker exit or stall
+EXIT_PIXEL = 255
+STALL_PIXEL = 254
+
+
+class FakeModel(Detector):
+    """Echoes the frame size and first pixel as one detection"""
+
+    @property
+    def names(self) -> dict[int, str]:
+        return {0: "P"}
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        if image[0, 0] == EXIT_PIXEL:
+            os._exit(3)
+        if image[0, 0] == STALL_PIXEL:
+            time.sleep(60)
+        height, width = image.shape
+        return np.array([[0, 0, width, height, image[0, 0], 0]], dtype=np.float32)
+
+
+def load_fake(model_path: str) -> FakeModel:
+    return FakeModel()
+
+
+def frame(value: int, shape=(4, 6)) -> np.ndarray:
+    return np.full(shape, value, dtype=np.uint8)
+
+
+class TestInferenceClient(unittest.TestCase):
+    def setUp(self):
+        self.client = InferenceClient("fake.pt", slot_count=2, max_frame_shape=(8, 8), model_loader=load_fake)
+        self.addCleanup(self.client.close)
+
+    def test_round_trip(self):
+        self.assertEqual({0: "P"}, self.client.names)
+        detections = self.client.detect(frame(7))
+        np.testing.assert_array_equal([[0, 0, 6, 4, 7, 0]], detections)
+
+    def test_slots_are_reused(self):
+        for value in range(10):
+            self.assertEqual(value, self.client.detect(frame(value, (value % 8 + 1, 8)))[0, 4])
+        self.assertEqual(2, self.client.free_slots.qsize())
+
+    def test_frame_too_large(self):
+        with self.assertRaises(ValueError):
+            self.client.detect(frame(1, (9, 9)))
+
+    def test_worker_death_fails_pending(self):
+        start = time.monotonic()
+        with self.assertRaises(RuntimeError):
+            self.client.detect(frame(EXIT_PIXEL), timeout=30)
+        self.assertLess(time.monotonic() - start, 10)
+
+        # Slots come back and later requests fail without waiting
+        self.assertEqual(2, self.client.free_slots.qsize())
+        with self.assertRaises(RuntimeError):
+            self.client.detect(frame(1))
+
+    def test_stalled_worker_times_out(self):
+        with self.assertRaises(TimeoutError):
+            self.client.detect(frame(STALL_PIXEL), timeout=0.5)
+
+    def test_no_free_slot_times_out(self):
+        # Both slots stay taken until the stalled worker answers
+        for _ in range(2):
+            with self.assertRaises(TimeoutError):
+                self.client.detect(frame(STALL_PIXEL), timeout=0.2)
+
+        with self.assertRaises(TimeoutError):
+            self.client.detect(frame(1), timeout=0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+import numpy as np
+from src import inference_server
+from src.inference_server import InferenceServer, RemoteDetector, REQUEST_HEADER
+
+
+class FakeModel:
+    names = {0: "P"}
+
+
+def fake_batch_detections(images, model):
+    return [np.array([[0, 0, 1, 1, image[0, 0], 0]], dtype=np.float32) for image in images]
+
+
+def stalled_batch_detections(images, model):
+    time.sleep(1)
+    return fake_batch_detections(images, model)
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full((4, 4), value, dtype=np.uint8)
+
+
+class TestInferenceServer(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(inference_server, "yolo_batch_detections", fake_batch_detections)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.socket_path = os.path.join(directory.name, "inference.sock")
+
+    def serve(self, server: InferenceServer):
+        serving = threading.Thread(target=server.serve_forever, daemon=True)
+        serving.start()
+        self.addCleanup(serving.join, 5)
+        self.addCleanup(server.shutdown)
+
+        while not os.path.exists(self.socket_path):
+            time.sleep(0.01)
+
+    def start_batcher(self, server: InferenceServer) -> threading.Thread:
+        batcher = threading.Thread(target=server._run_batches, daemon=True)
+        batcher.start()
+        self.addCleanup(batcher.join, 5)
+        self.addCleanup(server.requests.put, None)
+        return batcher
+
+    def submit(self, server: InferenceServer, value: int) -> Future:
+        future = Future()
+        server.requests.put((frame(value), future))
+        return future
+
+    def test_max_batch_size(self):
+        server = InferenceServer(FakeModel(), self.socket_path, max_batch_size=3, max_wait=0.05)
+        futures = [self.submit(server, value) for value in range(5)]
+        self.start_batcher(server)
+
+        self.assertEqual(list(range(5)), [future.result(timeout=5)[0, 4] for future in futures])
+        self.assertEqual({3: 1, 2: 1}, dict(server.batch_sizes))
+
+    def test_batching_window(self):
+        server = InferenceServer(FakeModel(), self.socket_path, max_batch_size=8, max_wait=0.2)
+        self.start_batcher(server)
+
+        start = time.monotonic()
+        first = self.submit(server, 1)
+        first.result(timeout=5)
+        # A lone request waits out the window for company, but no longer
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertLess(time.monotonic() - start, 2)
+
+        self.submit(server, 2).result(timeout=5)
+        self.assertEqual({1: 2}, dict(server.batch_sizes))
+
+    def test_disconnect_does_not_stall_others(self):
+        server = InferenceServer(FakeModel(), self.socket_path, max_wait=0.01)
+        self.serve(server)
+
+        with RemoteDetector(self.socket_path, timeout=5) as station:
+            # Another station drops its connection halfway through a frame
+            dropped = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            dropped.connect(self.socket_path)
+            dropped.sendall(REQUEST_HEADER.pack(4, 4) + b"\0" * 5)
+            dropped.close()
+
+            for value in range(3):
+                self.assertEqual(value, station.detect(frame(value))[0, 4])
+            self.assertEqual({0: "P"}, station.names)
+
+
+    def test_client_times_out(self):
+        self.serve(InferenceServer(FakeModel(), self.socket_path, max_wait=0.01))
+
+        with mock.patch.object(inference_server, "yolo_batch_detections", stalled_batch_detections):
+            with RemoteDetector(self.socket_path, timeout=0.2) as station:
+                with self.assertRaises(TimeoutError):
+                    station.detect(frame(1))
+
+    def test_server_drops_station_after_request_timeout(self):
+        self.serve(InferenceServer(FakeModel(), self.socket_path, max_wait=0.01, request_timeout=0.2))
+
+        with mock.patch.object(inference_server, "yolo_batch_detections", stalled_batch_detections):
+            with RemoteDetector(self.socket_path, timeout=5) as station:
+                start = time.monotonic()
+                with self.assertRaises(OSError):
+                    station.detect(frame(1))
+                self.assertLess(time.monotonic() - start, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
-from src.movement import identify_move
+from src.movement import identify_move, match_move, nearest_moves, reconcile_moves, plan_move_steps
+from src.board import RealBoard
+from src import robot
 import chess
 from typing import Iterable
 
@@ -40,6 +42,111 @@ class TestIdentifyMoveStart(unittest.TestCase):
         assert_identify_moves(self, self.board, moves, as_sequence=False)
 
 
+class TestMatchMove(unittest.TestCase):
+    def setUp(self):
+        # Castling both sides, en passant on d6 and promotion on b8 are legal
+        self.board = chess.Board("r3k2r/pPp2ppp/8/3pP3/8/8/PPP2PPP/R3K2R w KQkq d6 0 1")
+
+    def test_legal_moves(self):
+        for move in self.board.legal_moves:
+            after_board = self.board.copy()
+            after_board.push(move)
+            self.assertEqual(move, match_move(self.board, after_board))
+
+    def test_unchanged_board(self):
+        self.assertIsNone(match_move(self.board, self.board))
+
+    def test_illegal_move(self):
+        after_board = self.board.copy()
+        make_move(after_board, chess.Move.from_uci("a2a5"))
+        self.assertIsNone(match_move(self.board, after_board))
+
+    def test_nearest_moves(self):
+        # Promoted piece misdetected as a bishop
+        after_board = self.board.copy()
+        after_board.push(chess.Move.from_uci("b7b8q"))
+        after_board.set_piece_at(chess.B8, chess.Piece(chess.BISHOP, chess.WHITE))
+
+        # Matches the under promotion instead
+        self.assertEqual(chess.Move.from_uci("b7b8b"), match_move(self.board, after_board))
+
+        # Pawn lifted off the board
+        after_board = self.board.copy()
+        after_board.remove_piece_at(chess.B7)
+
+        nearest = nearest_moves(self.board, after_board, limit=len(list(self.board.legal_moves)))
+        self.assertEqual(len(list(self.board.legal_moves)), len(nearest))
+        self.assertEqual(sorted(match.distance for match in nearest), [match.distance for match in nearest])
+        self.assertEqual(chess.B7, nearest[0].move.from_square)
+
+
+class TestReconcileMoves(unittest.TestCase):
+    def setUp(self):
+        self.board = chess.Board()
+
+    def play(self, moves: Iterable[str]) -> chess.Board:
+        board = self.board.copy()
+        for move in moves:
+            board.push_uci(move)
+        return board
+
+    def test_single_move(self):
+        after_board = self.play(["e2e4"])
+        self.assertEqual([chess.Move.from_uci("e2e4")], reconcile_moves(self.board, after_board))
+
+    def test_missed_plies(self):
+        for moves in (["e2e4", "d7d5", "e4d5"], ["g1f3", "g8f6"], ["e2e4", "e7e5", "g1f3"]):
+            after_board = self.play(moves)
+            reconciled = reconcile_moves(self.board, after_board, max_plies=3)
+
+            self.assertEqual(len(moves), len(reconciled))
+            self.assertEqual(after_board.board_fen(), self.play(move.uci() for move in reconciled).board_fen())
+
+    def test_too_many_plies(self):
+        after_board = self.play(["e2e4", "e7e5", "g1f3", "b8c6"])
+        self.assertIsNone(reconcile_moves(self.board, after_board, max_plies=3))
+
+    def test_candidate_moves_restrict_plies(self):
+        after_board = self.play(["e2e4", "e7e5", "g1f3"])
+        e7e5 = chess.Move.from_uci("e7e5")
+
+        def candidates(board: chess.Board):
+            return board.legal_moves if board.turn == chess.WHITE else [e7e5]
+
+        self.assertEqual(3, len(reconcile_moves(self.board, after_board, 3, candidates)))
+        self.assertIsNone(reconcile_moves(self.board, after_board, 3, lambda board: board.legal_moves if board.turn == chess.WHITE else []))
+
+    def test_unreachable_board(self):
+        after_board = self.board.copy()
+        after_board.remove_piece_at(chess.D8)
+        self.assertIsNone(reconcile_moves(self.board, after_board, max_plies=2))
+
+
+class TestPlanMoveSteps(unittest.TestCase):
+    def steps(self, fen: str, uci: str) -> list[tuple[int, int]]:
+        board = RealBoard(board=chess.Board(fen))
+        return [(step.from_square, step.to_square) for step in plan_move_steps(board, chess.Move.from_uci(uci))]
+
+    def test_quiet_move(self):
+        self.assertEqual([(chess.E2, chess.E4)], self.steps(chess.STARTING_FEN, "e2e4"))
+
+    def test_castling(self):
+        fen = "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1"
+        self.assertEqual([(chess.E1, chess.G1), (chess.H1, chess.F1)], self.steps(fen, "e1g1"))
+
+    def test_en_passant(self):
+        fen = "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1"
+        self.assertEqual([(chess.D5, robot.off_board_square(chess.PAWN, chess.BLACK)), (chess.E5, chess.D6)],
+                         self.steps(fen, "e5d6"))
+
+    def test_capture_promotion(self):
+        fen = "1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1"
+        self.assertEqual([(chess.B8, robot.off_board_square(chess.ROOK, chess.BLACK)),
+                          (chess.A7, robot.off_board_square(chess.PAWN, chess.WHITE)),
+                          (robot.off_board_square(chess.QUEEN, chess.WHITE), chess.B8)],
+                         self.steps(fen, "a7b8q"))
+
+
 def assert_identify_move(test_case: unittest.TestCase, board: chess.Board, expected_move: chess.Move | str,
                          equal: bool = True):
     if isinstance(expected_move, str):
@@ -0,0 +1,56 @@
+import unittest
+import random
+import chess
+import chess.engine
+from src.difficulty import DIFFICULTY_PROFILES
+from src.multipv import MultiPVSearch
+
+
+class MultiPVEngine:
+    def __init__(self, scores: dict[str, int]):
+        self.scores = scores
+        self.calls = 0
+
+    def analyse(self, board: chess.Board, limit: chess.engine.Limit, multipv=None, options=None, **kwargs):
+        self.calls += 1
+        infos = [{"pv": [chess.Move.from_uci(uci)], "score": chess.engine.PovScore(chess.engine.Cp(score), board.turn)}
+                 for uci, score in self.scores.items()]
+        return infos[:multipv]
+
+
+class TestMultiPVSearch(unittest.TestCase):
+    def setUp(self):
+        self.engine = MultiPVEngine({"e2e4": 40, "d2d4": 30, "g1f3": -50, "a2a3": -400})
+        self.search = MultiPVSearch(self.engine, rng=random.Random(0))
+
+    def test_strongest_level_plays_best_move(self):
+        for _ in range(10):
+            self.assertEqual(chess.Move.from_uci("e2e4"), self.search.choose(chess.Board(), DIFFICULTY_PROFILES[10]))
+
+    def test_loss_window_limits_choice(self):
+        moves = {self.search.choose(chess.Board(), DIFFICULTY_PROFILES[3]).uci() for _ in range(100)}
+        self.assertEqual({"e2e4", "d2d4", "g1f3"}, moves)
+
+    def test_one_search_per_position(self):
+        board = chess.Board()
+        self.search.choose(board, DIFFICULTY_PROFILES[1])
+        self.search.choose(board, DIFFICULTY_PROFILES[10])
+        self.assertEqual(chess.Move.from_uci("e2e4"), self.search.candidates(board)[0].move)
+
+        self.assertEqual(1, self.engine.calls)
+        self.assertEqual(2, self.search.hits)
+
+    def test_cache_evicts_oldest(self):
+        search = MultiPVSearch(self.engine, cache_size=1)
+        board = chess.Board()
+        search.candidates(board)
+        board.push_uci("e2e4")
+        search.candidates(board)
+        board.pop()
+        search.candidates(board)
+
+        self.assertEqual(3, self.engine.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
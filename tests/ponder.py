@@ -0,0 +1,81 @@
+import sys
+import time
+import unittest
+import chess
+import chess.engine
+from src.async_engine import SyncEngine
+from src.ponder import Ponderer
+
+# UCI engine that sends one info line per legal move at once, then searches until the time is up or "stop"
+ENGINE_SCRIPT = r'''
+import sys, threading, chess
+board = chess.Board()
+stop = threading.Event()
+
+def out(line):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+def go(seconds, multipv):
+    moves = list(board.legal_moves)
+    for rank, move in enumerate(moves[:multipv]):
+        out(f"info depth 1 multipv {rank + 1} score cp {-rank} pv {move.uci()}")
+    stop.wait(seconds)
+    out("bestmove " + moves[0].uci())
+
+multipv = 1
+for line in sys.stdin:
+    words = line.split()
+    if not words:
+        continue
+    if words[0] == "uci":
+        out("id name Fake")
+        out("option name MultiPV type spin default 1 min 1 max 10")
+        out("uciok")
+    elif words[0] == "isready":
+        out("readyok")
+    elif words[0] == "setoption" and words[2] == "MultiPV":
+        multipv = int(words[4])
+    elif words[0] == "position":
+        board = chess.Board()
+        if "moves" in words:
+            for move in words[words.index("moves") + 1:]:
+                board.push_uci(move)
+    elif words[0] == "go":
+        seconds = int(words[words.index("movetime") + 1]) / 1000 if "movetime" in words else 0
+        stop.clear()
+        threading.Thread(target=go, args=(seconds, multipv)).start()
+    elif words[0] == "stop":
+        stop.set()
+    elif words[0] == "quit":
+        stop.set()
+        break
+'''
+
+
+class TestPondererWithSyncEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = SyncEngine.popen_uci([sys.executable, "-c", ENGINE_SCRIPT])
+        self.addCleanup(self.engine.quit)
+
+    def test_predict_while_searching(self):
+        ponderer = Ponderer(self.engine, replies=2, prediction_limit=chess.engine.Limit(time=0.05))
+        board = chess.Board()
+        ponderer.start(board, chess.engine.Limit(time=30))
+        self.addCleanup(ponderer.cancel)
+
+        board.push(next(iter(board.legal_moves)))
+        deadline = time.monotonic() + 10
+        predicted = None
+        while predicted is None and time.monotonic() < deadline:
+            predicted = ponderer.predict(board)
+            time.sleep(0.01)
+
+        # The response search runs for 30 s, the prediction is its best move so far
+        self.assertEqual(next(iter(board.legal_moves)), predicted)
+        self.assertIsNotNone(ponderer.thread)
+        self.assertTrue(ponderer.thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
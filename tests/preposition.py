@@ -0,0 +1,76 @@
+import unittest
+import threading
+from unittest import mock
+import chess
+from src import geometry, robot
+from src.robot_queue import RobotQueue
+from src.preposition import Prepositioner
+
+
+class TestPrepositioner(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.release = threading.Event()
+        self.release.set()
+
+        def issue_command(command: str, timeout_max=robot.DELAY_TIMEOUT) -> int:
+            self.release.wait()
+            self.sent.append(command)
+            return robot.COMMAND_SUCCESS
+
+        patcher = mock.patch.object(robot, "issue_command", issue_command)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.queue = RobotQueue()
+        self.addCleanup(self.queue.close)
+        self.prepositioner = Prepositioner(self.queue)
+
+    def test_hit_saves_travel_to_pick(self):
+        self.prepositioner.hover(chess.G8)
+        self.prepositioner.future.result(timeout=5)
+        self.assertTrue(self.prepositioner.settle([robot.MoveStep(chess.G8, chess.F6)]))
+
+        self.assertEqual(["hover 62"], self.sent)
+        self.assertEqual(1, self.prepositioner.hits)
+        self.assertAlmostEqual(geometry.travel_time(geometry.HOME, geometry.square_position(chess.G8)), self.prepositioner.saved)
+
+    def test_miss_counts_detour(self):
+        self.prepositioner.moved([robot.MoveStep(chess.E7, chess.E5)])
+        self.prepositioner.hover(chess.A8)
+        self.prepositioner.future.result(timeout=5)
+        self.assertFalse(self.prepositioner.settle([robot.MoveStep(chess.E5, chess.E4)]))
+
+        self.assertEqual(1, self.prepositioner.misses)
+        self.assertLess(self.prepositioner.saved, 0)
+
+    def test_unsent_hover_is_dropped(self):
+        self.release.clear()
+        busy = self.queue.submit([robot.MoveStep(chess.E2, chess.E4)])
+        self.prepositioner.hover(chess.G8)
+
+        self.assertFalse(self.prepositioner.settle([robot.MoveStep(chess.G8, chess.F6)]))
+        self.release.set()
+        busy.result(timeout=5)
+
+        self.assertEqual((0, 0), (self.prepositioner.hits, self.prepositioner.misses))
+        self.assertNotIn("hover 62", self.sent)
+
+    def test_hover_skipped_when_work_is_queued(self):
+        self.release.clear()
+        busy = self.queue.submit([robot.MoveStep(chess.E2, chess.E4)])
+        hover = self.queue.submit_hover(chess.G8)
+        self.queue.submit([robot.MoveStep(chess.D2, chess.D4)])
+        self.release.set()
+
+        self.assertEqual(robot.COMMAND_FAILURE, hover.result(timeout=5))
+        busy.result(timeout=5)
+        self.assertNotIn("hover 62", self.sent)
+
+    def test_black_hover_mirrors_off_board(self):
+        self.assertEqual(f"hover {geometry.mirror_off_board(-1)}", robot.form_hover_command(-1, chess.BLACK))
+        self.assertEqual("hover 12", robot.form_hover_command(chess.E2, chess.BLACK))
+
+
+if __name__ == '__main__':
+    unittest.main()
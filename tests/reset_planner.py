@@ -0,0 +1,94 @@
+import itertools
+import random
+import unittest
+import chess
+from src import robot
+from src.board import RealBoard
+from src.reset_planner import Transfer, hungarian, assign_transfers, plan_reset, travel_distance
+
+OFF_BOARD_PIECES = {square: chess.Piece(piece_type, color) for (piece_type, color), square in robot.OFF_BOARD_SQUARES.items()}
+
+
+def replay(board: chess.BaseBoard, steps) -> chess.BaseBoard:
+    """Applies steps like the arm would, failing on an occupied target"""
+    board = board.copy()
+    for step in steps:
+        if step.from_square >= 0:
+            piece = board.remove_piece_at(step.from_square)
+            assert piece is not None, f"No piece on {step.from_square}"
+        else:
+            piece = OFF_BOARD_PIECES[step.from_square]
+
+        if step.to_square >= 0:
+            assert board.piece_at(step.to_square) is None, f"Square {step.to_square} is occupied"
+            board.set_piece_at(step.to_square, piece)
+
+    return board
+
+
+class TestHungarian(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(1)
+        for size in range(1, 6):
+            cost = [[rng.randint(0, 20) for _ in range(size)] for _ in range(size)]
+            assignment = hungarian(cost)
+
+            best = min(sum(cost[row][column] for row, column in enumerate(permutation)) for permutation in itertools.permutations(range(size)))
+            self.assertEqual(sorted(assignment), list(range(size)))
+            self.assertEqual(sum(cost[row][column] for row, column in enumerate(assignment)), best)
+
+
+class TestPlanReset(unittest.TestCase):
+    def assert_reset(self, current: chess.Board, expected: chess.Board):
+        steps = plan_reset(RealBoard(current), RealBoard(expected))
+        self.assertEqual(replay(current, steps).board_fen(), expected.board_fen())
+        return steps
+
+    def test_nothing_to_do(self):
+        self.assertEqual(self.assert_reset(chess.Board(), chess.Board()), [])
+
+    def test_surplus_and_missing_pieces_use_off_board(self):
+        current = chess.Board("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN1 w - - 0 1")
+        current.set_piece_at(chess.E4, chess.Piece(chess.QUEEN, chess.BLACK))
+
+        steps = self.assert_reset(current, chess.Board())
+        self.assertIn(robot.MoveStep(chess.E4, robot.off_board_square(chess.QUEEN, chess.BLACK)), steps)
+        self.assertIn(robot.MoveStep(robot.off_board_square(chess.ROOK, chess.WHITE), chess.H1), steps)
+
+    def test_swap_goes_through_buffer(self):
+        expected = chess.Board()
+        current = chess.Board()
+        current.set_piece_at(chess.D1, chess.Piece(chess.KING, chess.WHITE))
+        current.set_piece_at(chess.E1, chess.Piece(chess.QUEEN, chess.WHITE))
+
+        steps = self.assert_reset(current, expected)
+        self.assertEqual(len(steps), 3)
+        # The parked piece leaves the buffer again
+        self.assertEqual(steps[0].to_square, steps[-1].from_square)
+
+    def test_pairs_pieces_with_nearest_targets(self):
+        current = chess.Board(None)
+        current.set_piece_at(chess.A3, chess.Piece(chess.PAWN, chess.WHITE))
+        current.set_piece_at(chess.H3, chess.Piece(chess.PAWN, chess.WHITE))
+        expected = chess.Board(None)
+        expected.set_piece_at(chess.A2, chess.Piece(chess.PAWN, chess.WHITE))
+        expected.set_piece_at(chess.H2, chess.Piece(chess.PAWN, chess.WHITE))
+
+        self.assertCountEqual(assign_transfers(current, expected), [Transfer(chess.A3, chess.A2), Transfer(chess.H3, chess.H2)])
+
+    def test_random_positions(self):
+        rng = random.Random(7)
+        for _ in range(20):
+            current = chess.Board()
+            for _ in range(rng.randint(0, 60)):
+                moves = list(current.legal_moves)
+                if not moves:
+                    break
+                current.push(rng.choice(moves))
+
+            steps = self.assert_reset(current, chess.Board())
+            self.assertGreaterEqual(travel_distance(steps), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
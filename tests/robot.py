@@ -0,0 +1,161 @@
+import unittest
+import socket
+import threading
+import time
+import chess
+from src.robot import RobotClient, MoveStep, form_command, form_batch_command, COMMAND_SUCCESS, COMMAND_FAILURE
+
+
+class FakeRobot:
+    def __init__(self, one_shot: bool = False, split_reply: bool = False, fail_step: int = -1, step_delay: float = 0):
+        self.one_shot = one_shot
+        self.step_delay = step_delay
+        self.fail_step = fail_step
+        self.split_reply = split_reply
+        self.commands = []
+        self.connections = 0
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self.handle, args=(connection,), daemon=True).start()
+
+    def handle(self, connection: socket.socket):
+        with connection:
+            buffer = b""
+            while True:
+                data = connection.recv(1024)
+                if not data:
+                    return
+                buffer += data
+
+                if self.one_shot:
+                    # Legacy robot: one recv is the whole command, unterminated reply, then hang up
+                    self.commands.append(buffer.decode())
+                    connection.sendall(b"success")
+                    return
+
+                while b"\n" in buffer:
+                    command, buffer = buffer.split(b"\n", 1)
+                    self.commands.append(command.decode())
+
+                    if command.startswith(b"batch"):
+                        steps = int(command.split()[1])
+                        for step in range(steps):
+                            time.sleep(self.step_delay)
+                            connection.sendall(b"failure\n" if step == self.fail_step else b"success\n")
+                            if step == self.fail_step:
+                                break
+                    elif self.split_reply:
+                        connection.sendall(b"succ")
+                        connection.sendall(b"ess\n")
+                    else:
+                        connection.sendall(b"success\n" if command != b"bad" else b"failure\n")
+
+    def close(self):
+        self.listener.close()
+
+
+class TestFormCommand(unittest.TestCase):
+    def test_white_perspective(self):
+        self.assertEqual("12 0 0 -4", form_command(chess.E2, -4))
+
+    def test_black_perspective_flips_off_board_only(self):
+        self.assertEqual("12 0 0 -10", form_command(chess.E2, -4, perspective=chess.BLACK))
+        self.assertEqual("-4 0 0 12", form_command(-10, chess.E2, perspective=chess.BLACK))
+
+
+class TestRobotClient(unittest.TestCase):
+    def test_connection_reused(self):
+        robot = FakeRobot()
+        client = RobotClient("127.0.0.1", robot.port, timeout=2, terminate_commands=True)
+
+        for _ in range(5):
+            self.assertEqual(COMMAND_SUCCESS, client.command("1 0 0 2"))
+        self.assertEqual(COMMAND_FAILURE, client.command("bad"))
+
+        self.assertEqual(1, robot.connections)
+        self.assertEqual(6, client.rtt_stats()["count"])
+        client.close()
+        robot.close()
+
+    def test_completion_time_recorded(self):
+        robot = FakeRobot()
+        client = RobotClient("127.0.0.1", robot.port, timeout=2, terminate_commands=True)
+        self.assertIsNone(client.completed_at)
+
+        began = time.monotonic()
+        client.command("1 0 0 2")
+        self.assertGreaterEqual(client.completed_at, began)
+        client.close()
+        robot.close()
+
+    def test_split_reply(self):
+        robot = FakeRobot(split_reply=True)
+        client = RobotClient("127.0.0.1", robot.port, timeout=2, terminate_commands=True)
+
+        self.assertEqual(COMMAND_SUCCESS, client.command("1 0 0 2"))
+        self.assertEqual(COMMAND_SUCCESS, client.command("2 0 0 3"))
+        client.close()
+        robot.close()
+
+    def test_legacy_robot_reconnects_after_hang_up(self):
+        robot = FakeRobot(one_shot=True)
+        client = RobotClient("127.0.0.1", robot.port, timeout=2)
+
+        for _ in range(3):
+            self.assertEqual(COMMAND_SUCCESS, client.command("1 0 0 2"))
+
+        self.assertEqual(3, robot.connections)
+        self.assertEqual(["1 0 0 2"] * 3, robot.commands)
+        client.close()
+        robot.close()
+
+    def test_batch_acknowledged_per_step(self):
+        robot = FakeRobot(fail_step=1)
+        client = RobotClient("127.0.0.1", robot.port, timeout=2, terminate_commands=True)
+        steps = [MoveStep(chess.E2, chess.E4), MoveStep(chess.E4, -6), MoveStep(-4, chess.E4)]
+
+        self.assertEqual(1, client.batch(form_batch_command(steps), len(steps)))
+        self.assertEqual(COMMAND_SUCCESS, client.command("1 0 0 2"))
+
+        self.assertEqual("batch 3 12 0 0 28 ; 28 0 0 -6 ; -4 0 0 28", robot.commands[0])
+        self.assertEqual(1, robot.connections)
+        client.close()
+        robot.close()
+
+    def test_batch_deadline_covers_all_steps(self):
+        robot = FakeRobot(step_delay=0.1)
+        client = RobotClient("127.0.0.1", robot.port, timeout=2, terminate_commands=True)
+        steps = [MoveStep(chess.E2, chess.E4)] * 10
+
+        began = time.monotonic()
+        completed = client.batch(form_batch_command(steps), len(steps), deadline=began + 0.25)
+
+        self.assertLess(completed, len(steps))
+        self.assertLess(time.monotonic() - began, 1)
+        client.close()
+        robot.close()
+
+    def test_unreachable_robot_fails(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+        listener.close()
+
+        client = RobotClient("127.0.0.1", port, timeout=1, reconnect_attempts=2)
+        self.assertEqual(COMMAND_FAILURE, client.command("1 0 0 2"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import threading
+import time
+from unittest import mock
+from concurrent.futures import CancelledError
+import chess
+from src import robot
+from src.robot_queue import RobotQueue
+
+
+class TestRobotQueue(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.release = threading.Event()
+        self.release.set()
+
+        def issue_command(command: str, timeout_max=robot.DELAY_TIMEOUT) -> int:
+            self.release.wait()
+            self.sent.append(command)
+            return robot.COMMAND_FAILURE if command.startswith("-1") else robot.COMMAND_SUCCESS
+
+        patcher = mock.patch.object(robot, "issue_command", issue_command)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.queue = RobotQueue()
+        self.addCleanup(self.queue.close)
+
+    def test_commands_run_in_order(self):
+        first = self.queue.submit([robot.MoveStep(chess.E2, chess.E4)])
+        second = self.queue.submit([robot.MoveStep(chess.D2, chess.D4), robot.MoveStep(-1, chess.A1)])
+
+        self.assertEqual(1, first.result(timeout=5))
+        self.assertEqual(1, second.result(timeout=5))
+        self.assertEqual(["12 0 0 28", "11 0 0 27", "-1 0 0 0"], self.sent)
+
+    def test_caller_not_blocked(self):
+        self.release.clear()
+        future = self.queue.submit([robot.MoveStep(chess.E2, chess.E4)])
+        self.assertFalse(future.done())
+
+        self.release.set()
+        self.assertEqual(1, future.result(timeout=5))
+
+    def test_cancel_pending(self):
+        self.release.clear()
+        in_flight = self.queue.submit([robot.MoveStep(chess.E2, chess.E4)])
+        time.sleep(0.05)
+        pending = self.queue.submit([robot.MoveStep(chess.D2, chess.D4)])
+
+        self.assertEqual(1, self.queue.cancel_pending())
+        self.release.set()
+
+        self.assertEqual(1, in_flight.result(timeout=5))
+        with self.assertRaises(CancelledError):
+            pending.result(timeout=5)
+        self.assertEqual(["12 0 0 28"], self.sent)
+
+    def test_deadline_passed_before_start(self):
+        self.release.clear()
+        in_flight = self.queue.submit([robot.MoveStep(chess.E2, chess.E4)])
+        late = self.queue.submit([robot.MoveStep(chess.D2, chess.D4)], timeout=0.01)
+        time.sleep(0.05)
+        self.release.set()
+
+        in_flight.result(timeout=5)
+        with self.assertRaises(TimeoutError):
+            late.result(timeout=5)
+
+    def test_deadline_covers_all_steps(self):
+        timeouts = []
+
+        def issue_command(command: str, timeout_max=robot.DELAY_TIMEOUT) -> int:
+            timeouts.append(timeout_max)
+            time.sleep(0.1)
+            return robot.COMMAND_SUCCESS
+
+        steps = [robot.MoveStep(chess.E2, chess.E4)] * 10
+        with mock.patch.object(robot, "issue_command", issue_command):
+            completed = self.queue.submit(steps, timeout=0.25).result(timeout=5)
+
+        # Compatibility mode, every step gets what is left of the move's time
+        self.assertLess(completed, len(steps))
+        self.assertEqual(completed, len(timeouts))
+        self.assertLessEqual(timeouts[0], 0.25)
+        self.assertEqual(sorted(timeouts, reverse=True), timeouts)
+
+
+if __name__ == '__main__':
+    unittest.main()